@@ -1,10 +1,11 @@
 __all__ = [
-    'Pen', 'Paper', 'Bounds',
+    'Pen', 'Paper', 'StreamingPaper', 'Bounds',
     'Heading', 'Angle',
     'FillMode', 'StrokeMode', 'OutlineMode', 'StrokeFillMode', 'StrokeOutlineMode'
 ]
 
 from .pen import Pen, Paper
+from .streaming import StreamingPaper
 from .bounds import Bounds
 from .mode import FillMode, StrokeMode, OutlineMode, StrokeFillMode, StrokeOutlineMode
 from .heading import Heading, Angle
@@ -0,0 +1,256 @@
+"""
+Fit arcs to polylines.
+
+A smooth curve drawn as a dense polyline can usually be drawn with far fewer
+arcs. Between two points with known tangent directions, a biarc is a pair of
+arcs that meet tangent to each other and leave and arrive along those
+directions. The polyline is covered with biarcs, each reaching as far along
+it as it can without straying too far from the points, so that the result is
+smooth and within a given tolerance.
+"""
+
+import math
+
+import numpy as np
+
+import vec
+from .geometry import distance_to_segment
+from .heading import Heading
+from .point import points_equal, epsilon
+from .segment import LineSegment, ArcSegment
+
+# Turns sharper than this at a point of the polyline are kept as corners.
+CORNER_ANGLE = 45
+
+
+def fit_biarcs(points, tolerance, width=None, color=None):
+    """
+    Fit line and arc segments to the polyline through `points`, staying
+    within `tolerance` of every point. Returns a list of unjoined segments.
+
+    >>> points = [
+    ...     (math.cos(t / 10), math.sin(t / 10))
+    ...     for t in range(16)
+    ... ]
+    >>> segments = fit_biarcs(points, 0.001)
+    >>> [type(seg).__name__ for seg in segments]
+    ['ArcSegment', 'ArcSegment']
+    >>> round(segments[0].radius, 6)
+    1.0
+    """
+    points = [
+        p for i, p in enumerate(points)
+        if i == 0 or not points_equal(points[i - 1], p)
+    ]
+    segments = []
+    for span in _corner_spans(points):
+        xy = np.array(span, dtype=float)
+        tangents = polyline_tangents(xy)
+        for piece in _fit(xy, tangents, tolerance):
+            segments.append(_segment(piece, width, color))
+    return segments
+
+
+def polyline_tangents(xy):
+    """
+    Estimate the tangent directions of a smooth curve through the points,
+    given as an array. Each tangent is that of the circle through the point
+    and its neighbors.
+    """
+    if len(xy) == 2:
+        u = _unit(xy[1] - xy[0])
+        return np.array([u, u])
+    a = xy[1:-1] - xy[:-2]
+    b = xy[2:] - xy[1:-1]
+    a2 = (a * a).sum(axis=1)[:, np.newaxis]
+    b2 = (b * b).sum(axis=1)[:, np.newaxis]
+    middle = b2 * a + a2 * b
+    middle /= np.hypot(middle[:, 0], middle[:, 1])[:, np.newaxis]
+    # The tangents at the ends mirror their neighbors across the chord.
+    first = _mirror(middle[0], _unit(a[0]))
+    last = _mirror(middle[-1], _unit(b[-1]))
+    return np.vstack([first, middle, last])
+
+
+def biarc(p0, t0, p1, t1):
+    """
+    Find the point where the two arcs of a biarc meet, going from `p0` with
+    unit tangent `t0` to `p1` with unit tangent `t1`. The two arcs are made
+    the same length along their tangents. Returns None if there is no such
+    biarc.
+
+    >>> biarc((0, 0), (0, 1), (2, 0), (0, -1))
+    (1.0, 1.0)
+    """
+    v = vec.vfrom(p0, p1)
+    t = vec.add(t0, t1)
+    vt = vec.dot(v, t)
+    vv = vec.dot(v, v)
+    a = 2 * (1 - vec.dot(t0, t1))
+    if a <= epsilon:
+        if vt <= epsilon:
+            return None
+        d = vv / (2 * vt)
+    else:
+        d = (-vt + math.sqrt(vt * vt + a * vv)) / a
+    q0 = vec.add(p0, vec.mul(t0, d))
+    q1 = vec.sub(p1, vec.mul(t1, d))
+    return vec.div(vec.add(q0, q1), 2)
+
+
+def _corner_spans(points):
+    # Split the polyline at sharp corners.
+    min_cos = math.cos(math.radians(CORNER_ANGLE))
+    start = 0
+    for i in range(1, len(points) - 1):
+        u = vec.vfrom(points[i - 1], points[i])
+        v = vec.vfrom(points[i], points[i + 1])
+        if vec.dot(u, v) < min_cos * vec.mag(u) * vec.mag(v):
+            yield points[start:i + 1]
+            start = i
+    if len(points) - start > 1:
+        yield points[start:]
+
+
+def _fit(xy, tangents, tolerance):
+    # Cover the points with pieces, making each one reach as far along the
+    # points as it can. The reach is found by doubling it until a fit fails,
+    # then bisecting.
+    pieces = []
+    i = 0
+    last = len(xy) - 1
+    while i < last:
+        best_j = i + 1
+        best = _fit_span(xy, tangents, i, best_j, tolerance)
+        step = 1
+        bad_j = None
+        while bad_j is None:
+            j = min(i + step * 2, last)
+            if j == best_j:
+                break
+            fit = _fit_span(xy, tangents, i, j, tolerance)
+            if fit is None:
+                bad_j = j
+            else:
+                best_j, best = j, fit
+                step *= 2
+        while bad_j is not None and bad_j - best_j > 1:
+            j = (best_j + bad_j) // 2
+            fit = _fit_span(xy, tangents, i, j, tolerance)
+            if fit is None:
+                bad_j = j
+            else:
+                best_j, best = j, fit
+        pieces.extend(best)
+        i = best_j
+    return pieces
+
+
+def _fit_span(xy, tangents, i, j, tolerance):
+    # Fit a line or a biarc from point i to point j, if one is close enough
+    # to the points in between.
+    a = tuple(xy[i].tolist())
+    b = tuple(xy[j].tolist())
+    between = xy[i + 1:j]
+    line = (a, b, None, 0, None)
+    if j - i == 1 or _max_distance(between, line) <= tolerance:
+        return [line]
+
+    t0 = tuple(tangents[i].tolist())
+    t1 = tuple(tangents[j].tolist())
+    joint = biarc(a, t0, b, t1)
+    if joint is None:
+        return None
+    first = _piece(a, t0, joint)
+    second = _piece(joint, _end_tangent(first), b)
+    pieces = [p for p in (first, second) if not points_equal(p[0], p[1])]
+    distances = np.min([_distances(between, p) for p in pieces], axis=0)
+    if distances.max() > tolerance:
+        return None
+    return pieces
+
+
+def _piece(a, tangent, b):
+    # The arc from a to b leaving a along the tangent, as a tuple of
+    # (a, b, center, arc_angle, tangent). Straight pieces have no center.
+    chord = vec.vfrom(a, b)
+    normal = vec.perp(tangent)
+    offset = vec.dot(normal, chord)
+    chord2 = vec.dot(chord, chord)
+    if abs(offset) <= epsilon * math.sqrt(chord2):
+        return (a, b, None, 0, tangent)
+    radius = chord2 / (2 * offset)
+    center = vec.add(a, vec.mul(normal, radius))
+    cross = tangent[0] * chord[1] - tangent[1] * chord[0]
+    arc_angle = 2 * math.degrees(math.atan2(cross, vec.dot(tangent, chord)))
+    return (a, b, center, arc_angle, tangent)
+
+
+def _end_tangent(piece):
+    a, b, center, arc_angle, tangent = piece
+    if center is None:
+        return vec.norm(vec.vfrom(a, b))
+    return vec.rotate(tangent, math.radians(arc_angle))
+
+
+def _max_distance(xy, piece):
+    if len(xy) == 0:
+        return 0
+    return _distances(xy, piece).max()
+
+
+def _distances(xy, piece):
+    # Distances from each point to the piece.
+    a, b, center, arc_angle, _ = piece
+    if center is None:
+        return np.array([distance_to_segment(p, a, b) for p in xy])
+    ra = np.subtract(a, center)
+    rp = xy - center
+    radius = math.hypot(*ra)
+    # Measure how far around the arc each point is.
+    theta = np.arctan2(
+        ra[0] * rp[:, 1] - ra[1] * rp[:, 0],
+        rp @ ra,
+    )
+    if arc_angle < 0:
+        theta = -theta
+    theta %= 2 * math.pi
+    on_arc = np.abs(np.hypot(rp[:, 0], rp[:, 1]) - radius)
+    to_ends = np.minimum(
+        np.hypot(xy[:, 0] - a[0], xy[:, 1] - a[1]),
+        np.hypot(xy[:, 0] - b[0], xy[:, 1] - b[1]),
+    )
+    inside = theta <= math.radians(abs(arc_angle))
+    return np.where(inside, on_arc, to_ends)
+
+
+def _segment(piece, width, color):
+    a, b, center, arc_angle, tangent = piece
+    if center is None:
+        return LineSegment(a, b, width, color, None, None)
+    start_heading = Heading.from_rad(vec.heading(tangent))
+    radius = math.hypot(a[0] - center[0], a[1] - center[1])
+    if arc_angle < 0:
+        radius = -radius
+    return ArcSegment(
+        a,
+        b,
+        width,
+        color,
+        None,
+        None,
+        center,
+        radius,
+        arc_angle,
+        start_heading,
+        start_heading + arc_angle,
+    )
+
+
+def _unit(v):
+    return v / math.hypot(*v)
+
+
+def _mirror(v, u):
+    # Reflect v across the line along the unit vector u.
+    return 2 * (v @ u) * u - v
@@ -0,0 +1,208 @@
+"""
+A list that can be copied without copying all of its items.
+
+The items are kept in chunks of CHUNK_SIZE, all full except the last one.
+Copying the list only copies the list of chunks, and the copies share the
+chunks until one of them changes a chunk, which copies that chunk first. Like
+a Paper and its paths, each list has a token, and owns the chunks tagged with
+it.
+
+Paper keeps its paths in these, so that copying a paper and then changing one
+path costs no more than the chunk holding that path, and Path keeps its
+segments in these, so that a pen can keep drawing on a path it shares with a
+snapshot without copying the whole path.
+"""
+
+from collections.abc import MutableSequence
+from itertools import chain
+
+CHUNK_SIZE = 64
+
+
+class ChunkedList(MutableSequence):
+    """
+    A list of items in shared chunks.
+
+    If `copy_items` is True, then the items are copied along with a shared
+    chunk, for items such as segments that are changed in place. The items
+    read from a shared chunk are shared too, so use own() to get an item for
+    changing it.
+    """
+
+    def __init__(self, items=(), copy_items=False):
+        self._copy_items = copy_items
+        self._chunks = []
+        self._owners = []
+        self._length = 0
+        self._token = object()
+        # Whether any of the chunks might be shared with another list.
+        self._shared = False
+        self.extend(items)
+
+    def copy(self):
+        """
+        Copy the list, in time proportional to the number of chunks.
+        """
+        other = ChunkedList(copy_items=self._copy_items)
+        other._chunks = list(self._chunks)
+        other._owners = list(self._owners)
+        other._length = self._length
+        # Everything this list owned is now shared between the two.
+        self._token = object()
+        self._shared = other._shared = True
+        return other
+
+    @property
+    def shared(self):
+        """
+        Whether any of the chunks might be shared with another list.
+        """
+        return self._shared
+
+    def own(self, index):
+        """
+        Get the item at `index` for changing it, copying its chunk first if it
+        is shared with another list.
+        """
+        if index == -1 and self._chunks:
+            if self._owners[-1] is self._token:
+                return self._chunks[-1][-1]
+            return self._take(len(self._chunks) - 1)[-1]
+        chunk, offset = self._locate(index)
+        return self._take(chunk)[offset]
+
+    def owns(self, index):
+        """
+        Whether the item at `index` can be changed without copying its chunk.
+        """
+        chunk, _ = self._locate(index)
+        return self._owners[chunk] is self._token
+
+    def own_all(self):
+        """
+        Copy every chunk that is shared with another list.
+        """
+        if self._shared:
+            for i in range(len(self._chunks)):
+                self._take(i)
+            self._shared = False
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        return chain.from_iterable(self._chunks)
+
+    def __reversed__(self):
+        for chunk in reversed(self._chunks):
+            yield from reversed(chunk)
+
+    def __getitem__(self, index):
+        if index == -1 and self._chunks:
+            return self._chunks[-1][-1]
+        if isinstance(index, slice):
+            return self._slice(index)
+        chunk, offset = self._locate(index)
+        return self._chunks[chunk][offset]
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            items = self._items()
+            items[index] = value
+            self._set_items(items)
+        else:
+            chunk, offset = self._locate(index)
+            self._take(chunk)[offset] = value
+
+    def __delitem__(self, index):
+        items = self._items()
+        del items[index]
+        self._set_items(items)
+
+    def __eq__(self, other):
+        if isinstance(other, (list, ChunkedList)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return 'ChunkedList({!r})'.format(list(self))
+
+    def insert(self, index, value):
+        if index >= self._length:
+            self.append(value)
+            return
+        items = self._items()
+        items.insert(index, value)
+        self._set_items(items)
+
+    def append(self, value):
+        chunks = self._chunks
+        if chunks and len(chunks[-1]) < CHUNK_SIZE:
+            if self._owners[-1] is self._token:
+                chunks[-1].append(value)
+            else:
+                self._take(len(chunks) - 1).append(value)
+        else:
+            chunks.append([value])
+            self._owners.append(self._token)
+        self._length += 1
+
+    def extend(self, values):
+        for value in list(values):
+            self.append(value)
+
+    def reverse(self):
+        items = self._items()
+        items.reverse()
+        self._set_items(items)
+
+    def clear(self):
+        self._set_items([])
+
+    def _locate(self, index):
+        # Find the chunk holding an item, and its place in the chunk.
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError('list index out of range')
+        return divmod(index, CHUNK_SIZE)
+
+    def _take(self, i):
+        chunk = self._chunks[i]
+        if self._owners[i] is not self._token:
+            if self._copy_items:
+                chunk = [item.copy() for item in chunk]
+            else:
+                chunk = list(chunk)
+            self._chunks[i] = chunk
+            self._owners[i] = self._token
+        return chunk
+
+    def _slice(self, index):
+        start, stop, step = index.indices(self._length)
+        if step != 1:
+            return list(self)[index]
+        items = []
+        chunk, offset = divmod(start, CHUNK_SIZE)
+        while start < stop:
+            end = min(CHUNK_SIZE, offset + stop - start)
+            items.extend(self._chunks[chunk][offset:end])
+            start += end - offset
+            chunk += 1
+            offset = 0
+        return items
+
+    def _items(self):
+        # All the items in a plain list, for changes that move them between
+        # chunks.
+        self.own_all()
+        return list(self)
+
+    def _set_items(self, items):
+        self._chunks = [
+            items[i:i + CHUNK_SIZE]
+            for i in range(0, len(items), CHUNK_SIZE)
+        ]
+        self._owners = [self._token] * len(self._chunks)
+        self._length = len(items)
+        self._shared = False
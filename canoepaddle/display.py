@@ -0,0 +1,200 @@
+"""
+A display list of everything drawn on a paper, independent of output format.
+
+Drawing modes turn each path into filled shapes, which takes most of the time
+spent writing a drawing out. A display list does that once, and keeps the
+result as flat arrays of move, line, arc and close commands, with a fill
+color for each element. Outputs such as svg, raster images and JSON can then
+all be made from the same display list.
+"""
+
+import json
+
+import numpy as np
+
+from .raster import flatten_arc
+from .segment import segment_bounds
+from .svg import html_color, path_data, path_element, MOVE, LINE, ARC, CLOSE
+
+COMMAND_NAMES = ['move', 'line', 'arc', 'close']
+
+
+class DisplayList:
+    """
+    The filled elements of a drawing, from bottom to top.
+
+    `commands` holds a command code for each command, and `coords` has a
+    matching row of (x, y, center_x, center_y, radius, arc_angle) for each.
+    Moves and lines only use x and y, and closes use nothing. Element i is
+    made of the commands from `starts[i]` up to `starts[i + 1]`, is filled
+    with `colors[i]`, lies within `bounds[i]`, and was drawn for the path at
+    `path_indexes[i]` on the paper.
+    """
+
+    def __init__(
+        self, commands, coords, starts, colors, bounds, path_indexes,
+    ):
+        self.commands = commands
+        self.coords = coords
+        self.starts = starts
+        self.colors = colors
+        self.bounds = bounds
+        self.path_indexes = path_indexes
+
+    @classmethod
+    def from_paper(cls, paper):
+        commands = []
+        coords = []
+        starts = []
+        colors = []
+        path_indexes = []
+        bounds = []
+        for path_index, path in enumerate(paper._paths):
+            # Find the bounds of the elements of each path at once.
+            segments = []
+            segment_starts = []
+            for color, fill_paths in path.mode.iter_fill(path):
+                starts.append(len(commands))
+                colors.append(color)
+                path_indexes.append(path_index)
+                segment_starts.append(len(segments))
+                for fill_path in fill_paths:
+                    path_commands, path_coords = fill_path.render_commands()
+                    commands.extend(path_commands)
+                    # Keep the rows as arrays, rather than holding on to a
+                    # tuple for every command.
+                    coords.append(np.array(path_coords, dtype=float))
+                    segments.extend(fill_path.segments)
+            if segments:
+                bounds.append(_element_bounds(segments, segment_starts))
+        starts.append(len(commands))
+        return cls(
+            np.array(commands, dtype=np.uint8),
+            np.concatenate(coords + [np.empty((0, 6))]),
+            np.array(starts, dtype=np.intp),
+            colors,
+            np.concatenate(bounds + [np.empty((0, 4))]),
+            np.array(path_indexes, dtype=np.intp),
+        )
+
+    def __len__(self):
+        return len(self.colors)
+
+    def element(self, index):
+        """
+        Get the color, command codes and coordinates of an element.
+        """
+        start = self.starts[index]
+        end = self.starts[index + 1]
+        return (
+            self.colors[index],
+            self.commands[start:end],
+            self.coords[start:end],
+        )
+
+    def path_data(self, index, precision):
+        """
+        Write an element as svg path data.
+        """
+        _, commands, coords = self.element(index)
+        return path_data(commands.tolist(), coords.tolist(), precision)
+
+    def path_ranges(self, path_count):
+        """
+        Get the range of element indexes drawn for each of the first
+        `path_count` paths.
+        """
+        ends = np.searchsorted(
+            self.path_indexes,
+            np.arange(path_count),
+            side='right',
+        ).tolist()
+        return [
+            range(start, end)
+            for start, end in zip([0] + ends[:-1], ends)
+        ]
+
+    def render_bounds(self, index, precision):
+        """
+        Get the color, svg path data and bounds of an element, as with
+        Mode.iter_render_bounds().
+        """
+        return (
+            self.colors[index],
+            self.path_data(index, precision),
+            tuple(self.bounds[index].tolist()),
+        )
+
+    def svg_elements(self, precision):
+        """
+        Make an svg path element for each element.
+        """
+        return [
+            path_element(self.path_data(i, precision), self.colors[i])
+            for i in range(len(self))
+        ]
+
+    def polygons(self, index, tolerance):
+        """
+        Turn an element into a list of polygons, with arcs split into lines
+        no further than `tolerance` from the true arc.
+        """
+        _, commands, coords = self.element(index)
+        polygons = []
+        polygon = None
+        for command, (x, y, cx, cy, radius, arc_angle) in zip(
+            commands.tolist(),
+            coords.tolist(),
+        ):
+            if command == MOVE:
+                polygon = [(x, y)]
+                polygons.append(polygon)
+            elif command == LINE:
+                polygon.append((x, y))
+            elif command == ARC:
+                polygon.extend(flatten_arc(
+                    polygon[-1], (x, y), (cx, cy), radius, arc_angle,
+                    tolerance,
+                ))
+        return polygons
+
+    def json_data(self):
+        """
+        Make a structure of plain lists and dictionaries for the display list,
+        which can be written as JSON.
+        """
+        elements = []
+        for i in range(len(self)):
+            _, commands, coords = self.element(i)
+            element_commands = []
+            for command, (x, y, cx, cy, radius, arc_angle) in zip(
+                commands.tolist(),
+                coords.tolist(),
+            ):
+                if command == ARC:
+                    values = [x, y, cx, cy, radius, arc_angle]
+                elif command == CLOSE:
+                    values = []
+                else:
+                    values = [x, y]
+                element_commands.append([COMMAND_NAMES[command]] + values)
+            elements.append({
+                'color': html_color(self.colors[i]),
+                'commands': element_commands,
+            })
+        return {'elements': elements}
+
+    def format_json(self):
+        return json.dumps(self.json_data())
+
+
+def _element_bounds(segments, starts):
+    # Combine the bounds of the segments of each element, which start at
+    # `starts` in the list of the segments of all of them.
+    bounds = segment_bounds(segments)
+    return np.column_stack([
+        np.minimum.reduceat(bounds[:, 0], starts),
+        np.minimum.reduceat(bounds[:, 1], starts),
+        np.maximum.reduceat(bounds[:, 2], starts),
+        np.maximum.reduceat(bounds[:, 3], starts),
+    ])
@@ -1,9 +1,17 @@
 from collections import defaultdict
 import itertools
-from math import sqrt
+from math import sqrt, atan2, degrees
+
+import numpy as np
 
 import vec
-from .point import float_equal, points_equal, epsilon
+from .point import (
+    float_equal,
+    points_equal,
+    epsilon,
+    point_key,
+    neighbor_keys,
+)
 
 
 def closest_point_to(target, points):
@@ -172,6 +180,180 @@ def intersect_circles(center1, radius1, center2, radius2):
     ]
 
 
+def intersect_lines_array(a, b, c, d, segment=False):
+    """
+    Find the intersections of many pairs of lines a-b and c-d at once, like
+    intersect_lines(). Each argument is an array of points, with one row per
+    pair.
+
+    Returns an array of intersection points, and a boolean array of which
+    pairs have one. Points for pairs with no intersection are NaN.
+
+    >>> points, found = intersect_lines_array(
+    ...     [(0, 0), (0, 0)], [(2, 2), (1, 0)],
+    ...     [(0, 2), (0, 1)], [(2, 0), (1, 1)],
+    ... )
+    >>> points.tolist(), found.tolist()
+    ([[1.0, 1.0], [nan, nan]], [True, False])
+    """
+    a, b, c, d = _point_arrays(a, b, c, d)
+    u = b - a
+    v = d - c
+    w = a - c
+
+    u_perp_dot_v = _perp_dot(u, v)
+    found = np.abs(u_perp_dot_v) > epsilon
+    with np.errstate(divide='ignore', invalid='ignore'):
+        s = _perp_dot(v, w) / u_perp_dot_v
+        t = _perp_dot(u, w) / u_perp_dot_v
+        points = a + u * s[:, np.newaxis]
+    if segment:
+        found &= (s >= 0) & (s <= 1) & (t >= 0) & (t <= 1)
+
+    points[~found] = np.nan
+    return points, found
+
+
+def intersect_circle_line_array(center, radius, line_start, line_end):
+    """
+    Find the intersections of many circles with many lines at once, like
+    intersect_circle_line(). Each argument is an array with one row per pair.
+
+    Returns an array with two points for each pair, and a boolean array of
+    which of those points are intersections. A tangent line only has the
+    first point.
+
+    >>> points, found = intersect_circle_line_array(
+    ...     [(0, 0), (0, 0)], [1, 1],
+    ...     [(-2, 0), (-2, 1)], [(2, 0), (2, 1)],
+    ... )
+    >>> points[0].tolist(), found.tolist()
+    ([[-1.0, 0.0], [1.0, 0.0]], [[True, True], [True, False]])
+    """
+    center, line_start, line_end = _point_arrays(center, line_start, line_end)
+    radius = np.abs(np.asarray(radius, dtype=float))
+
+    # Degenerate pairs give NaN and infinite values on the way.
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Find the distance from the center to the line, to check whether the
+        # line is too far away, or if we have a single point of contact.
+        r = line_start - center
+        line = line_end - line_start
+        v = np.column_stack([-line[:, 1], line[:, 0]])
+        d = v * ((r * v).sum(axis=1) / (v * v).sum(axis=1))[:, np.newaxis]
+        dist = np.hypot(d[:, 0], d[:, 1])
+        tangent = np.abs(dist - radius) <= epsilon
+        crossing = ~tangent & (dist <= radius)
+
+        # Solve for the parameters along the line of the intersection
+        # points, as in quadratic_formula().
+        dx, dy = (line_start - center).T
+        qa = (line * line).sum(axis=1)
+        qb = 2 * (line[:, 0] * dx + line[:, 1] * dy)
+        qc = dx**2 + dy**2 - radius**2
+        root = np.sqrt(np.maximum(qb**2 - 4 * qa * qc, 0))
+        q = np.where(qb >= 0, -qb - root, -qb + root)
+        t_near = q / (2 * qa)
+        t_far = (2 * qc) / q
+        t0 = np.where(qb >= 0, t_near, t_far)
+        t1 = np.where(qb >= 0, t_far, t_near)
+
+        points = np.stack([
+            line_start + line * t0[:, np.newaxis],
+            line_start + line * t1[:, np.newaxis],
+        ], axis=1)
+        points[tangent, 0] = (center + d)[tangent]
+    found = np.column_stack([tangent | crossing, crossing])
+    points[~found] = np.nan
+    return points, found
+
+
+def intersect_circles_array(center1, radius1, center2, radius2):
+    """
+    Find the intersections of many pairs of circles at once, like
+    intersect_circles(). Each argument is an array with one row per pair.
+
+    Returns an array with two points for each pair, and a boolean array of
+    which of those points are intersections. Tangent circles only have the
+    first point.
+
+    >>> points, found = intersect_circles_array(
+    ...     [(0, 0), (0, 0)], [1, 1],
+    ...     [(2, 0), (5, 0)], [1, 1],
+    ... )
+    >>> points[0, 0].tolist(), found.tolist()
+    ([1.0, 0.0], [[True, False], [False, False]])
+    """
+    center1, center2 = _point_arrays(center1, center2)
+    radius1 = np.abs(np.asarray(radius1, dtype=float))
+    radius2 = np.abs(np.asarray(radius2, dtype=float))
+
+    # Put the larger circle first.
+    swap = radius2 > radius1
+    center1, center2 = (
+        np.where(swap[:, np.newaxis], center2, center1),
+        np.where(swap[:, np.newaxis], center1, center2),
+    )
+    radius1, radius2 = (
+        np.where(swap, radius2, radius1),
+        np.where(swap, radius1, radius2),
+    )
+
+    # Degenerate pairs give NaN and infinite values on the way.
+    with np.errstate(divide='ignore', invalid='ignore'):
+        transverse = center2 - center1
+        dist2 = (transverse * transverse).sum(axis=1)
+        dist = np.sqrt(dist2)
+
+        # Concentric circles have either no points or all points in common,
+        # and either way have no intersections.
+        concentric = np.all(np.abs(transverse) <= epsilon, axis=1)
+        radius_sum = radius1 + radius2
+        radius_difference = np.abs(radius1 - radius2)
+        tangent = ~concentric & (
+            (np.abs(dist - radius_sum) <= epsilon)
+            | (np.abs(dist - radius_difference) <= epsilon)
+        )
+        crossing = (
+            ~concentric & ~tangent
+            & (dist <= radius_sum) & (dist >= radius_difference)
+        )
+
+        # See intersect_circles() for how the points are found.
+        unit = transverse / dist[:, np.newaxis]
+        x = (dist2 - radius2**2 + radius1**2) / (2 * dist)
+        chord = (1 / dist) * np.sqrt(np.maximum(
+            (-dist + radius1 - radius2)
+            * (-dist - radius1 + radius2)
+            * (-dist + radius1 + radius2)
+            * (dist + radius1 + radius2),
+            0,
+        ))
+        chord_middle = center1 + unit * x[:, np.newaxis]
+        perp = np.column_stack([-unit[:, 1], unit[:, 0]])
+        offset = perp * (chord / 2)[:, np.newaxis]
+        points = np.stack(
+            [chord_middle + offset, chord_middle - offset],
+            axis=1,
+        )
+        touch = center1 + unit * radius1[:, np.newaxis]
+        points[tangent, 0] = touch[tangent]
+    found = np.column_stack([tangent | crossing, crossing])
+    points[~found] = np.nan
+    return points, found
+
+
+def _point_arrays(*point_lists):
+    return [
+        np.asarray(points, dtype=float).reshape(-1, 2)
+        for points in point_lists
+    ]
+
+
+def _perp_dot(u, v):
+    return u[:, 0] * v[:, 1] - u[:, 1] * v[:, 0]
+
+
 def pairwise(iterable):
     """s -> (s0,s1), (s1,s2), (s2, s3), ...
 
@@ -202,24 +384,158 @@ def collinear(*points):
     return True
 
 
+def distance_to_segment(p, a, b):
+    """
+    Find the distance from point p to the line segment from a to b.
+
+    >>> distance_to_segment((1, 1), (0, 0), (2, 0))
+    1.0
+    >>> distance_to_segment((3, 1), (0, 0), (2, 0))
+    1.4142135623730951
+    """
+    ax, ay = a
+    dx = b[0] - ax
+    dy = b[1] - ay
+    px = p[0] - ax
+    py = p[1] - ay
+    length2 = dx * dx + dy * dy
+    if length2 > 0:
+        t = max(0, min(1, (px * dx + py * dy) / length2))
+        px -= t * dx
+        py -= t * dy
+    return sqrt(px * px + py * py)
+
+
+def distance_to_arc(p, center, a, b, arc_angle):
+    """
+    Find the distance from point p to the arc around `center` from a to b,
+    which turns `arc_angle` degrees, counterclockwise if positive.
+
+    >>> distance_to_arc((0, 2), (0, 0), (1, 0), (0, 1), 90)
+    1.0
+    >>> distance_to_arc((0, -1), (0, 0), (1, 0), (0, 1), 90)
+    1.4142135623730951
+    """
+    ax = a[0] - center[0]
+    ay = a[1] - center[1]
+    px = p[0] - center[0]
+    py = p[1] - center[1]
+    # Measure how far around the arc the point is.
+    theta = degrees(atan2(ax * py - ay * px, ax * px + ay * py))
+    if arc_angle < 0:
+        theta = -theta
+    if theta % 360 <= abs(arc_angle):
+        return abs(sqrt(px * px + py * py) - sqrt(ax * ax + ay * ay))
+    # Otherwise the nearest point of the arc is one of its ends.
+    return min(
+        sqrt((p[0] - a[0]) ** 2 + (p[1] - a[1]) ** 2),
+        sqrt((p[0] - b[0]) ** 2 + (p[1] - b[1]) ** 2),
+    )
+
+
+def douglas_peucker(points, tolerance):
+    """
+    Simplify a polyline with the Douglas-Peucker algorithm, and give the
+    indexes of the points to keep. Every dropped point is within `tolerance`
+    of the simplified line.
+
+    >>> douglas_peucker([(0, 0), (1, 0.01), (2, 0), (3, 1), (4, 2)], 0.1)
+    [0, 2, 4]
+    """
+    n = len(points)
+    if n < 3:
+        return list(range(n))
+    xy = np.array(points, dtype=float)
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        a = xy[first]
+        d = xy[last] - a
+        p = xy[first + 1:last] - a
+        length2 = d @ d
+        if length2 > 0:
+            t = np.clip(p @ d / length2, 0, 1)
+            p = p - t[:, np.newaxis] * d
+        distances = np.hypot(p[:, 0], p[:, 1])
+        index = int(distances.argmax())
+        if distances[index] > tolerance:
+            index += first + 1
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    return np.nonzero(keep)[0].tolist()
+
+
+def sample_curve(func, start, end, tolerance, intervals=16, max_depth=16):
+    """
+    Sample the parametric curve `func` from `start` to `end`, so that the
+    polyline through the samples is within `tolerance` of the curve.
+
+    The range is first split into `intervals` equal steps, so that small
+    features are not skipped over, then each step is halved until the curve
+    is close enough to the chord at its middle and at its quarters. Checking
+    the quarters as well catches a curve that crosses the chord in the
+    middle, like a whole wave of a sine. Returns a list of (t, point) pairs.
+
+    >>> samples = sample_curve(lambda t: (t, t * t), 0, 1, 0.01, intervals=1)
+    >>> [t for t, p in samples]
+    [0, 0.125, 0.25, 0.375, 0.5, 0.75, 1]
+    """
+    ts = [start]
+    ts.extend(
+        start + (end - start) * i / intervals for i in range(1, intervals)
+    )
+    ts.append(end)
+    samples = [(ts[0], func(ts[0]))]
+    for t1 in ts[1:]:
+        # Depth-first, so that the samples come out in order.
+        t0, p0 = samples[-1]
+        stack = [(t1, func(t1), 0)]
+        while stack:
+            t1, p1, depth = stack[-1]
+            t_mid = (t0 + t1) / 2
+            p_mid = func(t_mid)
+            if depth < max_depth and (
+                distance_to_segment(p_mid, p0, p1) > tolerance
+                or distance_to_segment(
+                    func((t0 + t_mid) / 2), p0, p1,
+                ) > tolerance
+                or distance_to_segment(
+                    func((t_mid + t1) / 2), p0, p1,
+                ) > tolerance
+            ):
+                stack.append((t_mid, p_mid, depth + 1))
+            else:
+                stack.pop()
+                samples.append((t1, p1))
+                t0, p0 = t1, p1
+    return samples
+
+
 def find_point_pairs(points):
     """
     Collect pairs of points that are in the same spot, with no other
     points nearby.
     """
 
-    # Construct an equality graph.
-    # TODO: Optimize this using a grid hash, it's O(N^2) right now.
-    # http://programmers.stackexchange.com/questions/129892
+    # Construct an equality graph. Only points in neighboring grid cells can
+    # be equal, so we only compare against those.
     graph = defaultdict(list)
+    grid = defaultdict(list)
     n = len(points)
     for i in range(n):
         a = points[i]
-        for j in range(i + 1, n):
-            b = points[j]
-            if points_equal(a, b):
-                graph[i].append(j)
-                graph[j].append(i)
+        key = point_key(a)
+        for neighbor_key in neighbor_keys(key):
+            for j in grid.get(neighbor_key, ()):
+                if points_equal(a, points[j]):
+                    graph[i].append(j)
+                    graph[j].append(i)
+        grid[key].append(i)
 
     # If two points are paired, then they will each only have one
     # neighbor, each other.
@@ -238,3 +554,114 @@ def find_point_pairs(points):
                 paired_indexes.add(j)
 
     return pairs
+
+
+def cluster_points(points):
+    """
+    Group together points that are in the same spot. Returns the group
+    number of each point, and the point that each group is in.
+
+    The point of a group is its first member, which every other member is
+    equal to. Two members may not be equal to each other, so snap them to
+    the point of their group before treating them as the same.
+
+    >>> clusters, shared = cluster_points([(0, 0), (1, 0), (0, 0), (1e-12, 0)])
+    >>> clusters, shared
+    ([0, 1, 0, 0], [(0, 0), (1, 0)])
+    """
+    grid = defaultdict(list)
+    representatives = []
+    clusters = []
+    for p in points:
+        key = point_key(p)
+        cluster = None
+        for neighbor_key in neighbor_keys(key):
+            for c in grid.get(neighbor_key, ()):
+                if points_equal(p, representatives[c]):
+                    cluster = c
+                    break
+            if cluster is not None:
+                break
+        if cluster is None:
+            cluster = len(representatives)
+            representatives.append(p)
+            grid[key].append(cluster)
+        clusters.append(cluster)
+    return clusters, representatives
+
+
+def find_near_point_pairs(points, tolerance, groups=None):
+    """
+    Pair up points that are within `tolerance` of each other, closest pairs
+    first. Each point is in at most one pair. If `groups` is given, points in
+    the same group are never paired.
+
+    >>> find_near_point_pairs([(0, 0), (5, 0), (0.1, 0), (0.15, 0)], 0.2)
+    [(2, 3)]
+    """
+    xy = np.array(points, dtype=float).reshape(-1, 2)
+    if len(xy) == 0:
+        return []
+
+    # Only points in neighboring grid cells can be close enough. Number the
+    # occupied rows and columns of the grid, so that the cell keys stay small
+    # no matter how small the tolerance is.
+    cells = np.floor(xy / tolerance).astype(np.int64)
+    ux, rx = np.unique(cells[:, 0], return_inverse=True)
+    uy, ry = np.unique(cells[:, 1], return_inverse=True)
+    keys = rx * len(uy) + ry
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+
+    # Look up neighbors in key order, which makes the searches fast.
+    rx = rx[order]
+    ry = ry[order]
+    candidates = []
+    for dx, dy in [(0, 0), (0, 1), (1, -1), (1, 0), (1, 1)]:
+        nx = _neighbor_rank(ux, rx, dx)
+        ny = _neighbor_rank(uy, ry, dy)
+        source = np.nonzero((nx >= 0) & (ny >= 0))[0]
+        target = nx[source] * len(uy) + ny[source]
+        lo = np.searchsorted(sorted_keys, target, 'left')
+        hi = np.searchsorted(sorted_keys, target, 'right')
+        counts = hi - lo
+        i = np.repeat(source, counts)
+        starts = np.cumsum(counts) - counts
+        offsets = np.arange(counts.sum()) - np.repeat(starts, counts)
+        j = np.repeat(lo, counts) + offsets
+        if dx == dy == 0:
+            # Compare points in the same cell only once.
+            keep = i < j
+            i, j = i[keep], j[keep]
+        candidates.append((order[i], order[j]))
+
+    i = np.concatenate([c[0] for c in candidates])
+    j = np.concatenate([c[1] for c in candidates])
+    d = np.hypot(xy[i, 0] - xy[j, 0], xy[i, 1] - xy[j, 1])
+    keep = d <= tolerance
+    if groups is not None:
+        groups = np.asarray(groups)
+        keep &= groups[i] != groups[j]
+    i, j, d = i[keep], j[keep], d[keep]
+    i, j = np.minimum(i, j), np.maximum(i, j)
+    by_distance = np.argsort(d, kind='stable')
+
+    # Greedily take the closest pairs.
+    pairs = []
+    paired = bytearray(len(xy))
+    for a, b in zip(i[by_distance].tolist(), j[by_distance].tolist()):
+        if paired[a] or paired[b]:
+            continue
+        paired[a] = paired[b] = 1
+        pairs.append((a, b))
+    return pairs
+
+
+def _neighbor_rank(values, ranks, offset):
+    # Find the rank of each value plus offset in the sorted unique values,
+    # or -1 if it is not present.
+    if offset == 0:
+        return ranks
+    neighbor = np.clip(ranks + offset, 0, len(values) - 1)
+    present = values[neighbor] == values[ranks] + offset
+    return np.where(present, neighbor, -1)
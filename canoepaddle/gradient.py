@@ -0,0 +1,173 @@
+"""
+Draw strokes that change color along their length with svg gradients.
+
+Normally a stroke is outlined separately for each run of one color, so a
+smoothly colored stroke turns into one element per color. Instead, each
+continuous stroke is split into chunks that turn no more than 90 degrees,
+and each chunk is outlined once and filled with a linear gradient along it.
+Within such a chunk the stroke always moves forward along the gradient, so
+the colors come out in order.
+"""
+
+import math
+
+from .mode import FillMode, StrokeMode
+from .path import draw_thick_segments
+from .point import points_equal
+from .segment import ArcSegment
+from .svg import html_color, number, path_element
+
+MAX_CHUNK_TURN = 90
+
+
+def gradient_svg(path, precision, ids):
+    """
+    Make svg elements for a stroked path, using gradients for the parts of it
+    that change color. Gradient ids are numbered from the iterator `ids`.
+
+    Returns None if the path has no continuous parts that change color, so it
+    can be drawn as usual.
+    """
+    if type(path.mode) is not StrokeMode:
+        return None
+    runs = list(_continuous_runs(path.segments))
+    if not any(_has_varying_color(run) for run in runs):
+        return None
+
+    elements = []
+    for run in runs:
+        # Chunks that don't change color are drawn as usual, one outline per
+        # color.
+        solid = []
+        for chunk in _chunks(run):
+            element = None
+            if _has_varying_color(chunk):
+                element = _gradient_element(chunk, precision, ids)
+            if element is None:
+                solid.extend(chunk)
+            else:
+                elements.extend(_solid_elements(solid, precision))
+                solid = []
+                elements.append(element)
+        elements.extend(_solid_elements(solid, precision))
+    return ''.join(elements)
+
+
+def _solid_elements(segments, precision):
+    for group in _color_groups(segments):
+        yield path_element(_outline_data(group, precision), group[0].color)
+
+
+def _continuous_runs(segments):
+    run = []
+    for seg in segments:
+        if run and not points_equal(run[-1].b, seg.a):
+            yield run
+            run = []
+        run.append(seg)
+    if run:
+        yield run
+
+
+def _has_varying_color(segments):
+    first = html_color(segments[0].color)
+    return any(html_color(seg.color) != first for seg in segments[1:])
+
+
+def _color_groups(segments):
+    group = []
+    for seg in segments:
+        if group and seg.color != group[-1].color:
+            yield group
+            group = []
+        group.append(seg)
+    if group:
+        yield group
+
+
+def _chunks(run):
+    # Split the run wherever it has turned too far.
+    chunk = []
+    turn = 0
+    for seg in run:
+        seg_turn = _segment_turn(seg)
+        if chunk:
+            seg_turn += abs(
+                chunk[-1].end_heading.angle_to(seg.start_heading).theta
+            )
+            if turn + seg_turn > MAX_CHUNK_TURN:
+                yield chunk
+                chunk = []
+                seg_turn = _segment_turn(seg)
+                turn = 0
+        chunk.append(seg)
+        turn += seg_turn
+    if chunk:
+        yield chunk
+
+
+def _segment_turn(seg):
+    if isinstance(seg, ArcSegment):
+        return abs(seg.arc_angle.theta)
+    return 0
+
+
+def _gradient_element(chunk, precision, ids):
+    start = chunk[0].a
+    end = chunk[-1].b
+    if points_equal(start, end):
+        return None
+    axis = (end.x - start.x, end.y - start.y)
+    length2 = axis[0] ** 2 + axis[1] ** 2
+
+    # Put each color at the middle of its segment.
+    stops = []
+    for seg in chunk:
+        middle = _middle(seg)
+        offset = (
+            (middle[0] - start.x) * axis[0] + (middle[1] - start.y) * axis[1]
+        ) / length2
+        offset = min(1, max(0, offset))
+        stops.append('<stop offset="{}" stop-color="{}" />'.format(
+            number(offset, precision),
+            html_color(seg.color),
+        ))
+
+    gradient_id = 'gradient-{}'.format(next(ids))
+    return (
+        '<linearGradient id="{id}" gradientUnits="userSpaceOnUse" '
+        'x1="{x1}" y1="{y1}" x2="{x2}" y2="{y2}">{stops}</linearGradient>'
+        '<path d="{path_data}" fill="url(#{id})" />'
+    ).format(
+        id=gradient_id,
+        x1=number(start.x, precision),
+        y1=number(-start.y, precision),
+        x2=number(end.x, precision),
+        y2=number(-end.y, precision),
+        stops=''.join(stops),
+        path_data=_outline_data(chunk, precision),
+    )
+
+
+def _middle(seg):
+    if not isinstance(seg, ArcSegment):
+        return ((seg.a.x + seg.b.x) / 2, (seg.a.y + seg.b.y) / 2)
+    # Rotate the start point halfway around the arc.
+    center = seg.center
+    theta = seg.arc_angle.rad / 2
+    x = seg.a.x - center.x
+    y = seg.a.y - center.y
+    return (
+        center.x + x * math.cos(theta) - y * math.sin(theta),
+        center.y + x * math.sin(theta) + y * math.cos(theta),
+    )
+
+
+def _outline_data(segments, precision):
+    # Outline the segments as a single filled shape.
+    from .pen import Pen
+    pen = Pen()
+    pen.set_mode(FillMode())
+    loop = points_equal(segments[-1].b, segments[0].a)
+    draw_thick_segments(pen, segments, loop=loop)
+    return ' '.join(p.render_path(precision) for p in pen.paper.paths)
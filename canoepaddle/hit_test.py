@@ -0,0 +1,170 @@
+"""
+Find what is drawn near a point, as an editor does when pointing at a drawing.
+
+The segments of a drawing are listed in a grid by their bounds, and their end
+points in another grid, so that a query only looks at the few segments close
+to the point, however large the drawing is.
+
+A pen only ever adds segments to the end of the last path. Joining segments
+changes the corners of their outlines, but not their center lines, which are
+what the queries measure from, so the index keeps up with drawing by adding
+just the new segments. The segments are listed by their path and their
+position in it, so when a pen copies a path that it shares with a snapshot,
+the copy just takes the place of the original.
+"""
+
+import numpy as np
+
+from .geometry import distance_to_segment, distance_to_arc
+from .segment import ArcSegment, segment_bounds
+from .spatial import BoxGrid, PointGrid
+
+
+class SegmentIndex:
+    """
+    An index of the segments in a list of paths, from bottom to top.
+
+    Call touch() with a path before adding segments to it, or after adding
+    it to the top of the list, and the index catches up with it in update().
+    Call replace() when a path is replaced by a copy that is only going to
+    have segments added. Any other change to the paths needs a new index.
+    """
+
+    def __init__(self, paths):
+        segments = [seg for path in paths for seg in path.segments]
+        if segments:
+            bounds = segment_bounds(segments)
+        else:
+            bounds = np.empty((0, 4))
+        self._boxes = BoxGrid.for_boxes(bounds)
+        self._ends = PointGrid(self._boxes.cell_size)
+        # The paths by their stacking order, and the stacking order and
+        # number of indexed segments of each path. Segments are listed as
+        # (order, position) pairs.
+        self._paths = []
+        self._order = {}
+        self._counts = {}
+        self._size = 0
+        # Paths that have been touched since the last update.
+        self._dirty = set()
+        self._built_count = len(segments)
+
+        rows = iter(bounds.tolist())
+        for path in paths:
+            self.touch(path)
+            for position, seg in enumerate(path.segments):
+                self._add(path, position, seg, next(rows))
+            self._counts[path] = len(path.segments)
+        self._dirty.clear()
+
+    def __len__(self):
+        return self._size
+
+    def outgrown(self):
+        """
+        Whether the drawing has more than doubled in size since the index was
+        made, so that the grid should be sized again.
+        """
+        return len(self) > 2 * max(self._built_count, 1)
+
+    def covers(self, paths):
+        """
+        Whether the index is still for this list of paths, as far as a quick
+        look can tell.
+        """
+        if len(paths) != len(self._paths):
+            return False
+        return not paths or (
+            paths[0] is self._paths[0] and paths[-1] is self._paths[-1]
+        )
+
+    def touch(self, path):
+        if path not in self._order:
+            self._order[path] = len(self._paths)
+            self._paths.append(path)
+        self._dirty.add(path)
+
+    def replace(self, old, new):
+        """
+        Put a copy of a path in the place of the original.
+        """
+        order = self._order.pop(old)
+        self._order[new] = order
+        self._paths[order] = new
+        self._counts[new] = self._counts.pop(old, 0)
+        self._dirty.discard(old)
+        self.touch(new)
+
+    def update(self):
+        dirty = self._dirty
+        self._dirty = set()
+        for path in dirty:
+            segments = path.segments
+            start = self._counts.get(path, 0)
+            for position, seg in enumerate(segments[start:], start):
+                self._add(path, position, seg, seg.bounds())
+            self._counts[path] = len(segments)
+
+    def hit_test(self, point, tolerance):
+        """
+        Find the segments within `tolerance` of `point`, counting half the
+        width of thick segments. Returns a list of (path, segment) pairs,
+        topmost first.
+        """
+        x, y = point
+        hits = []
+        for key in self._boxes.overlapping((
+            x - tolerance, y - tolerance,
+            x + tolerance, y + tolerance,
+        )):
+            path, seg = self._segment(key)
+            if _distance(point, seg) <= tolerance + _half_width(seg):
+                hits.append((key, path, seg))
+        hits.sort(key=lambda hit: hit[0], reverse=True)
+        return [(path, seg) for _, path, seg in hits]
+
+    def nearest_endpoint(self, point):
+        """
+        Find the segment end point nearest to `point`, as a (distance, point,
+        path, segment) tuple. Returns None if there are no segments.
+        """
+        nearest = self._ends.nearest(point)
+        if nearest is None:
+            return None
+        distance, end, key = nearest
+        path, seg = self._segment(key)
+        return distance, end, path, seg
+
+    def _segment(self, key):
+        order, position = key
+        path = self._paths[order]
+        return path, path.segments[position]
+
+    def _add(self, path, position, seg, bounds):
+        # Everything within half the width of the center line is inside the
+        # bounds widened by that much, however the corners change later.
+        left, bottom, right, top = bounds
+        half = _half_width(seg)
+        key = (self._order[path], position)
+        self._boxes.insert(
+            (left - half, bottom - half, right + half, top + half),
+            key,
+        )
+        self._ends.insert(seg.a, key)
+        self._ends.insert(seg.b, key)
+        self._size += 1
+
+
+def _half_width(seg):
+    if seg.width is None:
+        return 0
+    return seg.width / 2
+
+
+def _distance(point, seg):
+    # The distance from the point to the center line of the segment.
+    if isinstance(seg, ArcSegment):
+        return distance_to_arc(
+            point, seg.center, seg.a, seg.b, seg.arc_angle.theta,
+        )
+    return distance_to_segment(point, seg.a, seg.b)
@@ -0,0 +1,401 @@
+"""
+Find where the outlines in a drawing cross or run along each other.
+
+Before a drawing is sent off to be cut or engraved, any place where outlines
+cross, or where two outlines share an edge, is usually a mistake. Checking
+every pair of outline edges is far too slow for large drawings, so instead
+the edges are put into horizontal rows, and within each row they are sorted
+from left to right, so that only edges whose bounds overlap are checked.
+
+Arcs are first split into pieces at their leftmost and rightmost points. Each
+piece is then part of either the top or the bottom half of its circle, over
+a range of x, so it is easy to tell whether a point on the circle is on the
+piece.
+"""
+
+import math
+from collections import defaultdict, namedtuple
+
+import numpy as np
+
+from .geometry import (
+    intersect_lines_array,
+    intersect_circle_line_array,
+    intersect_circles_array,
+)
+from .point import points_equal, point_key, neighbor_keys, epsilon
+from .svg import MOVE, LINE, ARC, CLOSE
+
+Intersection = namedtuple('Intersection', 'point, first, second, overlap')
+Intersection.__doc__ = """
+A place where outlines meet. `first` and `second` are the indexes of the
+paths on the paper that the outlines belong to, and may be the same for a
+path that crosses itself. If `overlap` is True, the outlines run along each
+other, and `point` is the middle of the shared part.
+"""
+
+# Columns of the piece array. END_X and END_Y are the end point of the whole
+# edge that the piece is part of.
+(
+    X0, Y0, X1, Y1, CX, CY, R, HALF, LEFT, BOTTOM, RIGHT, TOP, END_X, END_Y,
+) = range(14)
+
+# The rows that pieces are put into are as tall as this fraction of them.
+ROW_QUANTILE = 0.9
+
+
+def find_intersections(display):
+    """
+    Find all the places where the outline edges of the elements in a
+    DisplayList cross, touch or overlap, apart from where each edge leads on
+    to the next one around its outline. Returns a list of Intersections.
+    """
+    pieces, kinds, edges, next_edges, paths = outline_pieces(display)
+    i, j = candidate_pairs(pieces, edges)
+
+    intersections = []
+    seen = defaultdict(set)
+
+    def add(points, pair_i, pair_j, overlap):
+        for p, a, b in zip(points.tolist(), pair_i.tolist(), pair_j.tolist()):
+            first, second = sorted((int(paths[a]), int(paths[b])))
+            key = point_key(p)
+            found = seen[first, second, overlap]
+            if any(k in found for k in neighbor_keys(key)):
+                continue
+            found.add(key)
+            intersections.append(
+                Intersection(tuple(p), first, second, overlap)
+            )
+
+    # Put lines before arcs in each pair.
+    swap = kinds[i] > kinds[j]
+    i, j = np.where(swap, j, i), np.where(swap, i, j)
+    line_line = (kinds[i] == LINE) & (kinds[j] == LINE)
+    line_arc = (kinds[i] == LINE) & (kinds[j] == ARC)
+    arc_arc = (kinds[i] == ARC) & (kinds[j] == ARC)
+
+    for crossings, overlaps in [
+        _line_line(pieces, i[line_line], j[line_line]),
+        _line_arc(pieces, i[line_arc], j[line_arc]),
+        _arc_arc(pieces, i[arc_arc], j[arc_arc]),
+    ]:
+        add(*_apart(pieces, edges, next_edges, *crossings), overlap=False)
+        add(*overlaps, overlap=True)
+    intersections.sort(key=lambda x: (x.first, x.second, x.point))
+    return intersections
+
+
+def outline_pieces(display):
+    """
+    Split the outline edges in a display list into straight pieces and
+    pieces of arcs that go only one way in x.
+
+    Returns an array with a row for each piece, holding its end points, its
+    circle and which half of the circle it is on for arcs, its bounds, and
+    the end point of its edge. Also returns arrays of the kind of each
+    piece, which edge it came from, which edge comes after that one in its
+    outline or -1 if none does, and which path on the paper that edge was
+    drawn for.
+    """
+    rows = []
+    kinds = []
+    edges = []
+    paths = []
+    following = {}
+    edge = 0
+    for element in range(len(display)):
+        _, commands, coords = display.element(element)
+        path_index = display.path_indexes[element]
+        current = None
+        first_edge = None
+        for command, (x, y, cx, cy, radius, arc_angle) in zip(
+            commands.tolist(),
+            coords.tolist(),
+        ):
+            if command == MOVE:
+                current = (x, y)
+                first_edge = edge
+                continue
+            if command == CLOSE:
+                # The last edge of a closed outline leads back to the first.
+                if edge > first_edge:
+                    following[edge - 1] = first_edge
+                continue
+            if command == LINE:
+                new_rows = [_line_piece(current, (x, y))]
+            else:
+                new_rows = _arc_pieces(
+                    current, (x, y), (cx, cy), abs(radius), arc_angle,
+                )
+            if edge > first_edge:
+                following[edge - 1] = edge
+            for row in new_rows:
+                rows.append(row + (x, y))
+                kinds.append(command)
+                edges.append(edge)
+                paths.append(path_index)
+            current = (x, y)
+            edge += 1
+    return (
+        np.array(rows, dtype=float).reshape(-1, 14),
+        np.array(kinds, dtype=np.uint8),
+        np.array(edges, dtype=np.intp),
+        np.array([following.get(e, -1) for e in edges], dtype=np.intp),
+        np.array(paths, dtype=np.intp),
+    )
+
+
+def candidate_pairs(pieces, edges):
+    """
+    Find the pairs of pieces from different edges whose bounds overlap.
+    Returns two arrays of piece indexes, with each pair once.
+
+    The pieces are put into rows by their range of y. Within a row, the
+    pieces are sorted by their left side, and each one is paired with the
+    pieces that start before it ends. A pair is only kept in the row where
+    their ranges of y start to overlap, so it isn't found twice.
+    """
+    lefts = pieces[:, LEFT]
+    bottoms = pieces[:, BOTTOM] - epsilon
+    tops = pieces[:, TOP] + epsilon
+    height = _row_height(bottoms, tops)
+    first_rows = np.floor(bottoms / height).astype(np.int64)
+    last_rows = np.floor(tops / height).astype(np.int64)
+    offset = first_rows.min(initial=0)
+    first_rows -= offset
+    last_rows -= offset
+
+    # Number the pieces by their left sides, and find how far along that
+    # numbering each piece reaches with its right side.
+    sorted_lefts = np.sort(lefts)
+    left_ranks = np.searchsorted(sorted_lefts, lefts, side='left')
+    right_ranks = np.searchsorted(
+        sorted_lefts, pieces[:, RIGHT] + epsilon, side='right',
+    )
+
+    # List each piece once for every row it is in, ordered by row and then
+    # from left to right.
+    row_counts = last_rows - first_rows + 1
+    members = np.repeat(np.arange(len(pieces)), row_counts)
+    rows = np.repeat(first_rows, row_counts) + _ranges(row_counts)
+    stride = len(pieces) + 1
+    keys = rows * stride + left_ranks[members]
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+    members = members[order]
+    rows = rows[order]
+
+    # Each listing is paired with the ones after it in its row that start
+    # before it ends.
+    ends = np.searchsorted(
+        keys, rows * stride + right_ranks[members], side='left',
+    )
+    counts = np.maximum(ends - np.arange(len(keys)) - 1, 0)
+    first = np.repeat(np.arange(len(keys)), counts)
+    second = first + 1 + _ranges(counts)
+    i = members[first]
+    j = members[second]
+
+    keep = (
+        (edges[i] != edges[j])
+        & (rows[first] == np.maximum(first_rows[i], first_rows[j]))
+        & (bottoms[i] <= tops[j])
+        & (bottoms[j] <= tops[i])
+    )
+    return i[keep], j[keep]
+
+
+def _row_height(bottoms, tops):
+    # Make the rows as tall as most pieces, but tall enough that pieces are
+    # in two rows on average, so the number of listings stays in proportion
+    # to the number of pieces. There are also never more rows than pieces.
+    if len(bottoms) == 0:
+        return 1.0
+    heights = tops - bottoms
+    height = max(
+        np.quantile(heights, ROW_QUANTILE),
+        heights.mean(),
+        (tops.max() - bottoms.min()) / len(heights),
+    )
+    if height > 0:
+        return float(height)
+    return 1.0
+
+
+def _ranges(counts):
+    # Concatenate ranges from zero up to each count.
+    starts = np.cumsum(counts) - counts
+    return np.arange(counts.sum()) - np.repeat(starts, counts)
+
+
+def _line_piece(a, b):
+    return (
+        a[0], a[1], b[0], b[1],
+        0, 0, 0, 0,
+        min(a[0], b[0]), min(a[1], b[1]), max(a[0], b[0]), max(a[1], b[1]),
+    )
+
+
+def _arc_pieces(a, b, center, radius, arc_angle):
+    cx, cy = center
+    start = math.atan2(a[1] - cy, a[0] - cx)
+    end = start + math.radians(arc_angle)
+
+    # Split at the multiples of pi, where the arc is level with the center.
+    if end > start:
+        k = math.floor(start / math.pi) + 1
+        step = 1
+    else:
+        k = math.ceil(start / math.pi) - 1
+        step = -1
+    angles = [start]
+    points = [a]
+    while (k * math.pi - end) * step < 0:
+        angles.append(k * math.pi)
+        points.append((cx + radius * (-1) ** (k % 2), cy))
+        k += step
+    angles.append(end)
+    points.append(b)
+
+    pieces = []
+    for angle0, angle1, p0, p1 in zip(angles, angles[1:], points, points[1:]):
+        if points_equal(p0, p1):
+            continue
+        middle = (angle0 + angle1) / 2
+        half = 1 if math.sin(middle) > 0 else -1
+        ys = [p0[1], p1[1]]
+        # The piece reaches the top or bottom of the circle if it passes the
+        # quarter turn within its half.
+        peak = math.floor(middle / math.pi) * math.pi + math.pi / 2
+        if min(angle0, angle1) <= peak <= max(angle0, angle1):
+            ys.append(cy + half * radius)
+        pieces.append((
+            p0[0], p0[1], p1[0], p1[1],
+            cx, cy, radius, half,
+            min(p0[0], p1[0]), min(ys), max(p0[0], p1[0]), max(ys),
+        ))
+    return pieces
+
+
+def _line_line(pieces, i, j):
+    a = pieces[i][:, X0:Y1 + 1]
+    b = pieces[j][:, X0:Y1 + 1]
+    points, found = intersect_lines_array(
+        a[:, :2], a[:, 2:], b[:, :2], b[:, 2:],
+    )
+    crossings = _crossings(
+        pieces, i, j, points[:, np.newaxis], found[:, np.newaxis],
+    )
+
+    # Parallel lines overlap if they are on the same line, and their ranges
+    # along it overlap by more than a point.
+    direction = a[:, 2:] - a[:, :2]
+    length = np.hypot(direction[:, 0], direction[:, 1])
+    unit = direction / length[:, np.newaxis]
+    to_start = b[:, :2] - a[:, :2]
+    to_end = b[:, 2:] - a[:, :2]
+    off_line = np.maximum(
+        np.abs(_perp_dot(unit, to_start)),
+        np.abs(_perp_dot(unit, to_end)),
+    )
+    t_start = (to_start * unit).sum(axis=1)
+    t_end = (to_end * unit).sum(axis=1)
+    lo = np.maximum(0, np.minimum(t_start, t_end))
+    hi = np.minimum(length, np.maximum(t_start, t_end))
+    overlap = ~found & (off_line <= epsilon) & (hi - lo > epsilon)
+    middle = a[:, :2] + unit * ((lo + hi) / 2)[:, np.newaxis]
+    overlaps = (middle[overlap], i[overlap], j[overlap])
+    return crossings, overlaps
+
+
+def _line_arc(pieces, i, j):
+    line = pieces[i]
+    arc = pieces[j]
+    points, found = intersect_circle_line_array(
+        arc[:, CX:CY + 1], arc[:, R], line[:, X0:Y0 + 1], line[:, X1:Y1 + 1],
+    )
+    crossings = _crossings(pieces, i, j, points, found)
+    empty = np.empty((0, 2))
+    return crossings, (empty, i[:0], j[:0])
+
+
+def _arc_arc(pieces, i, j):
+    arc_i = pieces[i]
+    arc_j = pieces[j]
+    points, found = intersect_circles_array(
+        arc_i[:, CX:CY + 1], arc_i[:, R], arc_j[:, CX:CY + 1], arc_j[:, R],
+    )
+    crossings = _crossings(pieces, i, j, points, found)
+
+    # Pieces on the same half of the same circle overlap if their ranges of
+    # x overlap by more than a point.
+    center_offset = np.abs(arc_i[:, CX:CY + 1] - arc_j[:, CX:CY + 1])
+    same_circle = (
+        np.all(center_offset <= epsilon, axis=1)
+        & (np.abs(arc_i[:, R] - arc_j[:, R]) <= epsilon)
+        & (arc_i[:, HALF] == arc_j[:, HALF])
+    )
+    lo = np.maximum(arc_i[:, LEFT], arc_j[:, LEFT])
+    hi = np.minimum(arc_i[:, RIGHT], arc_j[:, RIGHT])
+    overlap = same_circle & (hi - lo > epsilon)
+    x = (lo + hi) / 2
+    dx = x - arc_i[:, CX]
+    y = arc_i[:, CY] + arc_i[:, HALF] * np.sqrt(
+        np.maximum(arc_i[:, R]**2 - dx**2, 0)
+    )
+    middle = np.column_stack([x, y])
+    overlaps = (middle[overlap], i[overlap], j[overlap])
+    return crossings, overlaps
+
+
+def _crossings(pieces, i, j, points, found):
+    # Keep the intersection points that are on both pieces.
+    count = points.shape[1]
+    points = points.reshape(-1, 2)
+    found = found.reshape(-1)
+    i = np.repeat(i, count)
+    j = np.repeat(j, count)
+    keep = (
+        found
+        & _on_piece(pieces[i], points)
+        & _on_piece(pieces[j], points)
+    )
+    return points[keep], i[keep], j[keep]
+
+
+def _on_piece(rows, points):
+    x = points[:, 0]
+    y = points[:, 1]
+    in_bounds = (
+        (rows[:, LEFT] - epsilon <= x) & (x <= rows[:, RIGHT] + epsilon)
+        & (rows[:, BOTTOM] - epsilon <= y) & (y <= rows[:, TOP] + epsilon)
+    )
+    # Points on an arc's circle also have to be on the right half of it.
+    # Lines have a HALF of zero, so this always holds for them.
+    on_half = (y - rows[:, CY]) * rows[:, HALF] >= -epsilon
+    return in_bounds & on_half
+
+
+def _apart(pieces, edges, next_edges, points, i, j):
+    # Drop the points where one edge leads on to the other around an
+    # outline.
+    keep = ~(
+        _leads_to(pieces, edges, next_edges, points, i, j)
+        | _leads_to(pieces, edges, next_edges, points, j, i)
+    )
+    return points[keep], i[keep], j[keep]
+
+
+def _leads_to(pieces, edges, next_edges, points, i, j):
+    # Whether the edge of piece j comes after the edge of piece i, and the
+    # point is where they meet.
+    return (
+        (next_edges[i] == edges[j])
+        & (np.abs(points[:, 0] - pieces[i, END_X]) <= epsilon)
+        & (np.abs(points[:, 1] - pieces[i, END_Y]) <= epsilon)
+    )
+
+
+def _perp_dot(u, v):
+    return u[:, 0] * v[:, 1] - u[:, 1] * v[:, 0]
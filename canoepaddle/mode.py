@@ -1,26 +1,75 @@
-from copy import copy
+from weakref import WeakValueDictionary
 
+from .bounds import Bounds
 from .svg import (
+    circle_element,
     path_element,
 )
 
 
 def modes_compatible(a, b):
     # Can these modes be used together in a single stroke?
+    if a is b:
+        return True
     if type(a) != type(b):
         return False
     return a.compatible_with(b)
 
 
-class Mode:
+class ModeType(type):
+    """
+    Metaclass that interns modes as they are constructed.
+
+    Modes are immutable values, so every mode with the same type and
+    attributes can be shared by reference.
+    """
+
+    def __call__(cls, *args, **kwargs):
+        mode = super().__call__(*args, **kwargs)
+        return mode._intern()
+
+
+class Mode(metaclass=ModeType):
     """
     A strategy for rendering a Path.
 
     For all mode types with a width, the color and width attributes apply
     per-segment, while other attributes such as outline_width and outline_color
     apply per-path.
+
+    Modes are immutable. Use replace() to get a mode with different attributes.
     """
 
+    _interned = WeakValueDictionary()
+    _frozen = False
+
+    def __setattr__(self, name, value):
+        if self._frozen:
+            raise AttributeError(
+                'Modes are immutable, use replace() to change {}.'.format(name)
+            )
+        super().__setattr__(name, value)
+
+    def _key(self):
+        # Use every attribute, not just the ones in the repr, since some modes
+        # carry colors they don't show. Include the value types, so that e.g.
+        # a width of 1 does not get shared with a width of 1.0 and show up
+        # wrong in reprs.
+        return (type(self),) + tuple(
+            (name, type(value), value)
+            for name, value in sorted(self.__dict__.items())
+            if name != '_frozen'
+        )
+
+    def _intern(self):
+        self.__dict__['_frozen'] = True
+        try:
+            return self._interned.setdefault(self._key(), self)
+        except TypeError:
+            # Modes with unhashable attributes, like colors given as lists,
+            # are still immutable but can't be shared.
+            return self
+
     def __repr__(self):  # pragma: no cover
         strings = []
         for field in self.repr_fields:
@@ -30,23 +79,97 @@ class Mode:
             strings.append(repr(value))
         return '{}({})'.format(self.__class__.__name__, ', '.join(strings))
 
-    def svg(self, path, precision):
+    def svg(self, path, precision, circles=False):
+        if circles:
+            element = self.circle_element(path, precision)
+            if element is not None:
+                return element
         return ''.join(
             path_element(path_data, color)
             for color, path_data in self.iter_render(path, precision)
         )
 
-    def copy(self):
-        return copy(self)
+    def iter_render_bounds(self, path, precision):
+        # Like iter_render(), but also give the bounds of each part.
+        for color, fill_paths in self.iter_fill(path):
+            yield (
+                color,
+                ' '.join(p.render_path(precision) for p in fill_paths),
+                tuple(Bounds.union_all(p.bounds() for p in fill_paths)),
+            )
+
+    def circle_element(self, path, precision):
+        # Draw the path as a <circle> element if possible, or return None.
+        circle = path.circle()
+        if circle is None:
+            return None
+        return self.circle_svg(path, *circle, precision=precision)
 
-    def copy_colors(self, other):
-        # Update the current mode based on a new one, but keeping old colors if
-        # they weren't specified.
+    def circle_svg(self, path, center, radius, precision):
+        # Modes that can draw a circle path as an svg <circle> element
+        # override this.
+        return None
+
+    def iter_render(self, path, precision):
+        for color, fill_paths in self.iter_fill(path):
+            yield color, ' '.join(p.render_path(precision) for p in fill_paths)
+
+    def copy(self):
+        # Modes are immutable, so there is no need to actually copy them.
+        return self
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def replace(self, **changes):
+        """
+        Return a mode like this one, but with the given attributes changed.
+        """
+        for name in changes:
+            if name not in self.__dict__:
+                raise TypeError(
+                    '{} has no attribute {!r}'.format(
+                        self.__class__.__name__,
+                        name,
+                    )
+                )
+        other = object.__new__(type(self))
+        other.__dict__.update(self.__dict__)
+        other.__dict__.update(changes)
+        return other._intern()
+
+    def scaled(self, factor):
+        """
+        Return this mode, but with its widths multiplied by `factor`.
+        """
+        changes = {}
+        for width_attr in ['width', 'outline_width']:
+            width = getattr(self, width_attr, None)
+            if width is not None:
+                changes[width_attr] = width * factor
+        if not changes:
+            return self
+        return self.replace(**changes)
+
+    def inherit_colors(self, other):
+        """
+        Return this mode, but with any unspecified colors taken from the other
+        mode.
+        """
+        changes = {}
         for color_attr in ['color', 'outline_color']:
-            self_color = getattr(self, color_attr, None)
+            if not hasattr(self, color_attr):
+                continue
+            self_color = getattr(self, color_attr)
             other_color = getattr(other, color_attr, None)
             if self_color is None and other_color is not None:
-                setattr(self, color_attr, other_color)
+                changes[color_attr] = other_color
+        if not changes:
+            return self
+        return self.replace(**changes)
 
 
 class FillMode(Mode):
@@ -57,8 +180,11 @@ class FillMode(Mode):
         self.width = None
         self.color = color
 
-    def iter_render(self, path, precision):
-        yield self.color, path.render_path(precision)
+    def iter_fill(self, path):
+        yield self.color, [path]
+
+    def circle_svg(self, path, center, radius, precision):
+        return circle_element(center, radius, self.color, precision)
 
     def compatible_with(self, other):
         return self.color == other.color
@@ -72,28 +198,53 @@ class StrokeMode(Mode):
         self.width = width
         self.color = color
 
-    def iter_render(self, path, precision):
-        # Create a temporary pen to draw along the outline of the path
-        # segments, taking into account the thickness of the path.
-        from .pen import Pen
-        pen = Pen()
+    def iter_fill(self, path, outline=None):
+        # Draw along the outline of the path segments, taking into account
+        # the thickness of the path. The outline can be passed in if it was
+        # already traced for another part of the drawing.
+        from .path import outline_paths
         mode = self.outliner_mode()
-        pen.set_mode(mode)
-        path.draw_outline(pen, precision)
-
-        for path in pen.paper.paths:
+        if outline is None:
+            outline = path.outline()
+        if outline is not None:
+            paths = outline_paths(outline, mode)
+        else:
+            # Use a temporary pen for custom end caps.
+            from .pen import Pen
+            pen = Pen()
+            pen.set_mode(mode)
+            path.draw_outline(pen)
+            paths = pen.paper.paths
+
+        for path in paths:
             color = path.segments[0].color
-            path_data = ' '.join(
-                p for c, p in
-                mode.iter_render(path, precision)
-            )
-            yield color, path_data
+            fill_paths = [
+                p
+                for c, outline_fill_paths in mode.iter_fill(path)
+                for p in outline_fill_paths
+            ]
+            yield color, fill_paths
 
     def outliner_mode(self):
         # Give the mode, that if used to draw the outline, will produce the
         # correct results.
         return FillMode(self.color)
 
+    def circle_svg(self, path, center, radius, precision):
+        # A plain stroke is the same as an svg stroke, unless it is so wide
+        # that it covers the center of the circle. The modes derived from
+        # this one draw more than a plain stroke.
+        seg = path.segments[0]
+        if type(self) is not StrokeMode or seg.width / 2 >= radius:
+            return None
+        return circle_element(
+            center,
+            radius,
+            seg.color,
+            precision,
+            stroke_width=seg.width,
+        )
+
     def compatible_with(self, other):
         return True
 
@@ -108,9 +259,9 @@ class OutlineMode(StrokeMode):
         self.outline_width = outline_width
         self.outline_color = outline_color
 
-    def iter_render(self, path, precision):
-        for color, path_data in super().iter_render(path, precision):
-            yield self.outline_color, path_data
+    def iter_fill(self, path, outline=None):
+        for color, fill_paths in super().iter_fill(path, outline):
+            yield self.outline_color, fill_paths
 
     def outliner_mode(self):
         return StrokeMode(self.outline_width, self.outline_color)
@@ -132,11 +283,11 @@ class StrokeFillMode(StrokeMode):
         self.color = color
         self.fill_color = fill_color
 
-    def iter_render(self, path, precision):
+    def iter_fill(self, path, outline=None):
         fill_mode = FillMode(self.fill_color)
-        yield from fill_mode.iter_render(path, precision)
+        yield from fill_mode.iter_fill(path)
         stroke_mode = StrokeMode(self.width, self.color)
-        yield from stroke_mode.iter_render(path, precision)
+        yield from stroke_mode.iter_fill(path, outline)
 
 
 class StrokeOutlineMode(StrokeMode):
@@ -149,11 +300,15 @@ class StrokeOutlineMode(StrokeMode):
         self.color = color
         self.outline_color = outline_color
 
-    def iter_render(self, path, precision):
+    def iter_fill(self, path, outline=None):
+        # The stroke and its outline go around the same path, so trace it
+        # once for both.
+        if outline is None:
+            outline = path.outline()
         stroke_mode = StrokeMode(self.width, self.color)
-        yield from stroke_mode.iter_render(path, precision)
+        yield from stroke_mode.iter_fill(path, outline)
         outline_mode = OutlineMode(self.width, self.outline_width, self.outline_color)
-        yield from outline_mode.iter_render(path, precision)
+        yield from outline_mode.iter_fill(path, outline)
 
     def outliner_mode(self):
         return StrokeFillMode(
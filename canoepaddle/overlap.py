@@ -0,0 +1,290 @@
+"""
+Find stroke segments that are drawn over by other segments.
+
+Generated drawings often draw the same stroke more than once, or draw
+straight strokes that overlap along the same line. Since later strokes are
+drawn on top, an exact duplicate can always be dropped in favor of the last
+copy. Overlapping straight strokes are merged into a single stroke, drawn
+where the topmost of them was, unless that would lift part of a lower stroke
+over something else drawn in between.
+
+Segments are removed from their paths without changing their neighbors, whose
+corners still fit the shape of the joints they had.
+"""
+
+import math
+from bisect import bisect_left
+from collections import defaultdict
+
+import vec
+from .mode import StrokeMode
+from .point import points_equal, epsilon
+from .segment import LineSegment, ArcSegment, flat_cap, segment_bounds
+from .spatial import BoxGrid
+
+
+def find_overlaps(paths):
+    """
+    Find the segments in the paths that can be removed or merged.
+
+    Only paths drawn with a stroke width are considered, because removing a
+    segment from a filled shape would change the shape.
+
+    Returns a set of (path_index, segment_index) pairs to remove, and a dict
+    from (path_index, segment_index) to a segment to replace that one with.
+    """
+    removed = set()
+    replaced = {}
+
+    # Keep only the last of each set of duplicate segments.
+    last_by_key = {}
+    for path_index, path in enumerate(paths):
+        if getattr(path.mode, 'width', None) is None:
+            continue
+        for segment_index, seg in enumerate(path.segments):
+            key = segment_key(seg, path.mode)
+            previous = last_by_key.get(key)
+            if previous is not None:
+                removed.add(previous)
+            last_by_key[key] = (path_index, segment_index)
+
+    # Group plain straight strokes by the line they lie on.
+    lines = defaultdict(list)
+    for path_index, segment_index in last_by_key.values():
+        path = paths[path_index]
+        seg = path.segments[segment_index]
+        if type(path.mode) is StrokeMode and _is_plain_line(seg):
+            key = line_key(seg, path.mode)
+            lines[key].append((path_index, segment_index))
+
+    runs = [
+        run
+        for members in lines.values()
+        if len(members) >= 2
+        for run in _overlapping_runs(paths, members)
+    ]
+    if not runs:
+        return removed, replaced
+
+    drawn = _segment_grid(paths)
+    for run in runs:
+        for group in _unblocked_groups(paths, run, drawn, removed):
+            # Splitting the run may leave gaps between its segments.
+            for merged in _overlapping_runs(paths, group):
+                # The merged segment is drawn where the topmost one was.
+                top = max(merged)
+                for member in merged:
+                    if member != top:
+                        removed.add(member)
+                replaced[top] = _merged_line(paths, merged, top)
+
+    return removed, replaced
+
+
+def segment_key(seg, mode):
+    """
+    Make a hashable key for a segment, which is the same no matter which
+    direction the segment is drawn in.
+
+    The corners of thick segments are part of the key, because joints with
+    neighboring segments move them. Two segments with the same key cover
+    exactly the same area.
+    """
+    ends = [
+        _end_key(
+            seg.a, seg.a_left, seg.a_right, seg.start_slant, seg.start_cap,
+        ),
+        _end_key(seg.b, seg.b_left, seg.b_right, seg.end_slant, seg.end_cap),
+    ]
+    if isinstance(seg, ArcSegment):
+        # Arcs are keyed going counterclockwise.
+        if seg.arc_angle < 0:
+            ends.reverse()
+        shape = (
+            _point_key(seg.center),
+            round(abs(seg.radius), 9),
+            round(abs(seg.arc_angle.theta), 9),
+        )
+    else:
+        ends.sort(key=lambda end: end[:2])
+        shape = ()
+    return (
+        type(seg),
+        tuple(ends),
+        shape,
+        seg.width,
+        _hashable(seg.color),
+        mode,
+    )
+
+
+def _end_key(point, left, right, slant, cap):
+    corners = sorted(
+        (0.0, 0.0) if p is None else _point_key(p)
+        for p in (left, right)
+    )
+    return (_point_key(point), _slant_key(slant), tuple(corners), cap)
+
+
+def line_key(seg, mode):
+    """
+    Make a hashable key for the infinite line that a segment is on.
+    """
+    ux, uy = _direction(seg)
+    # The signed distance of the line from the origin.
+    offset = ux * seg.a.y - uy * seg.a.x
+    return (
+        round(math.atan2(uy, ux), 9),
+        round(offset, 9),
+        seg.width,
+        _hashable(seg.color),
+        mode,
+    )
+
+
+def _direction(seg):
+    # Unit vector along the segment, pointing into the upper half plane.
+    ux, uy = vec.norm(vec.vfrom(seg.a, seg.b))
+    if uy < -epsilon or (abs(uy) <= epsilon and ux < 0):
+        ux, uy = -ux, -uy
+    return ux, uy
+
+
+def _is_plain_line(seg):
+    # Straight segments with plain square ends, not joined to anything.
+    if not (
+        isinstance(seg, LineSegment)
+        and seg.start_slant is None
+        and seg.end_slant is None
+        and seg.start_cap is flat_cap
+        and seg.end_cap is flat_cap
+    ):
+        return False
+    # Unjoined corners are offset straight out to the sides.
+    (ax, ay), (bx, by) = seg.a, seg.b
+    length = math.hypot(bx - ax, by - ay)
+    wx = -(by - ay) / length * seg.width / 2
+    wy = (bx - ax) / length * seg.width / 2
+    return (
+        points_equal(seg.a_left, (ax + wx, ay + wy))
+        and points_equal(seg.a_right, (ax - wx, ay - wy))
+        and points_equal(seg.b_left, (bx + wx, by + wy))
+        and points_equal(seg.b_right, (bx - wx, by - wy))
+    )
+
+
+def _overlapping_runs(paths, members):
+    # Sweep along the line, collecting runs of overlapping segments.
+    u = _direction(paths[members[0][0]].segments[members[0][1]])
+    intervals = []
+    for member in members:
+        seg = paths[member[0]].segments[member[1]]
+        t_a = vec.dot(seg.a, u)
+        t_b = vec.dot(seg.b, u)
+        intervals.append((min(t_a, t_b), max(t_a, t_b), member))
+    intervals.sort()
+
+    run = []
+    run_end = None
+    for start, end, member in intervals:
+        if run and start < run_end - epsilon:
+            run.append(member)
+            run_end = max(run_end, end)
+        else:
+            if len(run) > 1:
+                yield run
+            run = [member]
+            run_end = end
+    if len(run) > 1:
+        yield run
+
+
+def _segment_grid(paths):
+    # Index every segment on the paper by its bounds.
+    members = [
+        (path_index, segment_index)
+        for path_index, path in enumerate(paths)
+        for segment_index in range(len(path.segments))
+    ]
+    bounds = segment_bounds([
+        paths[path_index].segments[segment_index]
+        for path_index, segment_index in members
+    ])
+    grid = BoxGrid.for_boxes(bounds)
+    for member, box in zip(members, bounds.tolist()):
+        grid.insert(tuple(box), member)
+    return grid
+
+
+def _unblocked_groups(paths, run, drawn, removed):
+    # Merging lifts the lower segments of a run up to the top one. Split the
+    # run wherever something else overlapping it is drawn between two of its
+    # segments, so that nothing is lifted over it. Duplicates that are being
+    # removed don't count, since they are drawn over by a later copy anyway.
+    # Segments on the same line were already compared along it when the runs
+    # were found, so only look for other shapes around each member. The
+    # bounds of a whole diagonal run would take in far too much.
+    run = sorted(run)
+    members = set(run)
+    between = set()
+    for path_index, segment_index in run:
+        bounds = paths[path_index].segments[segment_index].bounds()
+        # Shapes that only touch the run can be drawn in any order.
+        box = (
+            bounds.left + epsilon,
+            bounds.bottom + epsilon,
+            bounds.right - epsilon,
+            bounds.top - epsilon,
+        )
+        between.update(
+            item for item in drawn.overlapping(box)
+            if run[0] < item < run[-1]
+            and item not in members
+            and item not in removed
+        )
+    between = sorted(between)
+    group = [run[0]]
+    for member in run[1:]:
+        if bisect_left(between, member) != bisect_left(between, group[-1]):
+            yield group
+            group = []
+        group.append(member)
+    yield group
+
+
+def _merged_line(paths, run, top):
+    top_seg = paths[top[0]].segments[top[1]]
+    u = _direction(top_seg)
+    points = [
+        p
+        for path_index, segment_index in run
+        for p in paths[path_index].segments[segment_index]
+    ]
+    first = min(points, key=lambda p: vec.dot(p, u))
+    last = max(points, key=lambda p: vec.dot(p, u))
+    # Keep the direction of the topmost segment.
+    if vec.dot(vec.vfrom(top_seg.a, top_seg.b), u) < 0:
+        first, last = last, first
+    return LineSegment(first, last, top_seg.width, top_seg.color, None, None)
+
+
+def _point_key(p):
+    # Round off coordinates rather than snapping them to a grid, so that
+    # values that should be round numbers hash together.
+    return (round(p[0], 9), round(p[1], 9))
+
+
+def _slant_key(slant):
+    # A slant is a line through the end point, so opposite headings are the
+    # same slant.
+    if slant is None:
+        return None
+    return round(slant.theta % 180, 9)
+
+
+def _hashable(value):
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    return value
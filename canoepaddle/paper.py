@@ -1,34 +1,266 @@
+import gzip
+from collections import defaultdict
 from copy import copy
+from itertools import combinations, count, islice
 from textwrap import dedent
 from string import Template
 
+import vec
+from . import intersections, overlap, plot, raster
 from .bounds import Bounds
-from .geometry import find_point_pairs
-from .point import points_equal
+from .chunked import ChunkedList
+from .display import DisplayList
+from .gradient import gradient_svg
+from .hit_test import SegmentIndex
+from .geometry import (
+    find_point_pairs,
+    find_near_point_pairs,
+    cluster_points,
+)
+from .mode import modes_compatible
+from .point import Point, points_equal
+from .segment import LineSegment
+from .svg import merge_path_elements, path_element, reorder_path_elements
+from .transform import (
+    decompose_similarity,
+    transform_points,
+    rotation_matrix,
+    scale_matrix,
+)
+
+# Junctions with more paths than this are paired up approximately.
+MAX_JUNCTION_SEARCH = 8
+
+# How much of an svgz document to gather up before compressing it.
+SVGZ_CHUNK_SIZE = 1 << 16
+
+# The elements are written between the header and the footer, starting on an
+# indented line.
+SVG_HEADER = Template(dedent('''\
+    <?xml version="1.0" standalone="no"?>
+    <!DOCTYPE svg PUBLIC "-//W3C//DTD SVG 1.1//EN"
+        "http://www.w3.org/Graphics/SVG/1.1/DTD/svg11.dtd">
+    <svg
+        xmlns="http://www.w3.org/2000/svg" version="1.1"
+        xmlns:xlink="http://www.w3.org/1999/xlink"
+        viewBox="$view_x $view_y $view_width $view_height"
+        width="${pixel_width}px" height="${pixel_height}px"
+    >
+        <rect
+            style="fill: #FFF"
+            x="$view_x"
+            y="$view_y"
+            width="$view_width"
+            height="$view_height"
+        />
+''') + '    ')
+SVG_FOOTER = '\n</svg>\n'
+
+
+def path_svg(path, precision, circles=False, gradient_ids=None):
+    """
+    Make the svg for one path, as in Paper.svg_elements(). Gradients are
+    used if there is an iterator of `gradient_ids` to number them with.
+    """
+    if gradient_ids is not None:
+        element = gradient_svg(path, precision, gradient_ids)
+        if element is not None:
+            return element
+    return path.svg(precision, circles)
+
+
+def _svg_element(item):
+    # Finish a part of the svg from Paper._iter_path_parts().
+    if isinstance(item, str):
+        return item
+    color, path_data, _ = item
+    return path_element(path_data, color)
+
+
+class _Token:
+    """
+    The tag on the paths and text elements that a paper owns. The paths
+    also mark it as `changed` when they change in ways that the paper's
+    segment index can't follow.
+    """
+
+    __slots__ = ['changed']
+
+    def __init__(self):
+        self.changed = False
 
 
 class Paper:
 
+    # Whether pens drawing on this paper keep a log of what they draw, see
+    # Pen.log().
+    keep_pen_log = True
+
     def __init__(self):
-        self.paths = []
-        self.text_elements = []
+        self._paths = ChunkedList()
+        self._text_elements = ChunkedList()
         self._bounds_override = None
 
+        # Copies of a paper share their path and text lists, and the paths and
+        # text in them, until one side changes them. While self._shared is
+        # True, the lists themselves are shared, and after that they still
+        # share their chunks, see ChunkedList. Paths and text elements that
+        # this paper owns outright are tagged with its token, and anything
+        # else is copied before it is changed.
+        self._shared = False
+        self._token = _Token()
+        # Whether this paper is known to own all of its paths and text
+        # elements, which it makes sure of before handing them out.
+        self._paths_owned = True
+        self._text_owned = True
+
+        # The index for hit_test() and nearest_endpoint(), which is made when
+        # first needed. It follows along as pens draw, but anything that could
+        # change the paths in other ways throws it away, including changes
+        # made to the paths handed out by self.paths, see _Token.
+        self._segment_index = None
+
+    @property
+    def paths(self):
+        self._own_paths()
+        return self._paths
+
+    @paths.setter
+    def paths(self, paths):
+        self._unshare()
+        self._segment_index = None
+        self._paths = ChunkedList(paths)
+        self._paths_owned = False
+
+    @property
+    def text_elements(self):
+        return self._own_text_elements()
+
+    @text_elements.setter
+    def text_elements(self, text_elements):
+        self._unshare()
+        self._text_elements = ChunkedList(text_elements)
+        self._text_owned = False
+
+    def _unshare(self):
+        if self._shared:
+            self._paths = self._paths.copy()
+            self._text_elements = self._text_elements.copy()
+            self._shared = False
+
+    def _own_path(self, index, appending=False):
+        """
+        Get the path at `index` for changing it, copying it first if it is
+        shared with another paper.
+
+        If the caller is only `appending` segments to the path, as a pen does,
+        then the copy shares the segments it already has, see Path.copy(), and
+        the segment index is kept up to date. Otherwise, the segment index is
+        thrown away.
+        """
+        self._unshare()
+        if not appending:
+            self._segment_index = None
+        segment_index = self._segment_index
+        paths = self._paths
+        path = paths[index]
+        if path._token is not self._token:
+            original = path
+            path = path.copy(share_segments=appending)
+            path._token = self._token
+            paths[index] = path
+            if appending:
+                self._paths_owned = False
+            if segment_index is not None:
+                segment_index.replace(original, path)
+        elif not appending:
+            # A pen may have left the path sharing segments with a copy.
+            path.own_segments()
+        if segment_index is not None:
+            segment_index.touch(path)
+        return path
+
+    def _owned_paths(self):
+        for i in range(len(self._paths)):
+            yield self._own_path(i)
+
+    def _own_paths(self):
+        # Copy every path that is shared with another paper, so that the paths
+        # can be handed out to be changed. The copies take the place of the
+        # originals in the segment index.
+        self._unshare()
+        if self._paths_owned:
+            return
+        segment_index = self._segment_index
+        paths = self._paths
+        for i in range(len(paths)):
+            path = paths[i]
+            if path._token is not self._token:
+                original = path
+                path = path.copy()
+                path._token = self._token
+                paths[i] = path
+                if segment_index is not None:
+                    segment_index.replace(original, path)
+            else:
+                path.own_segments()
+        self._paths_owned = True
+
+    def _own_text_elements(self):
+        # Like _own_paths(), for the text elements.
+        self._unshare()
+        text_elements = self._text_elements
+        if not self._text_owned:
+            for i, text_element in enumerate(text_elements):
+                if text_element._token is not self._token:
+                    text_element = text_element.copy()
+                    text_element._token = self._token
+                    text_elements[i] = text_element
+            self._text_owned = True
+        return text_elements
+
+    def _owned_text_elements(self):
+        return iter(self._own_text_elements())
+
+    def add_path(self, path):
+        path._token = self._token
+        self._unshare()
+        self._paths.append(path)
+        if self._segment_index is not None:
+            self._segment_index.touch(path)
+
+    def add_text(self, text_element):
+        text_element._token = self._token
+        self._unshare()
+        self._text_elements.append(text_element)
+
     def merge(self, other):
         """
         Add all the paths of the other paper on top of this one.
         """
         self.override_bounds(self._merged_bounds(other))
-        self.paths.extend(other.paths)
-        self.text_elements.extend(other.text_elements)
+        self._unshare()
+        self._segment_index = None
+        self._paths.extend(other._paths)
+        self._text_elements.extend(other._text_elements)
+        self._share_merged(other)
 
     def merge_under(self, other):
         """
         Add all the paths of the other paper underneath this one.
         """
         self.override_bounds(self._merged_bounds(other))
-        self.paths[0:0] = other.paths
-        self.text_elements[0:0] = other.text_elements
+        self._unshare()
+        self._segment_index = None
+        self._paths[0:0] = other._paths
+        self._text_elements[0:0] = other._text_elements
+        self._share_merged(other)
+
+    def _share_merged(self, other):
+        # The other paper's paths are shared with this one now.
+        other._token = _Token()
+        self._paths_owned = self._text_owned = False
+        other._paths_owned = other._text_owned = False
 
     def _merged_bounds(self, other):
         try:
@@ -49,24 +281,47 @@ class Paper:
         else:
             return Bounds.union_all([self_bounds, other_bounds])
 
-    def join_paths(self):
+    def join_paths(self, tolerance=None, junctions=False):
         """
         Find all paths that come to a common point with another path, and join
         them together.
+
+        If `tolerance` is given, then path ends that are up to that distance
+        apart are also joined, closest first, and snapped together.
+
+        Normally, points where three or more paths meet are left alone. If
+        `junctions` is True, then the paths at each junction are paired up as
+        well, so that each path continues as straight as possible.
         """
+        if junctions:
+            if tolerance is not None:
+                raise ValueError(
+                    'Paths can only be joined at junctions without a '
+                    'tolerance.'
+                )
+            self._join_paths_at_junctions()
+            return
+
         # Index paths by their end nodes.
         paths = []
         nodes = []
         endpoint_to_path = {}
         other_end_of = {}
-        for path in self.paths:
+        for paper_index, path in enumerate(self._paths):
             start = path.segments[0].a
             end = path.segments[-1].b
             if points_equal(start, end):
                 continue  # This is a path looping back on itself.
+            if (
+                tolerance is not None
+                and vec.mag(vec.vfrom(start, end)) <= tolerance
+            ):
+                continue  # This is a path almost looping back on itself.
 
+            # Keep track of paths by their position in the paper, so that we
+            # can copy shared paths before joining onto them.
             path_index = len(paths)
-            paths.append(path)
+            paths.append(paper_index)
             start_index = len(nodes)
             nodes.append(start)
             end_index = len(nodes)
@@ -78,14 +333,24 @@ class Paper:
             endpoint_to_path[end_index] = path_index
 
         # Find paths that meet at a common point.
-        pair_indexes = find_point_pairs(nodes)
+        if tolerance is None:
+            pair_indexes = find_point_pairs(nodes)
+        else:
+            # Start and end nodes of each path are next to each other.
+            pair_indexes = find_near_point_pairs(
+                nodes,
+                tolerance,
+                groups=[i // 2 for i in range(len(nodes))],
+            )
+            for a, b in pair_indexes:
+                self._snap_nodes(paths, nodes, a, b)
         pairs = {}
         for a, b in pair_indexes:
             pairs[a] = b
             pairs[b] = a
 
         # Join up the paths.
-        path_ids_to_remove = set()
+        paper_indexes_to_remove = set()
         node_set = set(range(len(nodes)))
         while node_set:
             current_node = node_set.pop()
@@ -96,49 +361,283 @@ class Paper:
                     break
                 paired_node = pairs[current_node]
                 paired_path = endpoint_to_path[paired_node]
-                if paths[current_path] is paths[paired_path]:
+                if paths[current_path] == paths[paired_path]:
                     break
-                paths[current_path].join_with(paths[paired_path])
+                self._own_path(paths[current_path]).join_with(
+                    self._own_path(paths[paired_path])
+                )
 
                 # Update indexes.
                 node_set.remove(paired_node)
-                path_ids_to_remove.add(id(paths[paired_path]))
+                paper_indexes_to_remove.add(paths[paired_path])
                 paths[paired_path] = paths[current_path]
 
                 # Continue from the other end of the path we just joined.
                 other_end = other_end_of[paired_node]
                 assert other_end in node_set
-                assert endpoint_to_path[other_end] == endpoint_to_path[paired_node]
+                assert (
+                    endpoint_to_path[other_end]
+                    == endpoint_to_path[paired_node]
+                )
                 current_node = other_end
                 node_set.remove(other_end)
                 current_path = endpoint_to_path[current_node]
 
         # Handle removed paths.
         self.paths = [
-            p for p in self.paths
-            if id(p) not in path_ids_to_remove
+            p for (i, p) in enumerate(self._paths)
+            if i not in paper_indexes_to_remove
+        ]
+
+    def _join_paths_at_junctions(self):
+        # Each open path is an edge in a graph of the points where path ends
+        # meet. The start of edge i is end number 2 * i, and its end is end
+        # number 2 * i + 1.
+        edges = []
+        end_points = []
+        for paper_index, path in enumerate(self._paths):
+            start = path.segments[0].a
+            end = path.segments[-1].b
+            if points_equal(start, end):
+                continue
+            edges.append(paper_index)
+            end_points.append(start)
+            end_points.append(end)
+
+        junctions, junction_points = cluster_points(end_points)
+        ends_at_junction = defaultdict(list)
+        for end, junction in enumerate(junctions):
+            ends_at_junction[junction].append(end)
+
+        # Decide which edge continues into which at each junction.
+        partner = {}
+        for ends in ends_at_junction.values():
+            if len(ends) < 2:
+                continue
+            for a, b in self._pair_junction_ends(edges, ends):
+                partner[a] = b
+                partner[b] = a
+
+        # The ends meeting at a junction are each close to its point, but may
+        # not be close enough to each other, so move them all onto it.
+        for end in partner:
+            path = self._own_path(edges[end // 2])
+            point = Point(*junction_points[junctions[end]])
+            if end % 2 == 0:
+                path.segments[0].a = point
+            else:
+                path.segments[-1].b = point
+
+        # Follow the pairings to find chains of edges. Start from ends that
+        # aren't paired, then whatever is left over is a cycle. Each chain is
+        # a list of the ends that it enters each edge from.
+        visited = bytearray(len(edges))
+        unpaired = [
+            end for end in range(len(end_points)) if end not in partner
+        ]
+        chains = []
+        for first_end in unpaired + list(range(0, len(end_points), 2)):
+            if visited[first_end // 2]:
+                continue
+            chain = []
+            end = first_end
+            closed = False
+            while True:
+                visited[end // 2] = 1
+                chain.append(end)
+                next_end = partner.get(end ^ 1)
+                if next_end is None:
+                    break
+                if visited[next_end // 2]:
+                    closed = next_end == first_end
+                    break
+                end = next_end
+            chains.append((chain, closed))
+
+        # Join each chain into its first path.
+        paper_indexes_to_remove = set()
+        for chain, closed in chains:
+            joined = self._own_path(edges[chain[0] // 2])
+            if chain[0] % 2 == 1:
+                joined.reverse()
+            for end in chain[1:]:
+                paper_index = edges[end // 2]
+                path = self._own_path(paper_index)
+                if end % 2 == 1:
+                    path.reverse()
+                joined.extend(path)
+                paper_indexes_to_remove.add(paper_index)
+            if closed:
+                joined.segments[-1].join_with(joined.segments[0])
+
+        self.paths = [
+            p for (i, p) in enumerate(self._paths)
+            if i not in paper_indexes_to_remove
         ]
 
+    def _pair_junction_ends(self, edges, ends):
+        # Pair up the path ends meeting at a junction, so that paths go
+        # through it as straight as possible. Only paths with compatible
+        # modes can be paired.
+        paths = {}
+        headings = {}
+        for end in ends:
+            path = self._paths[edges[end // 2]]
+            paths[end] = path
+            # Find the heading leading away from the junction.
+            if end % 2 == 0:
+                headings[end] = path.segments[0].start_heading.theta
+            else:
+                headings[end] = path.segments[-1].end_heading.theta + 180
+
+        def compatible(a, b):
+            return modes_compatible(paths[a].mode, paths[b].mode)
+
+        def turn(a, b):
+            # How far the path turns going in through a and out through b.
+            t = (headings[b] - headings[a] - 180) % 360
+            return min(t, 360 - t)
+
+        if len(ends) <= MAX_JUNCTION_SEARCH:
+            candidates = sorted(
+                (turn(a, b), a, b)
+                for a, b in combinations(ends, 2)
+                if compatible(a, b)
+            )
+        else:
+            # Too many paths to try every pair. Sort the ends by heading, and
+            # only try the ones that are about opposite each other.
+            ends = sorted(ends, key=lambda end: headings[end] % 360)
+            n = len(ends)
+            candidates = sorted(
+                (turn(a, b), a, b)
+                for i, a in enumerate(ends)
+                for b in (ends[(i + n // 2 + k) % n] for k in (-1, 0, 1))
+                if a != b and compatible(a, b)
+            )
+
+        paired = set()
+        for _, a, b in candidates:
+            if a in paired or b in paired:
+                continue
+            paired.add(a)
+            paired.add(b)
+            yield a, b
+
+    def _snap_nodes(self, paths, nodes, a, b):
+        # Close the gap between two path ends from join_paths(). Straight
+        # ends meet in the middle, otherwise one end moves to the other.
+        path_a = self._own_path(paths[a // 2])
+        path_b = self._own_path(paths[b // 2])
+        a_at_start = a % 2 == 0
+        b_at_start = b % 2 == 0
+        seg_a = path_a.segments[0 if a_at_start else -1]
+        seg_b = path_b.segments[0 if b_at_start else -1]
+        if isinstance(seg_a, LineSegment) and isinstance(seg_b, LineSegment):
+            point = vec.div(vec.add(nodes[a], nodes[b]), 2)
+            path_a.snap_end_to(point, a_at_start)
+            path_b.snap_end_to(point, b_at_start)
+        elif isinstance(seg_a, LineSegment):
+            path_a.snap_end_to(nodes[b], a_at_start)
+        else:
+            path_b.snap_end_to(nodes[a], b_at_start)
+
+    def remove_overlaps(self):
+        """
+        Remove stroke segments that are drawn over by an identical segment
+        later on, and merge straight stroke segments that overlap along the
+        same line.
+
+        Only paths with a stroke width are changed. Merged strokes are drawn
+        in place of the topmost stroke that they replace. Returns the number
+        of segments removed.
+        """
+        removed, replaced = overlap.find_overlaps(self._paths)
+        affected = {path_index for path_index, _ in removed}
+        affected.update(path_index for path_index, _ in replaced)
+        if not affected:
+            return 0
+
+        paths = []
+        for path_index, path in enumerate(self._paths):
+            if path_index in affected:
+                path = self._own_path(path_index)
+                path.segments = [
+                    replaced.get((path_index, segment_index), seg)
+                    for segment_index, seg in enumerate(path.segments)
+                    if (path_index, segment_index) not in removed
+                ]
+                path.loop_start_segment = None
+                if not path.segments:
+                    continue
+            paths.append(path)
+        self.paths = paths
+        return len(removed)
+
+    def simplify(self, tolerance):
+        """
+        Reduce the detail in every path to what can be seen at `tolerance`
+        units, such as the size of a pixel.
+        """
+        for path in self._owned_paths():
+            path.simplify(tolerance)
+
+    def fit_arcs(self, tolerance):
+        """
+        Replace runs of straight segments with arcs, wherever that stays
+        within `tolerance` of the original points.
+        """
+        for path in self._owned_paths():
+            path.fit_arcs(tolerance)
+
     def fuse_paths(self):
-        for path in self.paths:
+        for path in self._owned_paths():
             path.fuse()
 
     def copy(self):
+        """
+        Copy the paper.
+
+        This takes constant time. The copy shares its paths with the original
+        until either of them changes a path, at which point that path is
+        copied.
+        """
         other = Paper()
-        other.paths = [p.copy() for p in self.paths]
-        other.text_elements = [e.copy() for e in self.text_elements]
-        if self._bounds_override is not None:
-            other._bounds_override = self._bounds_override.copy()
+        other._share_from(self)
         return other
 
+    def restore(self, other):
+        """
+        Make this paper a copy of another one, in constant time.
+
+        This is used to go back to an earlier copy of a paper without creating
+        a new Paper object.
+        """
+        self._share_from(other)
+
+    def _share_from(self, other):
+        self._paths = other._paths
+        self._segment_index = None
+        self._text_elements = other._text_elements
+        self._shared = other._shared = True
+        # Everything either paper owned is now shared between them.
+        self._token = _Token()
+        other._token = _Token()
+        self._paths_owned = self._text_owned = False
+        other._paths_owned = other._text_owned = False
+        if other._bounds_override is None:
+            self._bounds_override = None
+        else:
+            self._bounds_override = other._bounds_override.copy()
+
     def bounds(self):
         if self._bounds_override is not None:
             return copy(self._bounds_override)
-        if len(self.paths) == 0:
+        if len(self._paths) == 0:
             raise ValueError('Empty page, cannot calculate bounds.')
         return Bounds.union_all(
             path.bounds()
-            for path in self.paths
+            for path in self._paths
         )
 
     def override_bounds(self, *args):
@@ -178,9 +677,9 @@ class Paper:
             if self._bounds_override is None:
                 self.override_bounds(self.bounds())
 
-        for path in self.paths:
+        for path in self._owned_paths():
             path.translate(offset)
-        for text_element in self.text_elements:
+        for text_element in self._owned_text_elements():
             text_element.translate(offset)
 
     def center_on_x(self, x_center):
@@ -194,25 +693,176 @@ class Paper:
         self.translate((0, y_center - current_y_center))
 
     def mirror_x(self, x_center):
-        for element in self.paths:
+        for element in self._owned_paths():
             element.mirror_x(x_center)
         if self._bounds_override is not None:
             self._bounds_override.mirror_x(x_center)
 
     def mirror_y(self, y_center):
-        for element in self.paths:
+        for element in self._owned_paths():
             element.mirror_y(y_center)
         if self._bounds_override is not None:
             self._bounds_override.mirror_y(y_center)
 
-    def format_svg(self, precision=12, resolution=10):
-        element_data = '\n'.join(self.svg_elements(precision))
+    def transform(self, matrix):
+        """
+        Apply an affine transformation matrix to all the paths and text in the
+        paper, and to the bounds if they are overridden.
+
+        Only similarity transforms are supported, because arcs and stroke
+        widths can't be skewed or stretched unevenly. Text is moved and
+        resized, but stays upright.
+
+        >>> paper = Paper()
+        >>> paper.override_bounds(0, 0, 2, 1)
+        >>> paper.transform([[0, -1, 0], [1, 0, 0]])
+        >>> paper.bounds()
+        Bounds(-1.0, 0.0, 0.0, 2.0)
+        """
+        scale, rotation, reflect = decompose_similarity(matrix)
+
+        # Gather up every point in the drawing, and transform them together.
+        paths = list(self._owned_paths())
+        text_elements = list(self._owned_text_elements())
+        segments = [seg for path in paths for seg in path.segments]
+        points = [p for seg in segments for p in seg.points()]
+        points.extend(e.position for e in text_elements)
+        if self._bounds_override is not None:
+            b = self._bounds_override
+            points.extend([
+                (b.left, b.bottom),
+                (b.left, b.top),
+                (b.right, b.bottom),
+                (b.right, b.top),
+            ])
+        points = iter(transform_points(matrix, points))
+
+        for seg in segments:
+            seg_points = list(islice(points, len(seg.point_fields)))
+            seg._transform(seg_points, scale, rotation, reflect)
+        for path in paths:
+            path.mode = path.mode.scaled(scale)
+        for text_element in text_elements:
+            text_element._transform(next(points), scale)
+        if self._bounds_override is not None:
+            xs, ys = zip(*points)
+            self.override_bounds(min(xs), min(ys), max(xs), max(ys))
 
+    def rotate(self, angle, center=(0, 0)):
+        """
+        Rotate the paper counterclockwise by `angle` degrees around `center`.
+        """
+        self.transform(rotation_matrix(angle, center))
+
+    def scale(self, factor, center=(0, 0)):
+        """
+        Scale the paper by `factor`, keeping `center` in place.
+        """
+        self.transform(scale_matrix(factor, center))
+
+    def optimize_plot_order(self, home=(0, 0)):
+        """
+        Reorder the paths, and reverse open paths where that helps, so that a
+        pen plotter starting at `home` spends less time moving with the pen
+        lifted.
+
+        Returns the pen-up travel distance before and after.
+        """
+        before = plot.travel_distance(self._paths, home)
+        self._unshare()
+        paths = self._paths
+        ordered_paths = []
+        for index, reverse in plot.plot_order(paths, home):
+            if reverse:
+                self._own_path(index).reverse()
+            ordered_paths.append(paths[index])
+        self.paths = ordered_paths
+        after = plot.travel_distance(self._paths, home)
+        return before, after
+
+    def format_hpgl(self, scale=40):
+        return plot.hpgl(self._paths, scale)
+
+    def format_gcode(self, scale=1, precision=3, **kwargs):
+        return plot.gcode(self._paths, scale, precision, **kwargs)
+
+    def format_svg(
+        self, precision=12, resolution=10, lod=False, circles=False,
+        merge=False, gradients=False, reorder=False, display=None,
+    ):
+        """
+        Write the paper as an SVG document, `resolution` pixels per unit.
+
+        If `lod` is True, detail smaller than a pixel is simplified away first,
+        which makes much smaller files for thumbnails. For `circles`, `merge`,
+        `gradients`, `reorder` and `display`, see svg_elements().
+        """
+        return ''.join(self._iter_svg_document(
+            precision, resolution, lod, circles, merge, gradients, reorder,
+            display,
+        ))
+
+    def write_svgz(
+        self, f, precision=12, resolution=10, compresslevel=9, lod=False,
+        circles=False, merge=False, gradients=False, reorder=False,
+        display=None,
+    ):
+        """
+        Write the paper as a gzip compressed SVG document to `f`, which is
+        either a filename or a binary file object.
+
+        The document is compressed as it is made, so the whole of it is never
+        held in memory. With `reorder`, elements of the same color are put
+        next to each other where possible, which usually compresses better.
+        The other options are as for format_svg().
+        """
+        with gzip.GzipFile(
+            filename=f if isinstance(f, str) else None,
+            mode='wb',
+            compresslevel=compresslevel,
+            fileobj=None if isinstance(f, str) else f,
+            mtime=0,
+        ) as gzip_file:
+            chunk = []
+            size = 0
+            for piece in self._iter_svg_document(
+                precision, resolution, lod, circles, merge, gradients,
+                reorder, display,
+            ):
+                chunk.append(piece)
+                size += len(piece)
+                if size >= SVGZ_CHUNK_SIZE:
+                    gzip_file.write(''.join(chunk).encode())
+                    chunk = []
+                    size = 0
+            gzip_file.write(''.join(chunk).encode())
+
+    def _iter_svg_document(
+        self, precision, resolution, lod, circles, merge, gradients, reorder,
+        display,
+    ):
+        # Make the pieces of an svg document, in order.
+        if lod:
+            if display is not None:
+                raise ValueError('Cannot simplify a display list for lod.')
+            paper = self.copy()
+            paper.simplify(1 / resolution)
+        else:
+            paper = self
+
+        yield self._svg_header(resolution)
+        elements = paper._iter_svg_elements(
+            precision, circles, merge, gradients, reorder, display,
+        )
+        for i, element in enumerate(elements):
+            if i > 0:
+                yield '\n'
+            yield element
+        yield SVG_FOOTER
+
+    def _svg_header(self, resolution):
         # Transform world-coordinate bounding box into svg-coordinate view box.
-        try:
-            bounds = self.bounds()
-        except ValueError:
-            bounds = Bounds(-10, -10, 10, 10)
+        bounds = self._page_bounds()
         view_x = bounds.left
         view_y = -bounds.top
         view_width = bounds.width
@@ -222,29 +872,7 @@ class Paper:
         pixel_width = resolution * bounds.width
         pixel_height = resolution * bounds.height
 
-        svg_template = dedent('''\
-            <?xml version="1.0" standalone="no"?>
-            <!DOCTYPE svg PUBLIC "-//W3C//DTD SVG 1.1//EN"
-                "http://www.w3.org/Graphics/SVG/1.1/DTD/svg11.dtd">
-            <svg
-                xmlns="http://www.w3.org/2000/svg" version="1.1"
-                xmlns:xlink="http://www.w3.org/1999/xlink"
-                viewBox="$view_x $view_y $view_width $view_height"
-                width="${pixel_width}px" height="${pixel_height}px"
-            >
-                <rect
-                    style="fill: #FFF"
-                    x="$view_x"
-                    y="$view_y"
-                    width="$view_width"
-                    height="$view_height"
-                />
-                $element_data
-            </svg>
-        ''')
-        t = Template(svg_template)
-        return t.substitute(
-            element_data=element_data,
+        return SVG_HEADER.substitute(
             view_x=view_x,
             view_y=view_y,
             view_height=view_height,
@@ -253,8 +881,161 @@ class Paper:
             pixel_height=pixel_height,
         )
 
-    def svg_elements(self, precision):
-        return [
-            element.svg(precision)
-            for element in self.paths + self.text_elements
-        ]
+    def _iter_path_parts(self, display, precision, circles, gradient_ids):
+        # Make a list of the parts of the svg for each path, which are either
+        # finished elements, or the (color, path_data, bounds) of each filled
+        # element in the display list.
+        ranges = display.path_ranges(len(self._paths))
+        for path, elements in zip(self._paths, ranges):
+            if gradient_ids is not None:
+                element = gradient_svg(path, precision, gradient_ids)
+                if element is not None:
+                    yield [element]
+                    continue
+            if circles:
+                element = path.mode.circle_element(path, precision)
+                if element is not None:
+                    yield [element]
+                    continue
+            yield [display.render_bounds(i, precision) for i in elements]
+
+    def display_list(self):
+        """
+        Draw the paths on the paper into a DisplayList of filled elements,
+        which can be written to several outputs without drawing them again,
+        by passing it as `display` to format_svg(), format_png(),
+        format_json() and find_intersections(). Text is not included.
+        """
+        return DisplayList.from_paper(self)
+
+    def find_intersections(self, display=None):
+        """
+        Find everywhere that the outlines of the drawing cross or run along
+        each other, such as where strokes overlap or a thick stroke turns
+        too tightly. Returns a list of Intersections, see
+        intersections.find_intersections().
+        """
+        if display is None:
+            display = self.display_list()
+        return intersections.find_intersections(display)
+
+    def hit_test(self, point, tolerance):
+        """
+        Find the segments drawn within `tolerance` of `point`, such as the
+        ones under a mouse cursor. Thick segments count as reaching half
+        their width from their center line. Returns a list of (path, segment)
+        pairs, with the topmost first.
+        """
+        return self._current_segment_index().hit_test(point, tolerance)
+
+    def nearest_endpoint(self, point):
+        """
+        Find the segment end point nearest to `point`, for snapping to.
+        Returns a (distance, point, path, segment) tuple, or None if nothing
+        has been drawn.
+        """
+        return self._current_segment_index().nearest_endpoint(point)
+
+    def _current_segment_index(self):
+        index = self._segment_index
+        if self._token.changed:
+            # A path was changed through self.paths.
+            self._token.changed = False
+            index = None
+        if index is not None and not index.covers(self._paths):
+            # The list of paths was changed through self.paths.
+            index = None
+        if index is not None:
+            index.update()
+        if index is None or index.outgrown():
+            index = self._segment_index = SegmentIndex(self._paths)
+        return index
+
+    def format_json(self, display=None):
+        """
+        Write the filled elements of the paper as JSON, for other programs to
+        draw. See DisplayList.json_data().
+        """
+        if display is None:
+            display = self.display_list()
+        return display.format_json()
+
+    def format_png(
+        self, resolution=10, antialias=4, workers=None, display=None,
+    ):
+        """
+        Render the paper as PNG image data, with `resolution` pixels per unit.
+
+        Each pixel is sampled `antialias` times in each direction. The image
+        is rendered in bands, spread over `workers` processes. By default,
+        small images are rendered in this process, and large ones use a
+        process per CPU. Text is not rendered.
+        """
+        if display is None:
+            display = self.display_list()
+        image = raster.render(
+            display,
+            self._page_bounds(),
+            resolution=resolution,
+            antialias=antialias,
+            workers=workers,
+        )
+        return raster.png_data(image)
+
+    def _page_bounds(self):
+        try:
+            return self.bounds()
+        except ValueError:
+            return Bounds(-10, -10, 10, 10)
+
+    def svg_elements(
+        self, precision, circles=False, merge=False, gradients=False,
+        reorder=False, display=None,
+    ):
+        """
+        Make the svg elements for the paths and text on the paper.
+
+        If `circles` is True, plain filled or stroked circles are written as
+        <circle> elements, which are much smaller and faster to produce.
+
+        If `merge` is True, consecutive path elements with the same color are
+        combined into one element where they don't overlap, which makes for
+        far fewer elements in drawings with many small shapes.
+
+        If `gradients` is True, strokes that change color along their length
+        are drawn as a few outlines filled with linear gradients, rather than
+        one outline per color.
+
+        If `reorder` is True, path elements are moved next to earlier ones
+        with the same color, where they don't overlap anything in between.
+        The drawing looks the same, but is more regular.
+
+        The paths are drawn from `display`, a DisplayList made by
+        display_list() that can be shared with other formats. By default, a
+        new one is made.
+        """
+        return list(self._iter_svg_elements(
+            precision, circles, merge, gradients, reorder, display,
+        ))
+
+    def _iter_svg_elements(
+        self, precision, circles, merge, gradients, reorder, display,
+    ):
+        if display is None:
+            display = self.display_list()
+        ids = count() if gradients else None
+        parts = self._iter_path_parts(display, precision, circles, ids)
+        if merge or reorder:
+            items = (item for path_parts in parts for item in path_parts)
+            if reorder:
+                items = reorder_path_elements(items)
+            if merge:
+                yield from merge_path_elements(items)
+            else:
+                for item in items:
+                    yield _svg_element(item)
+        else:
+            for path_parts in parts:
+                yield ''.join(_svg_element(item) for item in path_parts)
+        for text_element in self._text_elements:
+            yield text_element.svg(precision)
@@ -1,49 +1,127 @@
-from .point import Point, points_equal
+from itertools import islice
+
+import vec
+from .point import Point, points_equal, float_equal
 from .bounds import Bounds
-from .segment import LineSegment, ArcSegment
-from .svg import (
-    path_move,
-    path_line,
-    path_arc,
-    path_close,
-)
+from .chunked import ChunkedList, CHUNK_SIZE
+from .segment import LineSegment, ArcSegment, flat_cap
+from .mode import FillMode, modes_compatible
+from .svg import path_data, MOVE, LINE, ARC, CLOSE
 from .geometry import collinear
+from .simplify import simplified_segments, fitted_segments
 
 
 class Path:
 
     def __init__(self, mode):
+        # The token of the paper that owns this path, see Paper._own_path().
+        self._token = None
+
         self.mode = mode
         self.segments = []
 
         self.loop_start_segment = None
 
-    def svg(self, precision):
+    @property
+    def segments(self):
+        return self._segments
+
+    @segments.setter
+    def segments(self, segments):
+        if not isinstance(segments, ChunkedList):
+            segments = ChunkedList(segments, copy_items=True)
+        self._segments = segments
+        self._changed()
+
+    def _changed(self):
+        # Let the paper that owns this path know that it has changed, other
+        # than by adding segments to the end, see Paper._segment_index.
+        if self._token is not None:
+            self._token.changed = True
+
+    def svg(self, precision, circles=False):
         # Defer to the drawing mode to actually turn our path data into
         # svg code. The mode will then call some combination of
         # Path.render_path() and Path.draw_outline() to produce the finished
         # styled drawing.
-        return self.mode.svg(self, precision)
+        return self.mode.svg(self, precision, circles)
+
+    def circle(self):
+        """
+        If this path is a plain circle, as drawn by Pen.circle(), return its
+        center and radius. Otherwise return None.
+        """
+        if len(self.segments) != 2:
+            return None
+        first, second = self.segments
+        if not (
+            isinstance(first, ArcSegment)
+            and isinstance(second, ArcSegment)
+            and float_equal(abs(first.arc_angle.theta), 180)
+            and float_equal(first.arc_angle.theta, second.arc_angle.theta)
+            and float_equal(first.radius, second.radius)
+            and points_equal(first.center, second.center)
+            and points_equal(first.b, second.a)
+            and points_equal(second.b, first.a)
+            and first.width == second.width
+            and first.color == second.color
+            and first.start_slant is None
+            and first.end_slant is None
+            and second.start_slant is None
+            and second.end_slant is None
+        ):
+            return None
+        return first.center, abs(first.radius)
 
     def bounds(self):
         return Bounds.union_all(seg.bounds() for seg in self.segments)
 
-    def copy(self):
-        other = Path(self.mode.copy())
+    def copy(self, share_segments=False):
+        """
+        Copy the path.
+
+        If `share_segments` is True, the copy shares its segments with this
+        path, and copies them a chunk at a time as it changes them. Only
+        add_segment() takes care of that, so the copy must not be changed in
+        any other way until after own_segments().
+        """
+        other = Path(self.mode)
+        if share_segments:
+            other.segments = self.segments.copy()
+            other.loop_start_segment = self.loop_start_segment
+            return other
         other.segments = [seg.copy() for seg in self.segments]
         if self.loop_start_segment is not None:
-            other.loop_start_segment = self.loop_start_segment.copy()
+            # Keep referring to the same segment within the copied path.
+            for seg, other_seg in zip(self.segments, other.segments):
+                if seg is self.loop_start_segment:
+                    other.loop_start_segment = other_seg
+                    break
+            else:
+                other.loop_start_segment = self.loop_start_segment.copy()
         return other
 
+    def own_segments(self):
+        """
+        Copy any segments that are shared with another path, see copy().
+        """
+        if self.segments.shared:
+            if self.loop_start_segment is not None:
+                self._own_loop_start()
+            self.segments.own_all()
+
     def translate(self, offset):
+        self._changed()
         for seg in self.segments:
             seg.translate(offset)
 
     def mirror_x(self, x_center):
+        self._changed()
         for seg in self.segments:
             seg.mirror_x(x_center)
 
     def mirror_y(self, y_center):
+        self._changed()
         for seg in self.segments:
             seg.mirror_y(y_center)
 
@@ -70,10 +148,70 @@ class Path:
         #     id(self), id(other),
         # ))
 
+        self.extend(other)
+
+    def extend(self, other):
+        """
+        Add the segments of the other path onto the end of this one. The
+        other path must start where this one ends.
+        """
+        self._changed()
         self.segments[-1].join_with(other.segments[0])
         self.segments.extend(other.segments)
 
+    def snap_end_to(self, point, at_start=False):
+        """
+        Close a small gap between the end of this path and `point`, so that
+        the path ends exactly there. If `at_start` is True, the start of the
+        path is moved instead.
+
+        A straight end segment is moved to the new point. Arcs can't be moved
+        without changing their shape, so a short line segment is added
+        instead.
+        """
+        self._changed()
+        point = Point(*point)
+        if at_start:
+            seg = self.segments[0]
+            current = seg.a
+        else:
+            seg = self.segments[-1]
+            current = seg.b
+        if points_equal(current, point):
+            return
+
+        gap = vec.mag(vec.vfrom(current, point))
+        length = vec.mag(vec.vfrom(seg.a, seg.b))
+        if isinstance(seg, LineSegment) and length > 2 * gap:
+            if at_start:
+                seg.a = point
+            else:
+                seg.b = point
+            if seg.can_set_slant():
+                seg.set_slants(seg.start_slant, seg.end_slant)
+            # Redo the joint at the other end of the segment.
+            if len(self.segments) > 1:
+                if at_start:
+                    before, after = seg, self.segments[1]
+                else:
+                    before, after = self.segments[-2], seg
+                if points_equal(before.b, after.a):
+                    before.join_with(after)
+        elif at_start:
+            bridge = LineSegment(
+                point, current, seg.width, seg.color, None, None,
+            )
+            bridge.join_with(seg)
+            self.segments.insert(0, bridge)
+        else:
+            bridge = LineSegment(
+                current, point, seg.width, seg.color, None, None,
+            )
+            seg.join_with(bridge)
+            self.segments.append(bridge)
+
     def reverse(self):
+        self._changed()
         self.segments.reverse()
         for segment in self.segments:
             segment.reverse()
@@ -84,10 +222,9 @@ class Path:
         combined without loss into a single segment.
         """
         # TODO: Don't fuse unless they have None as the end slants?
-        i = 0
-        while i < len(self.segments) - 1:
-            left = self.segments[i]
-            right = self.segments[i + 1]
+        segments = []
+        for right in self.segments:
+            left = segments[-1] if segments else None
             if (
                 isinstance(left, LineSegment)
                 and isinstance(right, LineSegment)
@@ -95,82 +232,191 @@ class Path:
                 and left.color == right.color
                 and collinear(left.a, left.b, right.b)
             ):
-                fused_segment = left.fused_with(right)
-                self.segments[i:i+2] = [fused_segment]
-                # Leave i unchanged so fused_segment will be the
-                # "left" segment next iteration.
+                # The fused segment is the "left" segment for the next one.
+                segments[-1] = left.fused_with(right)
             else:
-                # Cannot fuse, try the next pair.
-                i += 1
+                segments.append(right)
+        self.segments = segments
+
+    def simplify(self, tolerance):
+        """
+        Reduce the detail in this path, so that it moves no more than
+        `tolerance` away from where it was. See canoepaddle.simplify.
+        """
+        self._replace_segments(simplified_segments(self, tolerance))
+
+    def fit_arcs(self, tolerance):
+        """
+        Replace runs of straight segments in this path with arcs, staying
+        within `tolerance` of their points.
+        """
+        self._replace_segments(fitted_segments(self, tolerance))
+
+    def _replace_segments(self, segments):
+        # Join the new segments the same way the pen would.
+        other = Path(self.mode)
+        for seg in segments:
+            other.add_segment(seg)
+        self.segments = other.segments
+        self.loop_start_segment = other.loop_start_segment
 
     def add_segment(self, new_segment):
-        if not self.segments:
-            self.segments.append(new_segment)
+        segments = self.segments
+        if not segments:
+            segments.append(new_segment)
             self.loop_start_segment = new_segment
             return
 
         # Check whether we need to join with the last segment.
-        last_segment = self.segments[-1]
-        if points_equal(last_segment.b, new_segment.a):
-            last_segment.join_with(new_segment)
-        else:
+        joined = points_equal(segments[-1].b, new_segment.a)
+        if not joined:
             # The new segment does not connect to the last one, so it starts a
             # new potential loop.
             self.loop_start_segment = new_segment
 
         # Check whether we need to join to the first segment.
-        if (
-            self.loop_start_segment is not None
-            and points_equal(new_segment.b, self.loop_start_segment.a)
-        ):
-            new_segment.join_with(self.loop_start_segment)
+        loop_start = self.loop_start_segment
+        closed = (
+            loop_start is not None
+            and points_equal(new_segment.b, loop_start.a)
+        )
+        # The last segment is copied before it is changed or added to, if it
+        # is shared with another path, see copy(). The start of the loop
+        # might be copied along with it, so find that first.
+        if loop_start is not None and loop_start is not new_segment:
+            if closed:
+                loop_start = self._own_loop_start()
+            elif not segments.owns(-1):
+                self._own_loop_start(CHUNK_SIZE)
+        if joined:
+            segments.own(-1).join_with(new_segment)
+        if closed:
+            new_segment.join_with(loop_start)
             self.loop_start_segment = None
 
-        self.segments.append(new_segment)
+        segments.append(new_segment)
+
+    def _own_loop_start(self, limit=None):
+        # Get the start of the loop for changing it, in case it is shared
+        # with another path. It is usually near the end, so look for it from
+        # there, as far back as `limit`.
+        seg = self.loop_start_segment
+        for i, other in enumerate(islice(reversed(self.segments), limit), 1):
+            if other is seg:
+                seg = self.loop_start_segment = self.segments.own(-i)
+                break
+        return seg
 
     def render_path(self, precision):
+        return path_data(*self.render_commands(), precision=precision)
+
+    def render_commands(self):
+        """
+        Get the svg path commands that draw this path, as a list of command
+        codes and a list of (x, y, center_x, center_y, radius, arc_angle)
+        rows, see svg.path_data(). Moves and lines only use x and y.
+        """
         assert len(self.segments) > 0
 
-        path_data = []
-        start_point = p = Point(*self.segments[0].a)
+        commands = []
+        coords = []
+        start_point = self.segments[0].a
         last_point = None
         for seg in self.segments:
             if not points_equal(seg.a, last_point):
                 start_point = seg.a
-                path_data.append(path_move(seg.a.x, seg.a.y, precision))
-            last_point = p = Point(*seg.b)
+                commands.append(MOVE)
+                coords.append((seg.a.x, seg.a.y, 0, 0, 0, 0))
+            last_point = seg.b
             if isinstance(seg, LineSegment):
-                path_data.append(path_line(
-                    p.x,
-                    p.y,
-                    precision,
-                ))
+                commands.append(LINE)
+                coords.append((seg.b.x, seg.b.y, 0, 0, 0, 0))
             elif isinstance(seg, ArcSegment):
-                path_data.append(path_arc(
-                    p.x,
-                    p.y,
-                    seg.arc_angle,
+                commands.append(ARC)
+                coords.append((
+                    seg.b.x,
+                    seg.b.y,
+                    seg.center.x,
+                    seg.center.y,
                     seg.radius,
-                    precision,
+                    seg.arc_angle.theta,
                 ))
             # Close the path if necessary.
             if points_equal(seg.b, start_point):
-                path_data.append(path_close())
+                commands.append(CLOSE)
+                coords.append((0, 0, 0, 0, 0, 0))
                 last_point = None
 
-        return ' '.join(path_data)
+        return commands, coords
+
+    def outline(self):
+        """
+        Trace the outline of each continuous run of one color in this path,
+        taking into account its thickness.
+
+        Returns a list of (color, segments) pairs, with thin segments going
+        around each run, to be turned into paths by outline_paths(). If any
+        segment has a custom end cap, which could do anything with the pen,
+        returns None, and the outline has to be drawn with draw_outline()
+        instead.
+        """
+        from .pen import Pen
+        if any(
+            seg.start_cap is not flat_cap or seg.end_cap is not flat_cap
+            for seg in self.segments
+        ):
+            return None
+        outline = []
+        for color, segments in group_segments(self.segments):
+            # Each run is traced from scratch, so it can have its own pen.
+            pen = Pen()
+            pen.set_mode(FillMode())
+            loop = points_equal(segments[-1].b, segments[0].a)
+            draw_thick_segments(pen, segments, loop=loop)
+            outline.append((
+                color,
+                [seg for path in pen.paper.paths for seg in path.segments],
+            ))
+        return outline
 
-    def draw_outline(self, pen, precision):
+    def draw_outline(self, pen):
         # Draw along the outline of each path section using the temporary pen
         # we are given.
         for color, segments in group_segments(self.segments):
-            mode = pen.mode
-            mode.color = color
-            pen.set_mode(mode)
+            pen.set_mode(pen.mode.replace(color=color))
             loop = points_equal(segments[-1].b, segments[0].a)
             draw_thick_segments(pen, segments, loop=loop)
 
 
+def outline_paths(outline, mode):
+    """
+    Make the paths that draw_outline() would draw with a pen in `mode`, from
+    an outline traced by Path.outline().
+    """
+    paths = []
+    for color, segments in outline:
+        # Change color the same way draw_outline() does.
+        mode = mode.replace(color=color).inherit_colors(mode)
+        for seg in segments:
+            if isinstance(seg, ArcSegment):
+                seg = ArcSegment(
+                    seg.a, seg.b, mode.width, mode.color, None, None,
+                    seg.center, seg.radius, seg.arc_angle,
+                    seg.start_heading, seg.end_heading,
+                )
+            else:
+                seg = LineSegment(
+                    seg.a, seg.b, mode.width, mode.color, None, None,
+                )
+            if paths and modes_compatible(paths[-1].mode, mode):
+                paths[-1].add_segment(seg)
+            else:
+                path = Path(mode)
+                path.add_segment(seg)
+                paths.append(path)
+    return paths
+
+
 def draw_thick_segments(pen, segments, loop):
 
     def draw_segment_right(seg, first=False, last=False):
@@ -1,5 +1,6 @@
 import math
 import itertools
+from collections import namedtuple
 from copy import copy
 from functools import wraps
 
@@ -10,21 +11,33 @@ from .text import Text
 from .segment import LineSegment, ArcSegment
 from .mode import FillMode, StrokeMode, OutlineMode, modes_compatible
 from .point import Point, points_equal
-from .geometry import intersect_lines
+from .geometry import intersect_lines, sample_curve
+from .biarc import fit_biarcs
 from .heading import Heading, Angle
 
 
+Snapshot = namedtuple(
+    'Snapshot',
+    'paper, mode, heading, position, stroke_break, log',
+)
+
+# How many steps to split a parametric curve into before refining it.
+PARAMETRIC_INTERVALS = 16
+
+
 def logged(method):
     """
     Decorator to keep track of each time this method is called.
     """
     @wraps(method)
     def wrapper(self, *args, **kwargs):
-        self._log.append((method.__name__, copy(args), copy(kwargs)))
-        # Don't keep extra log entries added through this call.
-        len_before = len(self._log)
+        if not self.paper.keep_pen_log:
+            return method(self, *args, **kwargs)
+        entry = (method.__name__, copy(args), copy(kwargs))
+        log = self._log = (self._log, entry)
         method(self, *args, **kwargs)
-        del self._log[len_before:]
+        # Don't keep extra log entries added through this call.
+        self._log = log
     return wrapper
 
 
@@ -37,7 +50,9 @@ class Pen:
         self._mode = None
         self._heading = Heading(0)
         self._position = Point(0.0, 0.0)
-        self._log = []
+        # The log is a linked list of (previous, entry) pairs, so that copies
+        # of the pen can share their history.
+        self._log = None
         # If self._break is False, then self.last_path() is the current
         # drawing path.
         self._break = True
@@ -56,7 +71,7 @@ class Pen:
     def mode(self):
         if self._mode is None:
             raise AttributeError('Mode not set.')
-        return self._mode.copy()
+        return self._mode
 
     @logged
     def fill_mode(self, color=None):
@@ -82,11 +97,11 @@ class Pen:
     @logged
     def set_mode(self, mode):
         if self._mode is not None:
-            mode.copy_colors(self._mode)
+            mode = mode.inherit_colors(self._mode)
         self._mode = mode
 
     def last_path(self):
-        return self.paper.paths[-1]
+        return self.paper._own_path(-1)
 
     def last_segment(self):
         return self.last_path().segments[-1]
@@ -152,13 +167,43 @@ class Pen:
         else:
             other._break = True
 
-        if self._mode is not None:
-            other._mode = self._mode.copy()
+        other._mode = self._mode
         other._heading = self._heading.copy()
         other._position = Point(*self._position)
-        other._log = copy(self._log)
+        other._log = self._log
         return other
 
+    def snapshot(self):
+        """
+        Save the state of the pen and its paper, to go back to later with
+        Pen.restore().
+
+        Snapshots share their paths and log with the pen, so taking one and
+        restoring one both take constant time. After a snapshot, the first
+        change to each path copies that path, except that continuing to draw
+        the current path only copies the end of it.
+        """
+        return Snapshot(
+            paper=self.paper.copy(),
+            mode=self._mode,
+            heading=self._heading,
+            position=self._position,
+            stroke_break=self._break,
+            log=self._log,
+        )
+
+    def restore(self, snapshot):
+        """
+        Go back to the state saved in a snapshot. The same snapshot can be
+        restored any number of times.
+        """
+        self.paper.restore(snapshot.paper)
+        self._mode = snapshot.mode
+        self._heading = snapshot.heading
+        self._position = snapshot.position
+        self._break = snapshot.stroke_break
+        self._log = snapshot.log
+
     # Turning.
 
     @logged
@@ -183,13 +228,14 @@ class Pen:
 
     @logged
     def line_to(self, point, start_slant=None, end_slant=None):
+        mode = self.mode
         old_position = self._position
         self.move_to(point)
         self._add_segment(LineSegment(
             a=old_position,
             b=self.position,
-            width=self.mode.width,
-            color=self.mode.color,
+            width=mode.width,
+            color=mode.color,
             start_slant=start_slant,
             end_slant=end_slant,
         ))
@@ -342,6 +388,7 @@ class Pen:
         Arcs that go to the left have a positive radius and arc angle.
         Arcs that go to the right have a negative radius and arc angle.
         """
+        mode = self.mode
         old_position = self._position
         old_heading = self._heading
         self.move_to(endpoint)
@@ -350,8 +397,8 @@ class Pen:
         self._add_segment(ArcSegment(
             a=old_position,
             b=endpoint,
-            width=self.mode.width,
-            color=self.mode.color,
+            width=mode.width,
+            color=mode.color,
             start_slant=start_slant,
             end_slant=end_slant,
             center=center,
@@ -396,7 +443,7 @@ class Pen:
     # Text.
 
     def text(self, text, size, font_family='sans-serif', color=None, centered=False):
-        self.paper.text_elements.append(Text(
+        self.paper.add_text(Text(
             text,
             self.position,
             font_family,
@@ -407,23 +454,65 @@ class Pen:
 
     # Parametric.
 
-    def parametric(self, func, start, end, step):
-        start_x, start_y = self.position
-        start_heading = self.heading
+    def parametric(
+        self, func, start, end, step=None, tolerance=None, arcs=False,
+    ):
+        """
+        Draw the curve given by `func` for t from `start` to `end`, relative
+        to the current position.
+
+        With a `step`, the curve is sampled at evenly spaced values of t.
+        With a `tolerance`, samples are placed closer together where the curve
+        bends, so that the drawing is within `tolerance` of the curve. If both
+        are given, the step sets the spacing to start from.
 
-        for i in itertools.count():
-            t = start + step * i
-            if t > end:
-                break
-            x, y = func(t)
+        If `arcs` is True, the curve is drawn with arcs instead of lines,
+        which takes far fewer segments. This requires a tolerance.
+        """
+        if step is None and tolerance is None:
+            raise ValueError('Either step or tolerance must be given.')
+        if arcs and tolerance is None:
+            raise ValueError('Fitting arcs requires a tolerance.')
 
-            x += start_x
-            y += start_y
+        start_x, start_y = self.position
+        start_heading = self.heading
 
-            if i == 0:
-                self.move_to((x, y))
+        if tolerance is None:
+            ts = []
+            for i in itertools.count():
+                t = start + step * i
+                if t > end:
+                    break
+                ts.append(t)
+            points = [func(t) for t in ts]
+        else:
+            if step is None:
+                intervals = PARAMETRIC_INTERVALS
             else:
-                self.line_to((x, y))
+                intervals = max(1, math.ceil((end - start) / step))
+            # Leave most of the tolerance for fitting arcs to the samples.
+            sample_tolerance = tolerance / 10 if arcs else tolerance
+            points = [
+                p for t, p in
+                sample_curve(func, start, end, sample_tolerance, intervals)
+            ]
+        points = [(x + start_x, y + start_y) for x, y in points]
+
+        if arcs:
+            self.move_to(points[0])
+            for seg in fit_biarcs(
+                points,
+                tolerance - sample_tolerance,
+                self.mode.width,
+                self.mode.color,
+            ):
+                self._add_segment(seg)
+        else:
+            for i, point in enumerate(points):
+                if i == 0:
+                    self.move_to(point)
+                else:
+                    self.line_to(point)
 
         self.move_to((start_x, start_y))
         self.turn_to(start_heading)
@@ -438,15 +527,17 @@ class Pen:
         # Continue the current path if possible.
         if (
             not self._break
-            and modes_compatible(self.last_path().mode, self.mode)
+            and modes_compatible(self.paper._paths[-1].mode, self._mode)
         ):
-            self.last_path().add_segment(new_segment)
+            path = self.paper._own_path(-1, appending=True)
+            path.add_segment(new_segment)
         else:
             # Start a new path if this is the first segment or there has been a
             # mode change.
             self._break = False
-            self.paper.paths.append(Path(self.mode))
-            self.last_path().add_segment(new_segment)
+            path = Path(self._mode)
+            path.add_segment(new_segment)
+            self.paper.add_path(path)
 
     def _vector(self, length=1):
         """
@@ -474,8 +565,15 @@ class Pen:
         return vec.add(self.position, (x_diff, y_diff))
 
     def log(self):
+        entries = []
+        node = self._log
+        while node is not None:
+            node, entry = node
+            entries.append(entry)
+        entries.reverse()
+
         result = []
-        for name, args, kwargs in self._log:
+        for name, args, kwargs in entries:
             arg_strings = []
             for arg in args:
                 if isinstance(arg, Point):
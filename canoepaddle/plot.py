@@ -0,0 +1,243 @@
+"""
+Export drawings for pen plotters.
+
+A plotter draws the centerline of each path with a physical pen, so stroke
+widths and fills are ignored. Between paths the pen is lifted and moved to the
+start of the next path, so the order that paths are drawn in, and which end
+they are drawn from, matters a lot for how long a plot takes.
+"""
+
+import numpy as np
+
+from .point import points_equal
+from .segment import ArcSegment
+from .spatial import PointTree
+from .svg import number
+
+# How many consecutive paths a single improvement step may reverse.
+DEFAULT_WINDOW = 32
+MAX_PASSES = 50
+
+
+def path_ends(paths):
+    """
+    Get the start points, end points, and whether each path is closed.
+    """
+    starts = [tuple(path.segments[0].a) for path in paths]
+    ends = [tuple(path.segments[-1].b) for path in paths]
+    closed = [points_equal(a, b) for a, b in zip(starts, ends)]
+    return starts, ends, closed
+
+
+def travel_distance(paths, home=(0, 0)):
+    """
+    Find the total distance the pen moves while lifted, starting from `home`
+    and plotting the paths in order.
+
+    >>> from canoepaddle import Pen
+    >>> p = Pen()
+    >>> p.fill_mode()
+    >>> p.move_to((3, 4))
+    >>> p.turn_to(0)
+    >>> p.line_forward(1)
+    >>> travel_distance(p.paper.paths)
+    5.0
+    """
+    if not paths:
+        return 0.0
+    starts, ends, _ = path_ends(paths)
+    starts = np.array(starts, dtype=float)
+    ends = np.vstack([home, np.array(ends, dtype=float)[:-1]])
+    between = _distances(ends, starts).sum()
+    # Paths can also have gaps in them, which are plotted the same either
+    # way around.
+    within = sum(
+        _distances(
+            np.array([run[-1].b for run in runs[:-1]], dtype=float),
+            np.array([run[0].a for run in runs[1:]], dtype=float),
+        ).sum()
+        for runs in (list(_runs(path)) for path in paths)
+        if len(runs) > 1
+    )
+    return float(between + within)
+
+
+def plot_order(paths, home=(0, 0), window=DEFAULT_WINDOW):
+    """
+    Choose an order for plotting the paths that keeps pen-up travel short.
+
+    Returns a list of (index, reverse) pairs, giving the index of each path
+    in plotting order, and whether it should be drawn backward.
+
+    The order starts as a nearest neighbor tour from `home`, found with a
+    k-d tree of the path ends, which is then improved by 2-opt moves. Each
+    move reverses a run of up to `window` consecutive paths.
+    """
+    if not paths:
+        return []
+    starts, ends, closed = path_ends(paths)
+    order, flipped = _nearest_neighbor_order(starts, ends, closed, home)
+    order, flipped = _two_opt(
+        np.array(order),
+        np.array(flipped, dtype=bool),
+        np.array(starts, dtype=float),
+        np.array(ends, dtype=float),
+        np.array(home, dtype=float),
+        window,
+    )
+    # Reversing closed paths makes no difference.
+    closed = np.array(closed, dtype=bool)
+    flipped &= ~closed[order]
+    return list(zip(order.tolist(), flipped.tolist()))
+
+
+def _nearest_neighbor_order(starts, ends, closed, home):
+    entries = []
+    for i, (start, end) in enumerate(zip(starts, ends)):
+        entries.append((start, (i, False)))
+        if not closed[i]:
+            entries.append((end, (i, True)))
+    tree = PointTree(entries)
+
+    order = []
+    flipped = []
+    position = home
+    while len(tree) > 0:
+        _, _, (i, flip) = tree.nearest(position)
+        tree.remove(starts[i], (i, False))
+        if not closed[i]:
+            tree.remove(ends[i], (i, True))
+        order.append(i)
+        flipped.append(flip)
+        position = starts[i] if flip else ends[i]
+    return order, flipped
+
+
+def _two_opt(order, flipped, starts, ends, home, window):
+    n = len(order)
+    for _ in range(MAX_PASSES):
+        f = flipped[:, np.newaxis]
+        s = np.where(f, ends[order], starts[order])
+        e = np.where(f, starts[order], ends[order])
+        previous_e = np.vstack([home, e[:-1]])
+        # The travel into each position, plus zero travel out of the end.
+        travel = np.append(_distances(previous_e, s), 0)
+
+        # For each position i, find the best run i..j to reverse. Reversing
+        # a run changes the travel into it and the travel out of it.
+        best_gain = np.zeros(n)
+        best_j = np.zeros(n, dtype=int)
+        for k in range(min(window, n)):
+            m = n - k
+            before = travel[:m] + travel[k + 1:]
+            after = _distances(previous_e[:m], e[k:])
+            after[:m - 1] += _distances(s[:m - 1], s[k + 1:])
+            gain = before - after
+            better = gain > best_gain[:m]
+            best_gain[:m][better] = gain[better]
+            best_j[:m][better] = np.nonzero(better)[0] + k
+
+        candidates = np.nonzero(best_gain > 1e-9)[0]
+        if len(candidates) == 0:
+            break
+
+        # Apply the best moves first, skipping any that touch the same
+        # travel moves as one already applied. The travel move into position
+        # m is numbered m, and the one out of the last path is numbered n.
+        candidates = candidates[np.argsort(-best_gain[candidates])]
+        used = np.zeros(n + 1, dtype=bool)
+        for i in candidates.tolist():
+            j = int(best_j[i])
+            if used[i:j + 2].any():
+                continue
+            used[i:j + 2] = True
+            order[i:j + 1] = order[i:j + 1][::-1]
+            flipped[i:j + 1] = ~flipped[i:j + 1][::-1]
+    return order, flipped
+
+
+def _distances(a, b):
+    return np.hypot(a[:, 0] - b[:, 0], a[:, 1] - b[:, 1])
+
+
+def _runs(path):
+    # Split a path into runs of connected segments.
+    run = []
+    for seg in path.segments:
+        if run and not points_equal(run[-1].b, seg.a):
+            yield run
+            run = []
+        run.append(seg)
+    if run:
+        yield run
+
+
+def hpgl(paths, scale=40):
+    """
+    Write HPGL plotter commands for the paths, in `scale` plotter units per
+    drawing unit. The default scale works out to millimeters on most HPGL
+    plotters, which have 40 units per millimeter.
+    """
+    def units(n):
+        return int(round(n * scale))
+
+    commands = ['IN;', 'SP1;']
+    for path in paths:
+        for run in _runs(path):
+            a = run[0].a
+            commands.append('PU{},{};'.format(units(a.x), units(a.y)))
+            commands.append('PD;')
+            for seg in run:
+                if isinstance(seg, ArcSegment):
+                    commands.append('AA{},{},{};'.format(
+                        units(seg.center.x),
+                        units(seg.center.y),
+                        number(seg.arc_angle.theta, 3),
+                    ))
+                else:
+                    commands.append('PA{},{};'.format(
+                        units(seg.b.x),
+                        units(seg.b.y),
+                    ))
+            commands.append('PU;')
+    commands.append('SP0;')
+    return '\n'.join(commands) + '\n'
+
+
+def gcode(
+    paths,
+    scale=1,
+    precision=3,
+    pen_up='G0 Z1',
+    pen_down='G0 Z0',
+):
+    """
+    Write G-code for the paths, with `scale` millimeters per drawing unit.
+
+    The pen is raised and lowered with the `pen_up` and `pen_down` commands,
+    which differ between machines.
+    """
+    def coords(p):
+        return 'X{} Y{}'.format(
+            number(p[0] * scale, precision),
+            number(p[1] * scale, precision),
+        )
+
+    commands = ['G21', 'G90', pen_up]
+    for path in paths:
+        for run in _runs(path):
+            commands.append('G0 {}'.format(coords(run[0].a)))
+            commands.append(pen_down)
+            for seg in run:
+                if isinstance(seg, ArcSegment):
+                    # Arc centers are given relative to the arc start.
+                    commands.append('{} {} I{} J{}'.format(
+                        'G3' if seg.arc_angle > 0 else 'G2',
+                        coords(seg.b),
+                        number((seg.center.x - seg.a.x) * scale, precision),
+                        number((seg.center.y - seg.a.y) * scale, precision),
+                    ))
+                else:
+                    commands.append('G1 {}'.format(coords(seg.b)))
+            commands.append(pen_up)
+    return '\n'.join(commands) + '\n'
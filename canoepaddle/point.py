@@ -1,3 +1,4 @@
+import math
 from collections import namedtuple
 
 epsilon = 10e-10
@@ -21,12 +22,42 @@ def float_equal(a, b):
 def points_equal(a, b):
     if a is None or b is None:
         return False
-    return all(
-        float_equal(da, db)
-        for (da, db) in zip(a, b)
+    return (
+        abs(a[0] - b[0]) <= epsilon
+        and abs(a[1] - b[1]) <= epsilon
     )
 
 
+def point_key(p, tolerance=epsilon):
+    """
+    Quantize a point into a hashable grid cell key.
+
+    The grid cells are `tolerance` wide, so any two points within tolerance of
+    each other have keys that are the same or adjacent. Use neighbor_keys() to
+    find all the cells that could hold a point equal to this one.
+
+    >>> point_key((0.25, -0.25), 0.5)
+    (0, -1)
+    """
+    return (
+        math.floor(p[0] / tolerance),
+        math.floor(p[1] / tolerance),
+    )
+
+
+def neighbor_keys(key):
+    """
+    Find the grid cell key and all its adjacent keys.
+
+    >>> len(list(neighbor_keys((0, 0))))
+    9
+    """
+    i, j = key
+    for di in (-1, 0, 1):
+        for dj in (-1, 0, 1):
+            yield (i + di, j + dj)
+
+
 def flip(d, c):
     new_d = c - d
     return c + new_d
@@ -0,0 +1,232 @@
+"""
+Render a paper to a PNG image, without any external tools.
+
+Each element of the paper's DisplayList is flattened into polygons, and scan
+converted with the nonzero fill rule. Anti-aliasing is done by supersampling
+each pixel on an `antialias` by `antialias` grid. The image is split into
+horizontal bands, which can be rendered in parallel on several processes.
+"""
+
+import math
+import os
+import struct
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .svg import html_color
+
+BAND_HEIGHT = 64  # In pixels.
+
+# Images with fewer samples than this are rendered in this process by
+# default, since starting the worker processes would take longer than
+# rendering them.
+PARALLEL_MIN_SAMPLES = 1 << 26
+
+
+def flatten_arc(a, b, center, radius, arc_angle, tolerance):
+    """
+    Split the arc from `a` to `b` around `center` into lines, returning the
+    points after `a`.
+    """
+    r = abs(radius)
+    cx, cy = center
+    sweep = math.radians(arc_angle)
+    if r <= tolerance:
+        step = math.pi / 2
+    else:
+        step = 2 * math.acos(1 - tolerance / r)
+    count = max(1, math.ceil(abs(sweep) / step))
+    start = math.atan2(a[1] - cy, a[0] - cx)
+    points = [
+        (
+            cx + r * math.cos(start + sweep * i / count),
+            cy + r * math.sin(start + sweep * i / count),
+        )
+        for i in range(1, count)
+    ]
+    points.append(tuple(b))
+    return points
+
+
+def color_rgb(color):
+    html = html_color(color)
+    return tuple(int(html[i:i + 2], 16) for i in (1, 3, 5))
+
+
+def display_elements(display, bounds, resolution, antialias):
+    """
+    Get a list of (rgb, edges) pairs for the elements of a DisplayList, from
+    bottom to top, in sample coordinates.
+
+    Each edge array has one row (x0, y0, x1, y1) per polygon edge. Sample
+    coordinates have their origin at the top left of the image, with y going
+    down, and with `antialias` samples per pixel in each direction.
+    """
+    samples = resolution * antialias
+    # Flatten to a fraction of a sample.
+    tolerance = 0.25 / samples
+
+    elements = []
+    for i, color in enumerate(display.colors):
+        polygons = display.polygons(i, tolerance)
+        if not polygons:
+            continue
+        edges = np.concatenate([
+            polygon_edges(polygon) for polygon in polygons
+        ])
+        edges[:, 0::2] = (edges[:, 0::2] - bounds.left) * samples
+        edges[:, 1::2] = (bounds.top - edges[:, 1::2]) * samples
+        elements.append((color_rgb(color), edges))
+    return elements
+
+
+def polygon_edges(polygon):
+    # Every polygon is closed, as with SVG fills.
+    points = np.array(polygon, dtype=float)
+    return np.hstack([points, np.roll(points, -1, axis=0)])
+
+
+def coverage(edges, width, height):
+    """
+    Scan convert polygon edges into a boolean array of which samples are
+    inside, using the nonzero winding rule.
+
+    The sample at row j and column i is at (i + 0.5, j + 0.5).
+
+    >>> square = polygon_edges([(1, 1), (3, 1), (3, 3), (1, 3)])
+    >>> coverage(square, 4, 4).astype(int).tolist()
+    [[0, 0, 0, 0], [0, 1, 1, 0], [0, 1, 1, 0], [0, 0, 0, 0]]
+    """
+    x0, y0, x1, y1 = edges.T
+    direction = np.sign(y1 - y0)
+    keep = direction != 0
+    x0, y0, x1, y1, direction = (
+        a[keep] for a in (x0, y0, x1, y1, direction)
+    )
+
+    # Find each sample row that each edge crosses.
+    top = np.minimum(y0, y1)
+    bottom = np.maximum(y0, y1)
+    first_row = np.clip(np.ceil(top - 0.5), 0, height).astype(int)
+    end_row = np.clip(np.ceil(bottom - 0.5), 0, height).astype(int)
+    counts = end_row - first_row
+    total = counts.sum()
+    edge_index = np.repeat(np.arange(len(counts)), counts)
+    starts = np.cumsum(counts) - counts
+    rows = first_row[edge_index] + np.arange(total) - starts[edge_index]
+
+    # Each crossing changes the winding number of every sample to its right.
+    y = rows + 0.5
+    t = (y - y0[edge_index]) / (y1[edge_index] - y0[edge_index])
+    x = x0[edge_index] + t * (x1[edge_index] - x0[edge_index])
+    columns = np.clip(np.ceil(x - 0.5), 0, width).astype(int)
+    winding = np.bincount(
+        rows * (width + 1) + columns,
+        weights=direction[edge_index],
+        minlength=height * (width + 1),
+    ).reshape(height, width + 1)
+    return np.cumsum(winding[:, :width], axis=1) != 0
+
+
+def render_band(elements, width, top, height, antialias):
+    """
+    Render the band of pixel rows from `top` to `top + height`.
+    """
+    image = np.full((height, width, 3), 255.0)
+    sample_top = top * antialias
+    for rgb, edges in elements:
+        # Only scan convert the part of the band that this element covers.
+        xs = edges[:, 0::2]
+        ys = edges[:, 1::2] - sample_top
+        left = max(0, int(xs.min()) // antialias)
+        right = min(width, math.ceil(xs.max() / antialias))
+        upper = max(0, int(ys.min()) // antialias)
+        lower = min(height, math.ceil(ys.max() / antialias))
+        if left >= right or upper >= lower:
+            continue
+        local = edges - [
+            left * antialias,
+            sample_top + upper * antialias,
+        ] * 2
+        inside = coverage(
+            local,
+            (right - left) * antialias,
+            (lower - upper) * antialias,
+        )
+        alpha = inside.reshape(
+            lower - upper, antialias, right - left, antialias,
+        ).mean(axis=(1, 3))[:, :, np.newaxis]
+        region = image[upper:lower, left:right]
+        region *= 1 - alpha
+        region += alpha * rgb
+    return np.rint(image).astype(np.uint8)
+
+
+def _render_band_args(args):
+    return render_band(*args)
+
+
+def render(display, bounds, resolution=10, antialias=4, workers=None):
+    """
+    Render the area of a DisplayList within `bounds` into an array of RGB
+    pixels on a white background.
+
+    The bands are spread over `workers` processes. By default, small images
+    are rendered in this process, and large ones use a process per CPU.
+    """
+    width = max(1, round(bounds.width * resolution))
+    height = max(1, round(bounds.height * resolution))
+    elements = display_elements(display, bounds, resolution, antialias)
+
+    # Give each band only the elements that touch it.
+    jobs = []
+    for top in range(0, height, BAND_HEIGHT):
+        band_height = min(BAND_HEIGHT, height - top)
+        upper = top * antialias
+        lower = (top + band_height) * antialias
+        band_elements = [
+            (rgb, edges) for rgb, edges in elements
+            if edges[:, 1::2].max() > upper and edges[:, 1::2].min() < lower
+        ]
+        jobs.append((band_elements, width, top, band_height, antialias))
+
+    if workers is None:
+        if width * height * antialias**2 < PARALLEL_MIN_SAMPLES:
+            workers = 1
+        else:
+            workers = os.cpu_count() or 1
+    workers = min(workers, len(jobs))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            bands = list(executor.map(_render_band_args, jobs))
+    else:
+        bands = [render_band(*job) for job in jobs]
+    return np.vstack(bands)
+
+
+def png_data(image, compression=6):
+    """
+    Encode an array of RGB pixels as a PNG file.
+    """
+    height, width, _ = image.shape
+    # Each row starts with a filter type byte of zero, meaning no filtering.
+    rows = np.zeros((height, width * 3 + 1), dtype=np.uint8)
+    rows[:, 1:] = image.reshape(height, width * 3)
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return b''.join([
+        b'\x89PNG\r\n\x1a\n',
+        _png_chunk(b'IHDR', header),
+        _png_chunk(b'IDAT', zlib.compress(rows.tobytes(), compression)),
+        _png_chunk(b'IEND', b''),
+    ])
+
+
+def _png_chunk(kind, data):
+    return b''.join([
+        struct.pack('>I', len(data)),
+        kind,
+        data,
+        struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff),
+    ])
@@ -1,5 +1,8 @@
 import math
 from copy import copy
+from itertools import chain
+
+import numpy as np
 
 import vec
 from .point import (
@@ -20,6 +23,11 @@ MAX_TURN_ANGLE = 170
 
 
 class Segment:
+
+    # Attributes holding the points of the segment, in a fixed order for
+    # transforming them in bulk.
+    point_fields = ['a', 'b', 'a_left', 'a_right', 'b_left', 'b_right']
+
     def __init__(self, a, b, width, color, start_slant, end_slant):
         self.a = Point(*a)
         self.b = Point(*b)
@@ -110,6 +118,35 @@ class Segment:
         self.start_slant = f_heading(self.start_slant)
         self.end_slant = f_heading(self.end_slant)
 
+    def points(self):
+        return [getattr(self, name) for name in self.point_fields]
+
+    def _transform(self, points, scale, rotation, reflect):
+        """
+        Update the segment for a similarity transform. The `points` are the
+        already transformed values of self.points().
+        """
+        for name, p in zip(self.point_fields, points):
+            setattr(self, name, p)
+        if reflect:
+            # Reflecting swaps left and right, like mirroring.
+            self.a_left, self.a_right = self.a_right, self.a_left
+            self.b_left, self.b_right = self.b_right, self.b_left
+
+        def f_heading(heading):
+            if heading is not None:
+                if reflect:
+                    return Heading(rotation - heading.theta)
+                return Heading(rotation + heading.theta)
+
+        self._transform_headings(f_heading)
+        if self.width is not None:
+            self.width *= scale
+
+    def _transform_headings(self, f_heading):
+        self.start_slant = f_heading(self.start_slant)
+        self.end_slant = f_heading(self.end_slant)
+
     def reverse(self):
         self.a, self.b = self.b, self.a
         self.a_left, self.b_right = self.b_right, self.a_left
@@ -376,6 +413,7 @@ class ArcSegment(Segment):
         'a', 'b', 'start_slant', 'end_slant',
         'center', 'radius', 'start_heading', 'end_heading',
     ]
+    point_fields = Segment.point_fields + ['center']
 
     def __init__(
         self, a, b, width, color, start_slant, end_slant,
@@ -393,47 +431,48 @@ class ArcSegment(Segment):
         # tangent to the boundary. This is not a perfect approximation, as
         # setting end slants could fail to shrink the bounding box as
         # they should.
-        r = abs(self.radius)
-        if self.width is not None:
-            r += self.width / 2
-
-        # Find the four "compass points" around the center.
-        compass_points = [
-            vec.add(self.center, direction)
-            for direction in [
-                (r, 0),  # East, heading = 0.
-                (0, r),  # North, heading = 90.
-                (-r, 0),  # West, heading = 180.
-                (0, -r),  # South, heading = 270.
-            ]
-        ]
-
-        # Check which compass points are in the body of the circle.
-        if self.arc_angle < 0:
-            start = self.end_heading + 90
-            end = self.start_heading + 90
-        else:
-            start = self.start_heading - 90
-            end = self.end_heading - 90
-        occupied_points = []
-        for i, h in enumerate([0, 90, 180, 270]):
-            h = Heading(h)
-            if h == start or h == end or h.between(start, end):
-                occupied_points.append(compass_points[i])
+        r = _outer_radius(self)
 
         # The bounding box of the arc is the combined bounding box of the start
-        # point, the end point, and the compass points occupied by the body of
-        # the arc. If the arc is a thick arc, then the edge points also can
-        # push the boundary.
+        # point, the end point, and the four "compass points" around the
+        # center that are occupied by the body of the arc. If the arc is a
+        # thick arc, then the edge points also can push the boundary.
         if self.width is None:
             endpoints = [self.a, self.b]
         else:
             endpoints = [self.a_left, self.a_right, self.b_left, self.b_right]
-
-        return Bounds.union_all([
-            Bounds.from_point(p) for p in
-            endpoints + occupied_points
-        ])
+        xs = [p[0] for p in endpoints]
+        ys = [p[1] for p in endpoints]
+        # Offset the center by zero where the compass point is level with it,
+        # which gives 0.0 for a center at -0.0.
+        cx, cy = self.center
+        x_mid = cx + 0
+        y_mid = cy + 0
+        lo, hi = self._compass_range()
+        if _covers(0, lo, hi):  # East.
+            xs.append(cx + r)
+            ys.append(y_mid)
+        if _covers(90, lo, hi):  # North.
+            xs.append(x_mid)
+            ys.append(cy + r)
+        if _covers(180, lo, hi):  # West.
+            xs.append(cx + -r)
+            ys.append(y_mid)
+        if _covers(270, lo, hi):  # South.
+            xs.append(x_mid)
+            ys.append(cy + -r)
+        return Bounds(min(xs), min(ys), max(xs), max(ys))
+
+    def _compass_range(self):
+        # The range of directions from the center that the arc covers,
+        # counterclockwise.
+        if self.arc_angle.theta < 0:
+            lo = (self.end_heading.theta + 90) % 360
+            hi = (self.start_heading.theta + 90) % 360
+        else:
+            lo = (self.start_heading.theta - 90) % 360
+            hi = (self.end_heading.theta - 90) % 360
+        return lo, hi
 
     def copy(self):
         other = super().copy()
@@ -456,6 +495,30 @@ class ArcSegment(Segment):
         self.start_heading = f_heading(self.start_heading)
         self.end_heading = f_heading(self.end_heading)
 
+    def _transform(self, points, scale, rotation, reflect):
+        super()._transform(points, scale, rotation, reflect)
+        self.radius *= scale
+        if reflect:
+            self.arc_angle = -self.arc_angle
+            self.radius = -self.radius
+
+    def _transform_headings(self, f_heading):
+        super()._transform_headings(f_heading)
+        self.start_heading = f_heading(self.start_heading)
+        self.end_heading = f_heading(self.end_heading)
+
+    def reverse(self):
+        # Going the other way around the same arc turns in the opposite
+        # direction.
+        self.start_slant, self.end_slant = self.end_slant, self.start_slant
+        self.start_heading, self.end_heading = (
+            self.end_heading + 180,
+            self.start_heading + 180,
+        )
+        self.arc_angle = -self.arc_angle
+        self.radius = -self.radius
+        super().reverse()
+
     def join_with_line(self, other):
         a, b = other.offset_line_left()
         center, radius = self.offset_circle_left()
@@ -592,3 +655,97 @@ class ArcSegment(Segment):
 
 def flat_cap(pen, end):
     pen.line_to(end)
+
+
+def segment_bounds(segments):
+    """
+    Find the bounds of many segments at once. Returns an array with a row of
+    (left, bottom, right, top) for each segment, with the same values as
+    calling bounds() on each one.
+    """
+    points = np.fromiter(
+        chain.from_iterable(
+            seg.a + seg.b + seg.a + seg.b if seg.width is None
+            else seg.a_left + seg.a_right + seg.b_left + seg.b_right
+            for seg in segments
+        ),
+        dtype=float,
+        count=8 * len(segments),
+    ).reshape(-1, 4, 2)
+    result = np.hstack([points.min(axis=1), points.max(axis=1)])
+
+    arc_indexes = [
+        i for i, seg in enumerate(segments)
+        if isinstance(seg, ArcSegment)
+    ]
+    if not arc_indexes:
+        return result
+    arcs = np.fromiter(
+        chain.from_iterable(
+            seg.center + (_outer_radius(seg),) + seg._compass_range()
+            for seg in (segments[i] for i in arc_indexes)
+        ),
+        dtype=float,
+        count=5 * len(arc_indexes),
+    )
+    cx, cy, r, lo, hi = arcs.reshape(-1, 5).T
+    east = _covers_array(0, lo, hi)
+    north = _covers_array(90, lo, hi)
+    west = _covers_array(180, lo, hi)
+    south = _covers_array(270, lo, hi)
+
+    # Combine the occupied compass points with the end points. NaN stands
+    # for a compass point that isn't occupied, and is ignored by fmin and
+    # fmax.
+    nan = np.nan
+    xs = np.vstack([
+        np.where(east, cx + r, nan),
+        np.where(north | south, cx, nan),
+        np.where(west, cx + -r, nan),
+    ])
+    ys = np.vstack([
+        np.where(east | west, cy, nan),
+        np.where(north, cy + r, nan),
+        np.where(south, cy + -r, nan),
+    ])
+    left, bottom, right, top = result[arc_indexes].T
+    result[arc_indexes] = np.column_stack([
+        np.fmin.reduce(np.vstack([left, xs])),
+        np.fmin.reduce(np.vstack([bottom, ys])),
+        np.fmax.reduce(np.vstack([right, xs])),
+        np.fmax.reduce(np.vstack([top, ys])),
+    ])
+    return result
+
+
+def _outer_radius(arc):
+    r = abs(arc.radius)
+    if arc.width is not None:
+        r += arc.width / 2
+    return r
+
+
+def _covers_array(h, lo, hi):
+    # Like _covers(), for arrays of ranges.
+    mid = np.full_like(lo, h)
+    wrap = mid < lo
+    mid = np.where(wrap, mid + 360, mid)
+    end = np.where(wrap, hi + 360, hi)
+    end = np.where(end < mid, end + 360, end)
+    return (lo == h) | (hi == h) | ((lo != hi) & (end - lo < 360))
+
+
+def _covers(h, lo, hi):
+    # Whether turning counterclockwise from heading lo to heading hi passes
+    # through heading h, or starts or ends there. This is the same as
+    # Heading.between(), but on plain numbers.
+    if h == lo or h == hi:
+        return True
+    if lo == hi:
+        return False
+    if h < lo:
+        h += 360
+        hi += 360
+    if hi < h:
+        hi += 360
+    return hi - lo < 360
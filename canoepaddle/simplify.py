@@ -0,0 +1,235 @@
+"""
+Simplify paths down to the level of detail that an output can show.
+
+When a drawing is rendered small, such as for a thumbnail, most of the detail
+in it is finer than a pixel. Runs of short segments are reduced with the
+Douglas-Peucker algorithm, shallow arcs are straightened, and closed shapes
+that would fit inside a pixel are replaced with a simple shape of the same
+size.
+
+Dense polylines that approximate smooth curves can also be replaced with
+arcs, which keeps them smooth with far fewer segments.
+"""
+
+import math
+
+import vec
+from .biarc import fit_biarcs
+from .bounds import Bounds
+from .geometry import douglas_peucker
+from .point import Point, points_equal, epsilon
+from .segment import LineSegment, ArcSegment
+
+
+def simplified_segments(path, tolerance):
+    """
+    Make a simplified list of unjoined segments for the path. No point on the
+    simplified centerline is more than `tolerance` away from the original.
+    """
+    result = []
+    for subpath in _subpaths(path.segments):
+        first = subpath[0]
+        last = subpath[-1]
+        bounds = Bounds.union_all(seg.bounds() for seg in subpath)
+        if (
+            points_equal(first.a, last.b)
+            and max(bounds.width, bounds.height) <= tolerance
+        ):
+            collapsed = _collapsed_shape(bounds, first.width, first.color)
+            if collapsed is not None:
+                result.extend(collapsed)
+                continue
+
+        segments = []
+        for run in _runs(subpath):
+            segments.extend(_simplified_run(run, tolerance))
+        if not segments:
+            continue
+
+        _keep_end_style(segments, first, last)
+        result.extend(segments)
+    return result
+
+
+def fitted_segments(path, tolerance):
+    """
+    Make a list of unjoined segments for the path, with runs of straight
+    segments replaced by arcs that are within `tolerance` of their points.
+    """
+    result = []
+    for subpath in _subpaths(path.segments):
+        segments = []
+        for run in _runs(subpath):
+            segments.extend(_fitted_run(run, tolerance))
+        _keep_end_style(segments, subpath[0], subpath[-1])
+        result.extend(segments)
+    return result
+
+
+def _subpaths(segments):
+    # Split the segments into connected runs.
+    subpath = []
+    for seg in segments:
+        if subpath and not points_equal(subpath[-1].b, seg.a):
+            yield subpath
+            subpath = []
+        subpath.append(seg)
+    if subpath:
+        yield subpath
+
+
+def _runs(subpath):
+    # Split a subpath where the width or color changes.
+    run = []
+    for seg in subpath:
+        if run and (seg.width, seg.color) != (run[0].width, run[0].color):
+            yield run
+            run = []
+        run.append(seg)
+    if run:
+        yield run
+
+
+def _simplified_run(run, tolerance):
+    width = run[0].width
+    color = run[0].color
+    segments = []
+    points = [run[0].a]
+
+    def flush():
+        indexes = douglas_peucker(points, tolerance)
+        for i, j in zip(indexes, indexes[1:]):
+            a = points[i]
+            b = points[j]
+            if not points_equal(a, b):
+                segments.append(LineSegment(a, b, width, color, None, None))
+
+    for seg in run:
+        if isinstance(seg, ArcSegment) and _sagitta(seg) > tolerance:
+            flush()
+            segments.append(_unjoined_arc(seg))
+            points = [seg.b]
+        else:
+            points.append(seg.b)
+    flush()
+    return segments
+
+
+def _fitted_run(run, tolerance):
+    segments = []
+    lines = []
+
+    def flush():
+        if len(lines) == 1:
+            segments.append(_unjoined_line(lines[0]))
+        elif lines:
+            points = [lines[0].a] + [seg.b for seg in lines]
+            segments.extend(
+                fit_biarcs(points, tolerance, lines[0].width, lines[0].color)
+            )
+        lines.clear()
+
+    for seg in run:
+        if isinstance(seg, LineSegment):
+            lines.append(seg)
+        else:
+            flush()
+            segments.append(_unjoined_arc(seg))
+    flush()
+    return segments
+
+
+def _keep_end_style(segments, first, last):
+    # Keep the look of the ends of the subpath, if they still point the same
+    # way.
+    start = segments[0]
+    end = segments[-1]
+    if _same_direction(start, first):
+        _set_slants(start, first.start_slant, start.end_slant)
+    if _same_direction(end, last):
+        _set_slants(end, end.start_slant, last.end_slant)
+    start.start_cap = first.start_cap
+    end.end_cap = last.end_cap
+
+
+def _sagitta(arc):
+    # The farthest the arc gets from its chord.
+    theta = math.radians(abs(arc.arc_angle.theta))
+    return abs(arc.radius) * (1 - math.cos(theta / 2))
+
+
+def _unjoined_arc(seg):
+    return ArcSegment(
+        seg.a,
+        seg.b,
+        seg.width,
+        seg.color,
+        None,
+        None,
+        seg.center,
+        seg.radius,
+        seg.arc_angle,
+        seg.start_heading,
+        seg.end_heading,
+    )
+
+
+def _unjoined_line(seg):
+    return LineSegment(seg.a, seg.b, seg.width, seg.color, None, None)
+
+
+def _same_direction(new, old):
+    # Whether a simplified end segment lies along the original one.
+    if isinstance(new, ArcSegment):
+        return (
+            isinstance(old, ArcSegment)
+            and points_equal(new.center, old.center)
+            and (new.radius > 0) == (old.radius > 0)
+        )
+    return (
+        isinstance(old, LineSegment)
+        and not points_equal(old.a, old.b)
+        and points_equal(
+            vec.norm(vec.vfrom(old.a, old.b)),
+            vec.norm(vec.vfrom(new.a, new.b)),
+        )
+    )
+
+
+def _set_slants(seg, start_slant, end_slant):
+    if (start_slant, end_slant) != (seg.start_slant, seg.end_slant):
+        if seg.can_set_slant():
+            seg.set_slants(start_slant, end_slant)
+
+
+def _collapsed_shape(bounds, width, color):
+    if width is None:
+        # A filled shape becomes its bounding rectangle.
+        if bounds.width <= epsilon or bounds.height <= epsilon:
+            return None
+        corners = [
+            Point(bounds.left, bounds.bottom),
+            Point(bounds.right, bounds.bottom),
+            Point(bounds.right, bounds.top),
+            Point(bounds.left, bounds.top),
+        ]
+        return [
+            LineSegment(a, b, None, color, None, None)
+            for a, b in zip(corners, corners[1:] + corners[:1])
+        ]
+
+    # A stroked shape becomes a single stroke across the longer side of the
+    # box that its centerline fits in.
+    x_center = (bounds.left + bounds.right) / 2
+    y_center = (bounds.bottom + bounds.top) / 2
+    if bounds.width >= bounds.height:
+        length = bounds.width - width
+        a = (x_center - length / 2, y_center)
+        b = (x_center + length / 2, y_center)
+    else:
+        length = bounds.height - width
+        a = (x_center, y_center - length / 2)
+        b = (x_center, y_center + length / 2)
+    if length <= epsilon:
+        return None
+    return [LineSegment(a, b, width, color, None, None)]
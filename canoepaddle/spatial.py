@@ -0,0 +1,360 @@
+"""
+Spatial indexing of points, for nearest neighbor queries, and of boxes, for
+finding what is drawn near a point.
+"""
+
+import math
+from collections import defaultdict
+
+import numpy as np
+
+# Boxes that would be listed in more cells than this are checked by every
+# query instead.
+MAX_BOX_CELLS = 64
+
+
+class PointGrid:
+    """
+    Index items by point, using a uniform grid of square cells.
+
+    Queries only look at the cells near the query point, so they are fast as
+    long as the cell size is similar to the typical spacing of the points.
+
+    >>> grid = PointGrid(1.0)
+    >>> grid.insert((0, 0), 'a')
+    >>> grid.insert((5, 1), 'b')
+    >>> grid.nearest((4, 0))
+    (1.4142135623730951, (5, 1), 'b')
+    >>> grid.remove((5, 1), 'b')
+    >>> grid.nearest((4, 0))
+    (4.0, (0, 0), 'a')
+    """
+
+    def __init__(self, cell_size):
+        if cell_size <= 0:
+            raise ValueError('Cell size must be positive.')
+        self.cell_size = cell_size
+        self._cells = defaultdict(list)
+        self._count = 0
+        # The range of cell keys that have ever been used, which limits how
+        # far a query will search.
+        self._min_key = None
+        self._max_key = None
+
+    def __len__(self):
+        return self._count
+
+    def key(self, point):
+        x, y = point
+        return (
+            math.floor(x / self.cell_size),
+            math.floor(y / self.cell_size),
+        )
+
+    def insert(self, point, item):
+        key = self.key(point)
+        self._cells[key].append((point, item))
+        self._count += 1
+        if self._min_key is None:
+            self._min_key = self._max_key = key
+        else:
+            self._min_key = (
+                min(self._min_key[0], key[0]),
+                min(self._min_key[1], key[1]),
+            )
+            self._max_key = (
+                max(self._max_key[0], key[0]),
+                max(self._max_key[1], key[1]),
+            )
+
+    def remove(self, point, item):
+        key = self.key(point)
+        cell = self._cells[key]
+        cell.remove((point, item))
+        if not cell:
+            del self._cells[key]
+        self._count -= 1
+
+    def near(self, point, radius):
+        """
+        Find all the (point, item) pairs within `radius` of `point`.
+        """
+        x, y = point
+        i0, j0 = self.key((x - radius, y - radius))
+        i1, j1 = self.key((x + radius, y + radius))
+        cells = self._cells
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                for p, item in cells.get((i, j), ()):
+                    if math.hypot(p[0] - x, p[1] - y) <= radius:
+                        yield p, item
+
+    def nearest(self, point):
+        """
+        Find the nearest item to `point`, as a (distance, point, item) tuple.
+        Return None if the grid is empty.
+        """
+        if self._count == 0:
+            return None
+        x, y = point
+        ci, cj = self.key(point)
+        cells = self._cells
+        best = None
+        # Only look at the rings of cells that reach the used cell keys, and
+        # only at the parts of them that are within the used range, so that
+        # a query far away from the points skips the empty space between.
+        (i0, j0), (i1, j1) = self._min_key, self._max_key
+        ring = max(i0 - ci, ci - i1, j0 - cj, cj - j1, 0)
+        max_ring = max(ci - i0, i1 - ci, cj - j0, j1 - cj)
+        while ring <= max_ring:
+            for key in _ring_keys(ci, cj, ring, self._min_key, self._max_key):
+                for p, item in cells.get(key, ()):
+                    d = math.hypot(p[0] - x, p[1] - y)
+                    if best is None or d < best[0]:
+                        best = (d, p, item)
+            # Any point in a further ring is at least this far away.
+            if best is not None and best[0] <= ring * self.cell_size:
+                break
+            ring += 1
+        return best
+
+
+class PointTree:
+    """
+    Index items by point, using a k-d tree, for finding the nearest item as
+    items are removed.
+
+    Unlike PointGrid, all of the items are given up front, and the tree fits
+    itself to how they are spread out, so clustered points are as quick to
+    search as evenly spread ones. Subtrees that have had all of their items
+    removed are skipped.
+
+    >>> tree = PointTree([((0, 0), 'a'), ((5, 1), 'b')])
+    >>> tree.nearest((4, 0))
+    (1.4142135623730951, (5, 1), 'b')
+    >>> tree.remove((5, 1), 'b')
+    >>> tree.nearest((4, 0))
+    (4.0, (0, 0), 'a')
+    """
+
+    def __init__(self, entries):
+        # Each node is a list of [count, left, bottom, right, top, children,
+        # entries], where leaves have no children, and other nodes have no
+        # entries but a (low, high, axis, split) tuple of children.
+        self._root = _build_tree(list(entries))
+
+    def __len__(self):
+        return self._root[0]
+
+    def remove(self, point, item):
+        if not _remove_from_tree(self._root, point, item):
+            raise ValueError('{!r} is not in the tree.'.format(item))
+
+    def nearest(self, point):
+        """
+        Find the nearest item to `point`, as a (distance, point, item) tuple.
+        Return None if the tree is empty.
+        """
+        x, y = point
+        best = None
+        best_d2 = math.inf
+        stack = [self._root]
+        while stack:
+            count, left, bottom, right, top, children, entries = stack.pop()
+            if count == 0:
+                continue
+            dx = max(left - x, x - right, 0)
+            dy = max(bottom - y, y - top, 0)
+            if dx * dx + dy * dy >= best_d2:
+                continue
+            if children is None:
+                for p, item in entries:
+                    px = p[0] - x
+                    py = p[1] - y
+                    d2 = px * px + py * py
+                    if d2 < best_d2:
+                        best_d2 = d2
+                        best = (p, item)
+            else:
+                # Look at the side the point is on first.
+                low, high, axis, split = children
+                if point[axis] < split:
+                    stack.append(high)
+                    stack.append(low)
+                else:
+                    stack.append(low)
+                    stack.append(high)
+        if best is None:
+            return None
+        return (math.sqrt(best_d2),) + best
+
+
+# How many entries a leaf of a PointTree holds.
+TREE_LEAF_SIZE = 8
+
+
+def _build_tree(entries):
+    xs = [p[0] for p, _ in entries]
+    ys = [p[1] for p, _ in entries]
+    if entries:
+        box = [min(xs), min(ys), max(xs), max(ys)]
+    else:
+        box = [0, 0, 0, 0]
+    if len(entries) <= TREE_LEAF_SIZE:
+        return [len(entries)] + box + [None, entries]
+    # Split the longer side at the median.
+    axis = 0 if box[2] - box[0] >= box[3] - box[1] else 1
+    entries.sort(key=lambda entry: entry[0][axis])
+    middle = len(entries) // 2
+    split = entries[middle][0][axis]
+    children = (
+        _build_tree(entries[:middle]),
+        _build_tree(entries[middle:]),
+        axis,
+        split,
+    )
+    return [len(entries)] + box + [children, None]
+
+
+def _remove_from_tree(node, point, item):
+    # Remove an entry from the subtree, and return whether it was found.
+    count, left, bottom, right, top, children, entries = node
+    x, y = point
+    if count == 0 or not (left <= x <= right and bottom <= y <= top):
+        return False
+    if children is None:
+        try:
+            entries.remove((point, item))
+        except ValueError:
+            return False
+    elif not (
+        _remove_from_tree(children[0], point, item)
+        or _remove_from_tree(children[1], point, item)
+    ):
+        return False
+    node[0] -= 1
+    return True
+
+
+class BoxGrid:
+    """
+    Index items by their bounding boxes, using a uniform grid of square
+    cells. Each item is listed in every cell its box touches, so that a query
+    only looks at the cells it reaches.
+
+    Items with boxes covering more than MAX_BOX_CELLS cells are kept in a
+    separate list that every query checks.
+
+    >>> grid = BoxGrid(1.0)
+    >>> grid.insert((0, 0, 2, 1), 'a')
+    >>> grid.insert((3, 3, 4, 4), 'b')
+    >>> sorted(grid.overlapping((1.5, 0.5, 3.5, 3.5)))
+    ['a', 'b']
+    >>> grid.remove('b')
+    >>> sorted(grid.overlapping((1.5, 0.5, 3.5, 3.5)))
+    ['a']
+    """
+
+    def __init__(self, cell_size):
+        if cell_size <= 0:
+            raise ValueError('Cell size must be positive.')
+        self.cell_size = cell_size
+        self._cells = defaultdict(dict)
+        self._large = {}
+        self._boxes = {}
+
+    @classmethod
+    def for_boxes(cls, boxes):
+        """
+        Choose a cell size about the size of a typical one of the boxes, given
+        as rows of (left, bottom, right, top).
+        """
+        boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+        if len(boxes) == 0:
+            return cls(1.0)
+        sizes = np.maximum(
+            boxes[:, 2] - boxes[:, 0],
+            boxes[:, 3] - boxes[:, 1],
+        )
+        size = float(np.median(sizes))
+        if size <= 0:
+            return cls(1.0)
+        return cls(size)
+
+    def __len__(self):
+        return len(self._boxes)
+
+    def key_range(self, box):
+        left, bottom, right, top = box
+        size = self.cell_size
+        return (
+            math.floor(left / size),
+            math.floor(bottom / size),
+            math.floor(right / size),
+            math.floor(top / size),
+        )
+
+    def insert(self, box, item):
+        self._boxes[item] = box
+        i0, j0, i1, j1 = self.key_range(box)
+        if (i1 - i0 + 1) * (j1 - j0 + 1) > MAX_BOX_CELLS:
+            self._large[item] = box
+            return
+        cells = self._cells
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                cells[i, j][item] = box
+
+    def remove(self, item):
+        box = self._boxes.pop(item)
+        if self._large.pop(item, None) is not None:
+            return
+        i0, j0, i1, j1 = self.key_range(box)
+        cells = self._cells
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                cell = cells[i, j]
+                del cell[item]
+                if not cell:
+                    del cells[i, j]
+
+    def overlapping(self, box):
+        """
+        Find all the items whose boxes overlap `box`, including ones that
+        only touch it.
+        """
+        left, bottom, right, top = box
+        i0, j0, i1, j1 = self.key_range(box)
+        if (i1 - i0 + 1) * (j1 - j0 + 1) > len(self._boxes):
+            # The box covers more cells than there are items, so it is
+            # quicker to check every item.
+            found = self._boxes
+        else:
+            cells = self._cells
+            found = {}
+            for i in range(i0, i1 + 1):
+                for j in range(j0, j1 + 1):
+                    found.update(cells.get((i, j), ()))
+            found.update(self._large)
+        for item, (l, b, r, t) in found.items():
+            if l <= right and left <= r and b <= top and bottom <= t:
+                yield item
+
+
+def _ring_keys(ci, cj, ring, min_key, max_key):
+    # The keys of the cells `ring` cells away from (ci, cj), that are within
+    # the range from `min_key` to `max_key`.
+    (i0, j0), (i1, j1) = min_key, max_key
+    if ring == 0:
+        yield (ci, cj)
+        return
+    columns = range(max(ci - ring, i0), min(ci + ring, i1) + 1)
+    for j in (cj - ring, cj + ring):
+        if j0 <= j <= j1:
+            for i in columns:
+                yield (i, j)
+    rows = range(max(cj - ring + 1, j0), min(cj + ring - 1, j1) + 1)
+    for i in (ci - ring, ci + ring):
+        if i0 <= i <= i1:
+            for j in rows:
+                yield (i, j)
@@ -0,0 +1,121 @@
+"""
+Draw very large drawings without keeping them in memory.
+
+A pen only ever adds to the last path on its paper. Once it starts a new path,
+because of a break or a change of mode, the earlier paths are finished. A
+StreamingPaper writes each finished path out as svg straight away and forgets
+it, keeping only the bounds of what it has written so far.
+"""
+
+import shutil
+import tempfile
+from copy import copy
+from itertools import count
+
+from .bounds import Bounds
+from .paper import Paper, path_svg, SVG_FOOTER
+
+
+class StreamingPaper(Paper):
+    """
+    A paper that writes an svg document to the text file object `f` as it is
+    drawn on. Call close() when done, or use it as a context manager.
+
+    The svg header needs the bounds of the whole drawing. If bounds are set
+    with override_bounds() before the first path is finished, the document is
+    written straight to `f`. Otherwise the elements are kept in a temporary
+    file until the bounds are known.
+
+    Only the last path is kept, so operations on the paper as a whole, such
+    as joining paths or transforming them, only see that one path. Text is
+    kept until the end, and written after the paths, as with format_svg().
+    Pens drawing on it don't keep a log either, so that memory use stays the
+    same however much is drawn.
+    """
+
+    keep_pen_log = False
+
+    def __init__(
+        self, f, precision=12, resolution=10, circles=False, gradients=False,
+    ):
+        super().__init__()
+        self.f = f
+        self.precision = precision
+        self.resolution = resolution
+        self.circles = circles
+        self._gradient_ids = count() if gradients else None
+
+        self._written_bounds = None
+        self._body = None
+        self._element_count = 0
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add_path(self, path):
+        # Adding a path means that the ones before it are finished.
+        self._flush()
+        super().add_path(path)
+
+    def bounds(self):
+        if self._bounds_override is not None:
+            return copy(self._bounds_override)
+        bounds_list = [path.bounds() for path in self._paths]
+        if self._written_bounds is not None:
+            bounds_list.append(self._written_bounds)
+        if len(bounds_list) == 0:
+            raise ValueError('Empty page, cannot calculate bounds.')
+        return Bounds.union_all(bounds_list)
+
+    def close(self):
+        """
+        Write out the rest of the drawing and finish the document.
+        """
+        if self._closed:
+            return
+        self._flush()
+        for text_element in self._text_elements:
+            self._write_element(text_element.svg(self.precision))
+        self.text_elements = []
+        if self._body is None:
+            self.f.write(self._svg_header(self.resolution))
+        elif self._body is not self.f:
+            self.f.write(self._svg_header(self.resolution))
+            self._body.seek(0)
+            shutil.copyfileobj(self._body, self.f)
+            self._body.close()
+        self.f.write(SVG_FOOTER)
+        self._closed = True
+
+    def _flush(self):
+        paths = self.paths
+        for path in paths:
+            self._write_element(path_svg(
+                path,
+                self.precision,
+                self.circles,
+                self._gradient_ids,
+            ))
+            if self._written_bounds is None:
+                self._written_bounds = path.bounds()
+            else:
+                self._written_bounds = Bounds.union_all(
+                    [self._written_bounds, path.bounds()]
+                )
+        paths.clear()
+
+    def _write_element(self, element):
+        if self._body is None:
+            if self._bounds_override is not None:
+                self.f.write(self._svg_header(self.resolution))
+                self._body = self.f
+            else:
+                self._body = tempfile.TemporaryFile('w+')
+        if self._element_count > 0:
+            self._body.write('\n')
+        self._body.write(element)
+        self._element_count += 1
@@ -1,12 +1,27 @@
+from functools import lru_cache
+
 from grapefruit import Color
 
+from .spatial import BoxGrid
+
+# Path commands, as used by path_data().
+MOVE, LINE, ARC, CLOSE = range(4)
+
+# How many groups of elements reorder_path_elements() keeps waiting.
+REORDER_WINDOW = 64
+
+
+@lru_cache()
+def _number_format(precision):
+    return '.{}f'.format(precision)
+
 
 def number(n, precision):
     # Handle numbers near zero formatting inconsistently as
     # either "0.0" or "-0.0".
     if abs(n) <= 0.5 * 10**(-precision):
         n = 0
-    return '{n:.{p}f}'.format(n=n, p=precision)
+    return format(n, _number_format(precision))
 
 
 def html_color(color):
@@ -50,33 +65,162 @@ def path_element(path_data, color):
     )
 
 
-def path_move(x, y, precision):
-    return 'M{x},{y}'.format(
-        x=number(x, precision),
-        y=number(-y, precision),
-    )
-
-
-def path_close():
-    return 'z'
-
-
-def path_line(x, y, precision):
-    return 'L{x},{y}'.format(
-        x=number(x, precision),
-        y=number(-y, precision),
+def merge_path_elements(items):
+    """
+    Combine consecutive path elements of the same color into single
+    elements, which draw the same thing as long as they don't overlap.
+
+    The items are (color, path_data, bounds) tuples for path elements, or
+    finished element strings, which are passed through unchanged. Elements
+    are only combined if the bounds of the new one do not overlap any of the
+    ones already combined, so that their windings can't interfere under the
+    nonzero fill rule.
+    """
+    color = None
+    path_data = []
+    # The bounds of the combined elements, and a grid of them, so that a new
+    # element is only checked against the ones near it.
+    boxes = []
+    grid = None
+    for item in items:
+        if isinstance(item, str):
+            if path_data:
+                yield path_element(' '.join(path_data), color)
+                path_data = []
+            yield item
+            continue
+
+        item_color, item_data, bounds = item
+        item_color = html_color(item_color)
+        if path_data and item_color == color:
+            if not _overlaps_any(bounds, boxes, grid):
+                grid.insert(bounds, len(boxes))
+                boxes.append(bounds)
+                path_data.append(item_data)
+                continue
+
+        if path_data:
+            yield path_element(' '.join(path_data), color)
+        color = item_color
+        path_data = [item_data]
+        boxes = [bounds]
+        grid = BoxGrid.for_boxes(boxes)
+        grid.insert(bounds, 0)
+    if path_data:
+        yield path_element(' '.join(path_data), color)
+
+
+def _overlaps_any(box, boxes, grid):
+    # Whether the box overlaps any of the boxes in the grid by more than
+    # touching them.
+    left, bottom, right, top = box
+    for index in grid.overlapping(box):
+        l, b, r, t = boxes[index]
+        if l < right and left < r and b < top and bottom < t:
+            return True
+    return False
+
+
+def reorder_path_elements(items, window=REORDER_WINDOW):
+    """
+    Move path elements earlier, next to the last element of the same color,
+    where that doesn't change what is drawn.
+
+    The items are the same as for merge_path_elements(), and come out in the
+    new order. An element is only moved past elements whose bounds it does
+    not overlap, and never past a finished element string. Only the last
+    `window` groups of elements are kept waiting, so this works on streams
+    of any length.
+    """
+    # Each group is a color, the union of its bounds, and its items.
+    groups = []
+    for item in items:
+        if isinstance(item, str):
+            for group in groups:
+                yield from group[2]
+            groups = []
+            yield item
+            continue
+
+        color = html_color(item[0])
+        left, bottom, right, top = item[2]
+        target = None
+        for group in reversed(groups):
+            if group[0] == color:
+                target = group
+                break
+            g_left, g_bottom, g_right, g_top = group[1]
+            if (
+                g_left < right and left < g_right
+                and g_bottom < top and bottom < g_top
+            ):
+                break
+
+        if target is None:
+            groups.append([color, item[2], [item]])
+            if len(groups) > window:
+                yield from groups.pop(0)[2]
+        else:
+            g_left, g_bottom, g_right, g_top = target[1]
+            target[1] = (
+                min(left, g_left),
+                min(bottom, g_bottom),
+                max(right, g_right),
+                max(top, g_top),
+            )
+            target[2].append(item)
+    for group in groups:
+        yield from group[2]
+
+
+def circle_element(center, radius, color, precision, stroke_width=None):
+    color = html_color(color)
+    if stroke_width is None:
+        paint = 'fill="{color}"'.format(color=color)
+    else:
+        paint = 'fill="none" stroke="{color}" stroke-width="{width}"'.format(
+            color=color,
+            width=number(stroke_width, precision),
+        )
+    return '<circle cx="{x}" cy="{y}" r="{r}" {paint} />'.format(
+        x=number(center[0], precision),
+        y=number(-center[1], precision),
+        r=number(radius, precision),
+        paint=paint,
     )
 
 
-def path_arc(x, y, arc_angle, radius, precision):
-    direction_flag = int(arc_angle < 0)
-    sweep_flag = int(abs(arc_angle) % 360 > 180)
-    return (
-        'A {r},{r} 0 {sweep_flag} {direction_flag} {x},{y}'
-    ).format(
-        x=number(x, precision),
-        y=number(-y, precision),
-        r=number(abs(radius), precision),
-        direction_flag=direction_flag,
-        sweep_flag=sweep_flag,
-    )
+def path_data(commands, coords, precision):
+    """
+    Write svg path data for a list of command codes, with a row of
+    coordinates (x, y, center_x, center_y, radius, arc_angle) for each, as
+    made by Path.render_commands(). Numbers come out the same as from
+    number().
+    """
+    # Format the numbers directly, rather than through number(), since most
+    # of the time in writing a drawing out is spent here.
+    spec = _number_format(precision)
+    zero = 0.5 * 10**(-precision)
+    parts = []
+    for command, (x, y, _, _, radius, arc_angle) in zip(commands, coords):
+        if command == CLOSE:
+            parts.append('z')
+            continue
+        x = format(0 if abs(x) <= zero else x, spec)
+        y = format(0 if abs(y) <= zero else -y, spec)
+        if command == MOVE:
+            parts.append('M' + x + ',' + y)
+        elif command == LINE:
+            parts.append('L' + x + ',' + y)
+        else:
+            r = abs(radius)
+            r = format(0 if r <= zero else r, spec)
+            parts.append('A {},{} 0 {} {} {},{}'.format(
+                r,
+                r,
+                int(abs(arc_angle) % 360 > 180),
+                int(arc_angle < 0),
+                x,
+                y,
+            ))
+    return ' '.join(parts)
@@ -16,6 +16,9 @@ class Text:
         self.color = color
         self.centered = centered
 
+        # The paper that owns this text, see Paper._own_path().
+        self._token = None
+
     def svg(self, precision):
         return text_element(
             self.text,
@@ -32,3 +35,8 @@ class Text:
 
     def translate(self, offset):
         self.position = Point(*vec.add(self.position, offset))
+
+    def _transform(self, position, scale):
+        # Text stays upright, so only the position and size change.
+        self.position = position
+        self.size *= scale
@@ -0,0 +1,123 @@
+"""
+Affine transformations of drawing geometry.
+
+Matrices are 3x3 affine matrices acting on column vectors (x, y, 1). A 2x3
+matrix may be given instead, and the bottom row is assumed to be (0, 0, 1).
+"""
+
+import math
+from itertools import chain
+
+import numpy as np
+
+from .point import Point, epsilon
+
+
+def affine_matrix(matrix):
+    """
+    Normalize a 2x3 or 3x3 affine matrix into a 3x3 array.
+
+    >>> affine_matrix([[1, 0, 5], [0, 1, 6]]).tolist()
+    [[1.0, 0.0, 5.0], [0.0, 1.0, 6.0], [0.0, 0.0, 1.0]]
+    """
+    m = np.array(matrix, dtype=float)
+    if m.shape == (2, 3):
+        m = np.vstack([m, [0, 0, 1]])
+    if m.shape != (3, 3):
+        raise ValueError('Affine matrix must be 2x3 or 3x3.')
+    if not np.allclose(m[2], [0, 0, 1]):
+        raise ValueError('Projective transforms are not supported.')
+    return m
+
+
+def translation_matrix(offset):
+    x, y = offset
+    return affine_matrix([
+        [1, 0, x],
+        [0, 1, y],
+    ])
+
+
+def rotation_matrix(angle, center=(0, 0)):
+    """
+    Rotate counterclockwise by `angle` degrees around `center`.
+    """
+    theta = math.radians(angle)
+    c = math.cos(theta)
+    s = math.sin(theta)
+    m = affine_matrix([
+        [c, -s, 0],
+        [s, c, 0],
+    ])
+    return _around(m, center)
+
+
+def scale_matrix(factor, center=(0, 0)):
+    """
+    Scale uniformly by `factor`, keeping `center` in place.
+    """
+    m = affine_matrix([
+        [factor, 0, 0],
+        [0, factor, 0],
+    ])
+    return _around(m, center)
+
+
+def _around(m, center):
+    x, y = center
+    return translation_matrix((x, y)) @ m @ translation_matrix((-x, -y))
+
+
+def decompose_similarity(matrix):
+    """
+    Split a similarity transform into its uniform scale, its rotation angle in
+    degrees, and whether it is a reflection.
+
+    Arcs and stroke widths can only be transformed by a similarity, so other
+    affine transforms, like skews and non-uniform scales, raise ValueError.
+
+    >>> decompose_similarity([[0, -2, 0], [2, 0, 0]])
+    (2.0, 90.0, False)
+    >>> decompose_similarity([[-1, 0, 0], [0, 1, 0]])
+    (1.0, 180.0, True)
+    """
+    m = affine_matrix(matrix)
+    (a, b), (c, d) = m[:2, :2].tolist()
+    det = a * d - b * c
+    scale = math.sqrt(abs(det))
+    if scale <= epsilon:
+        raise ValueError('Transform is degenerate.')
+    # The columns of a similarity matrix are orthogonal and of equal length.
+    tolerance = 1e-9 * scale**2
+    if (
+        abs(a * b + c * d) > tolerance
+        or abs((a * a + c * c) - (b * b + d * d)) > tolerance
+    ):
+        raise ValueError(
+            'Only similarity transforms (rotation, uniform scaling, '
+            'reflection, and translation) are supported.'
+        )
+    rotation = math.degrees(math.atan2(c, a))
+    return scale, rotation, det < 0
+
+
+def transform_points(matrix, points):
+    """
+    Apply an affine matrix to a list of points in bulk.
+
+    Entries in the list may be None, and stay None.
+    """
+    m = affine_matrix(matrix)
+    nan = (math.nan, math.nan)
+    coords = np.fromiter(
+        chain.from_iterable(nan if p is None else p for p in points),
+        dtype=float,
+        count=2 * len(points),
+    ).reshape(-1, 2)
+    coords = coords @ m[:2, :2].T + m[:2, 2]
+    # NaN is the only value not equal to itself.
+    make_point = Point._make
+    return [
+        None if xy[0] != xy[0] else make_point(xy)
+        for xy in coords.tolist()
+    ]
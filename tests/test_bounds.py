@@ -4,6 +4,7 @@ from nose.tools import assert_equal, assert_raises
 
 from .util import assert_path_data
 from canoepaddle import Pen, Bounds
+from canoepaddle.segment import segment_bounds
 
 sqrt2 = math.sqrt(2)
 sqrt3 = math.sqrt(3)
@@ -205,3 +206,23 @@ def test_arc_segment_bounds():
         arc.bounds(),
         Bounds(-5.5, -0.5314980314970469, 5.5, 5.5)
     )
+
+
+def test_segment_bounds():
+    p = Pen()
+    p.fill_mode()
+    p.move_to((0, 0))
+    p.turn_to(-45)
+    p.line_forward(1)
+    p.turn_left(90)
+    p.arc_left(180, center=(0, 0))
+    p.stroke_mode(1.0)
+    p.arc_right(270, 2)
+    p.line_forward(3)
+    p.arc_left(90, 1)
+
+    segments = [seg for path in p.paper.paths for seg in path.segments]
+    assert_equal(
+        segment_bounds(segments).tolist(),
+        [list(seg.bounds()) for seg in segments],
+    )
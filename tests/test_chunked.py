@@ -0,0 +1,75 @@
+import random
+
+from nose.tools import assert_equal
+
+from canoepaddle.chunked import ChunkedList, CHUNK_SIZE
+
+
+class Item:
+
+    def __init__(self, value):
+        self.value = value
+
+    def copy(self):
+        return Item(self.value)
+
+
+def test_list_operations():
+    random.seed(0)
+    items = list(range(3 * CHUNK_SIZE + 5))
+    chunked = ChunkedList(items)
+    assert_equal(chunked, items)
+    assert_equal(chunked[-1], items[-1])
+    assert_equal(chunked[CHUNK_SIZE - 2:2 * CHUNK_SIZE + 3],
+                 items[CHUNK_SIZE - 2:2 * CHUNK_SIZE + 3])
+    assert_equal(chunked[::-3], items[::-3])
+    assert_equal(list(reversed(chunked)), items[::-1])
+
+    for _ in range(100):
+        index = random.randrange(len(items))
+        operation = random.choice(['set', 'insert', 'delete', 'append'])
+        if operation == 'set':
+            items[index] = chunked[index] = -index
+        elif operation == 'insert':
+            items.insert(index, -index)
+            chunked.insert(index, -index)
+        elif operation == 'delete':
+            del items[index]
+            del chunked[index]
+        else:
+            items.append(index)
+            chunked.append(index)
+        assert_equal(chunked, items)
+
+    chunked[3:5] = ['a']
+    items[3:5] = ['a']
+    chunked.reverse()
+    items.reverse()
+    assert_equal(chunked, items)
+
+
+def test_copy():
+    original = ChunkedList(
+        [Item(i) for i in range(2 * CHUNK_SIZE)],
+        copy_items=True,
+    )
+    copy = original.copy()
+    assert copy[0] is original[0]
+
+    # Changing one list copies just the chunk it changes.
+    copy.own(-1).value = 'changed'
+    copy.append(Item('added'))
+    assert_equal(original[-1].value, 2 * CHUNK_SIZE - 1)
+    assert_equal(len(original), 2 * CHUNK_SIZE)
+    assert copy[0] is original[0]
+    assert copy[-3] is not original[-2]
+
+    original.own(0).value = 'changed'
+    assert_equal(copy[0].value, 0)
+
+    copy.own_all()
+    assert all(a is not b for a, b in zip(copy, original))
+    assert_equal(
+        [item.value for item in copy][-2:],
+        ['changed', 'added'],
+    )
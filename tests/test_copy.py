@@ -1,6 +1,7 @@
 from nose.tools import assert_equal, assert_raises
 from .util import assert_path_data
 from canoepaddle import Pen, Paper, Bounds
+from canoepaddle.segment import LineSegment
 
 
 def test_copy_no_paper():
@@ -177,3 +178,260 @@ def test_copy_arc_to():
         p, 0,
         'M0,0 A 5,5 0 0 0 5,-5'
     )
+
+
+def test_copy_shares_paths():
+    p = Pen()
+    p.fill_mode()
+    p.move_to((0, 0))
+    p.turn_to(0)
+    p.line_forward(5)
+    p.break_stroke()
+    p.line_forward(5)
+
+    paper = p.paper.copy()
+    assert paper._paths[0] is p.paper._paths[0]
+    assert paper._paths[1] is p.paper._paths[1]
+
+    # Changing the copy copies the path first.
+    paper.translate((1, 0))
+    assert paper._paths[0] is not p.paper._paths[0]
+    assert_path_data(
+        p, 0,
+        ['M0,0 L5,0', 'M5,0 L10,0'],
+    )
+    assert_path_data(
+        paper, 0,
+        ['M1,0 L6,0', 'M6,0 L11,0'],
+    )
+
+
+def test_copy_change_paths():
+    # The paths handed out by a copy can be changed without changing the
+    # original, and the other way around.
+    p = Pen()
+    p.stroke_mode(1.0)
+    p.move_to((0, 0))
+    p.turn_to(0)
+    p.line_forward(5)
+    p.line_forward(5)
+    p.text('hello', 1)
+    svg = p.paper.format_svg(1)
+
+    paper = p.paper.copy()
+    paper.paths[0].translate((10, 0))
+    paper.paths[0].reverse()
+    paper.paths[0].add_segment(
+        LineSegment((0, 0), (0, 5), 1.0, None, None, None)
+    )
+    paper.text_elements[0].translate((10, 0))
+    assert_equal(p.paper.format_svg(1), svg)
+    assert_equal(len(p.paper.paths[0].segments), 2)
+
+    copy_svg = paper.format_svg(1)
+    p.paper.paths[0].translate((0, 10))
+    p.paper.text_elements[0].translate((0, 10))
+    assert_equal(paper.format_svg(1), copy_svg)
+
+
+def test_copy_on_write_joint():
+    # Continuing a thick stroke changes the joint of the last segment. This
+    # should not affect the original pen.
+    p1 = Pen()
+    p1.stroke_mode(2.0)
+    p1.move_to((0, 0))
+    p1.turn_to(0)
+    p1.line_forward(5)
+    p2 = p1.copy(paper=True)
+    p2.turn_left(90)
+    p2.line_forward(5)
+
+    assert_path_data(
+        p1, 0,
+        'M0,-1 L0,1 L5,1 L5,-1 L0,-1 z'
+    )
+    assert_path_data(
+        p2, 0,
+        'M0,-1 L0,1 L6,1 L6,-5 L4,-5 L4,-1 L0,-1 z'
+    )
+
+    # The original can keep drawing without affecting the copy.
+    p1.turn_right(90)
+    p1.line_forward(5)
+    assert_path_data(
+        p1, 0,
+        'M0,-1 L0,1 L4,1 L4,5 L6,5 L6,-1 L0,-1 z'
+    )
+    assert_path_data(
+        p2, 0,
+        'M0,-1 L0,1 L6,1 L6,-5 L4,-5 L4,-1 L0,-1 z'
+    )
+
+
+def test_copy_on_write_paper_operations():
+
+    def draw():
+        p = Pen()
+        p.fill_mode()
+        p.move_to((0, 0))
+        p.turn_to(0)
+        p.line_forward(1)
+        p.break_stroke()
+        p.line_forward(1)
+        p.line_forward(1)
+        return p.paper
+
+    original = draw()
+    for operation in [
+        lambda paper: paper.join_paths(),
+        lambda paper: paper.fuse_paths(),
+        lambda paper: paper.mirror_x(0),
+        lambda paper: paper.mirror_y(0),
+        lambda paper: paper.rotate(90),
+    ]:
+        paper = original.copy()
+        operation(paper)
+        assert_path_data(
+            original, 0,
+            ['M0,0 L1,0', 'M1,0 L2,0 L3,0'],
+        )
+
+    # Merging shares paths too, so the merged paper can't change the
+    # original.
+    paper = Paper()
+    paper.merge(original)
+    paper.translate((0, 1))
+    assert_path_data(
+        original, 0,
+        ['M0,0 L1,0', 'M1,0 L2,0 L3,0'],
+    )
+
+
+def test_copy_text_on_write():
+    p = Pen()
+    p.move_to((0, 0))
+    p.text('abcd', 1, 'sans-serif')
+    paper = p.paper.copy()
+    paper.translate((1, 1))
+    assert_equal(tuple(p.paper.text_elements[0].position), (0, 0))
+    assert_equal(tuple(paper.text_elements[0].position), (1, 1))
+
+
+def test_snapshot_restore():
+    p = Pen()
+    paper = p.paper
+    p.stroke_mode(2.0)
+    p.move_to((0, 0))
+    p.turn_to(0)
+    p.line_forward(5)
+    first = p.snapshot()
+
+    p.turn_left(90)
+    p.line_forward(5)
+    second = p.snapshot()
+
+    # Undo.
+    p.restore(first)
+    assert p.paper is paper
+    assert_path_data(
+        p, 0,
+        'M0,-1 L0,1 L5,1 L5,-1 L0,-1 z'
+    )
+    assert_equal(
+        p.log(),
+        [
+            'stroke_mode(2.0)',
+            'move_to((0, 0))',
+            'turn_to(0)',
+            'line_forward(5)',
+        ],
+    )
+
+    # Draw something else, which does not affect either snapshot.
+    p.turn_right(90)
+    p.line_forward(5)
+    assert_path_data(
+        p, 0,
+        'M0,-1 L0,1 L4,1 L4,5 L6,5 L6,-1 L0,-1 z'
+    )
+
+    # Redo.
+    p.restore(second)
+    assert_path_data(
+        p, 0,
+        'M0,-1 L0,1 L6,1 L6,-5 L4,-5 L4,-1 L0,-1 z'
+    )
+    assert_equal(tuple(p.position), (5, 5))
+    assert_equal(p.heading, 90)
+
+    # Snapshots can be restored more than once.
+    p.line_forward(5)
+    p.restore(first)
+    p.restore(second)
+    assert_path_data(
+        p, 0,
+        'M0,-1 L0,1 L6,1 L6,-5 L4,-5 L4,-1 L0,-1 z'
+    )
+
+
+def test_snapshot_long_stroke():
+    # Drawing after a snapshot shares all but the end of the path with the
+    # snapshot, and closing a loop onto a shared segment copies it first.
+    def draw(side, count, snapshots=None):
+        p = Pen()
+        p.stroke_mode(0.2)
+        p.move_to((0, 0))
+        p.turn_to(0)
+        for i in range(count):
+            if i > 0 and i % side == 0:
+                p.turn_left(90)
+            p.line_forward(1)
+            if snapshots is not None:
+                snapshots.append(p.snapshot())
+        return p
+
+    for side in [5, 50]:
+        snapshots = []
+        p = draw(side, 4 * side, snapshots)
+        assert_equal(
+            p.paper.format_svg(4),
+            draw(side, 4 * side).paper.format_svg(4),
+        )
+        for count in [1, side + 1, 4 * side - 1]:
+            p.restore(snapshots[count - 1])
+            assert_equal(
+                p.paper.format_svg(4),
+                draw(side, count).paper.format_svg(4),
+            )
+
+    # The middle of the path is still shared with the last snapshot.
+    snapshots = []
+    p = draw(50, 200, snapshots)
+    assert (
+        p.paper._paths[0].segments[100]
+        is snapshots[-2].paper._paths[0].segments[100]
+    )
+
+
+def test_snapshot_then_change_path():
+    # A path that a pen has continued after a snapshot can be changed in other
+    # ways, and then continued to close its loop.
+    def draw(snapshot):
+        p = Pen()
+        p.stroke_mode(0.2)
+        p.move_to((0, 0))
+        p.turn_to(0)
+        for i in range(80):
+            if i > 0 and i % 20 == 0:
+                p.turn_left(90)
+            p.line_forward(1)
+            if snapshot and i == 70:
+                p.snapshot()
+            if i > 70:
+                p.last_path()
+        return p
+
+    assert_equal(
+        draw(snapshot=True).paper.format_svg(4),
+        draw(snapshot=False).paper.format_svg(4),
+    )
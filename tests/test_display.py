@@ -0,0 +1,88 @@
+import json
+
+from nose.tools import assert_equal, assert_raises
+
+from canoepaddle import Pen
+from canoepaddle.display import MOVE, LINE, ARC, CLOSE
+
+
+def drawing():
+    p = Pen()
+    p.fill_mode('#ff0000')
+    p.move_to((0, 0))
+    p.turn_to(0)
+    p.line_forward(2)
+    p.arc_left(180, 1)
+    p.line_forward(2)
+    p.line_to((0, 0))
+    p.break_stroke()
+    p.stroke_mode(0.5, '#0000ff')
+    p.move_to((0, 5))
+    p.line_forward(3)
+    p.arc_right(90, 2)
+    p.stroke_mode(0.5, '#00ff00')
+    p.line_forward(1)
+    return p
+
+
+def test_display_list_commands():
+    p = drawing()
+    display = p.paper.display_list()
+    # One element for the fill, and one for each color of the stroke.
+    assert_equal(len(display), 3)
+    color, commands, coords = display.element(0)
+    assert_equal(color, '#ff0000')
+    assert_equal(commands.tolist(), [MOVE, LINE, ARC, LINE, LINE, CLOSE])
+    assert_equal(coords[2].round(6).tolist(), [2, 2, 2, 1, 1, 180])
+
+
+def test_display_list_svg():
+    # The display list makes the same svg as drawing the paths directly.
+    p = drawing()
+    display = p.paper.display_list()
+    for precision in [2, 12]:
+        assert_equal(
+            ''.join(display.svg_elements(precision)),
+            ''.join(p.paper.svg_elements(precision)),
+        )
+
+
+def test_format_json():
+    p = drawing()
+    data = json.loads(p.paper.format_json())
+    elements = data['elements']
+    assert_equal(
+        [element['color'] for element in elements],
+        ['#ff0000', '#0000ff', '#00ff00'],
+    )
+    assert_equal(
+        [
+            [command[0]] + [round(n, 6) for n in command[1:]]
+            for command in elements[0]['commands']
+        ],
+        [
+            ['move', 0, 0],
+            ['line', 2, 0],
+            ['arc', 2, 2, 2, 1, 1, 180],
+            ['line', 0, 2],
+            ['line', 0, 0],
+            ['close'],
+        ],
+    )
+
+
+def test_shared_display_list():
+    # One display list can be written out in every format.
+    paper = drawing().paper
+    display = paper.display_list()
+    for options in [{}, {'circles': True, 'merge': True, 'reorder': True}]:
+        assert_equal(
+            paper.format_svg(4, display=display, **options),
+            paper.format_svg(4, **options),
+        )
+    assert_equal(paper.format_json(display=display), paper.format_json())
+    assert_equal(
+        paper.format_png(2, workers=1, display=display),
+        paper.format_png(2, workers=1),
+    )
+    assert_raises(ValueError, paper.format_svg, lod=True, display=display)
@@ -0,0 +1,98 @@
+import math
+
+import numpy as np
+from nose.tools import assert_equal, assert_less, assert_raises
+
+from canoepaddle import Pen
+from canoepaddle.biarc import _distances
+from canoepaddle.segment import ArcSegment
+
+
+def max_error(segments, points):
+    # The farthest any of the points is from the segments.
+    points = np.array(points, dtype=float)
+    distances = np.full(len(points), np.inf)
+    for seg in segments:
+        if isinstance(seg, ArcSegment):
+            piece = (seg.a, seg.b, seg.center, seg.arc_angle.theta, None)
+        else:
+            piece = (seg.a, seg.b, None, 0, None)
+        distances = np.minimum(distances, _distances(points, piece))
+    return distances.max()
+
+
+def spiral(t):
+    return (t * math.cos(t) / 5, t * math.sin(t) / 5)
+
+
+def test_fit_arcs_polyline():
+    p = Pen()
+    p.stroke_mode(0.1)
+    p.parametric(spiral, 0, 30, 0.01)
+    points = [p.paper.paths[0].segments[0].a]
+    points.extend(seg.b for seg in p.paper.paths[0].segments)
+
+    p.paper.fit_arcs(0.001)
+    segments = p.paper.paths[0].segments
+    assert_less(len(segments), len(points) / 20)
+    assert_less(max_error(segments, points), 0.001)
+    # The arcs still join smoothly, and can be drawn.
+    for left, right in zip(segments, segments[1:]):
+        assert_less(abs(left.end_heading.angle_to(right.start_heading)), 1)
+    p.paper.format_svg()
+
+
+def test_fit_arcs_loop():
+    p = Pen()
+    p.stroke_mode(0.1)
+    p.move_to((1, 0))
+    for i in range(1, 101):
+        p.line_to((math.cos(i * math.pi / 50), math.sin(i * math.pi / 50)))
+
+    p.paper.fit_arcs(0.001)
+    path = p.paper.paths[0]
+    assert_equal(type(path.segments[0]), ArcSegment)
+    assert_less(len(path.segments), 5)
+    # The loop is closed.
+    assert_equal(path.loop_start_segment, None)
+
+
+def test_fit_arcs_corners():
+    # Sharp corners are kept.
+    p = Pen()
+    p.stroke_mode(0.1)
+    p.move_to((0, 0))
+    p.turn_to(0)
+    for _ in range(4):
+        for _ in range(5):
+            p.line_forward(0.2)
+        p.turn_left(90)
+
+    p.paper.fit_arcs(0.001)
+    assert_equal(
+        [
+            tuple(round(n, 6) for n in seg.b)
+            for seg in p.paper.paths[0].segments
+        ],
+        [(1, 0), (1, 1), (0, 1), (0, 0)],
+    )
+
+
+def test_parametric_arcs():
+    p = Pen()
+    p.stroke_mode(0.1)
+    p.move_to((1, 2))
+    p.parametric(spiral, 0, 30, tolerance=0.001, arcs=True)
+    segments = p.paper.paths[0].segments
+    assert_equal(len(segments), 60)
+
+    points = [
+        (x + 1, y + 2) for x, y in
+        (spiral(i / 100) for i in range(3001))
+    ]
+    assert_less(max_error(segments, points), 0.001)
+
+    assert_raises(
+        ValueError,
+        lambda: p.parametric(spiral, 0, 30, 0.1, arcs=True),
+    )
@@ -7,11 +7,19 @@ from canoepaddle.geometry import (
     intersect_lines,
     intersect_circle_line,
     intersect_circles,
+    intersect_lines_array,
+    intersect_circle_line_array,
+    intersect_circles_array,
     quadratic_formula,
     collinear,
     find_point_pairs,
 )
-from canoepaddle.point import epsilon
+from canoepaddle.point import (
+    epsilon,
+    points_equal,
+    point_key,
+    neighbor_keys,
+)
 
 
 def test_quadratic_formula():
@@ -174,6 +182,70 @@ def test_intersect_circles_numerical():
     )
 
 
+def found_points(points, found):
+    return [
+        [tuple(p) for p, f in zip(pair_points, pair_found) if f]
+        for pair_points, pair_found in zip(points.tolist(), found.tolist())
+    ]
+
+
+def test_intersect_lines_array():
+    lines = [
+        ((0, 0), (10, 10), (0, 10), (10, 0)),
+        ((0, 0), (10, 0), (5, 0), (15, 0.01)),
+        ((0, 0), (1, 0), (0, 1), (1, 1)),
+        ((0, 0), (1, 0), (2, 1), (2, -1)),
+        ((2, 1), (2, -1), (0, 0), (1, 0)),
+    ]
+    for segment in [False, True]:
+        points, found = intersect_lines_array(*zip(*lines), segment=segment)
+        for i, args in enumerate(lines):
+            expected = intersect_lines(*args, segment=segment)
+            if expected is None:
+                assert not found[i]
+            else:
+                assert found[i]
+                assert_points_equal(points[i], expected)
+
+
+def test_intersect_circle_line_array():
+    pairs = [
+        ((0, 0), sqrt2, (1, 2), (1, -2)),
+        ((0, 0), -sqrt2, (1, 2), (1, -2)),
+        ((0, 0), sqrt2, (2, 0), (0, 2)),
+        ((0, 0), sqrt2, (2, 0), (0, 2.00001)),
+    ]
+    points, found = intersect_circle_line_array(*zip(*pairs))
+    for args, result in zip(pairs, found_points(points, found)):
+        expected = intersect_circle_line(*args)
+        assert_equal(len(result), len(expected))
+        for p, q in zip(result, expected):
+            assert_points_equal(p, q)
+
+
+def test_intersect_circles_array():
+    pairs = [
+        ((0, 0), 1, (0, 0), 1),
+        ((0, 0), 1, (5, 0), 1),
+        ((0, 0), 1, (0, 0), 2),
+        ((0, 0), 1, (2, 0), 1),
+        ((0, 0), 2, (1, 0), 1),
+        ((0, 1), 1.5, (0, 0), 2.5),
+        ((-1, 0), sqrt2, (1, 0), sqrt2),
+        ((0, 0), sqrt2, (1, 0), 1),
+        (
+            (-27.073924841728974, 65.92689560740814), -1.25,
+            (0.5, 0.5), -72.25000000000001,
+        ),
+    ]
+    points, found = intersect_circles_array(*zip(*pairs))
+    for args, result in zip(pairs, found_points(points, found)):
+        expected = intersect_circles(*args)
+        assert_equal(len(result), len(expected))
+        for p, q in zip(result, expected):
+            assert_points_equal(p, q)
+
+
 def test_collinear():
     assert collinear(
         (0, 0),
@@ -252,3 +324,29 @@ def test_find_point_pairs():
         ]),
         [],
     )
+    # Points that are equal but fall on either side of a grid cell boundary.
+    assert_equal(
+        find_point_pairs([
+            (-epsilon * 0.4, epsilon * 0.1),
+            (5, 5),
+            (epsilon * 0.4, -epsilon * 0.1),
+        ]),
+        [(0, 2)],
+    )
+
+
+def test_point_key():
+    # Points that are equal always have the same or adjacent keys.
+    for a, b in [
+        ((0, 0), (epsilon, epsilon)),
+        ((-epsilon / 2, 3), (epsilon / 2, 3)),
+        ((1000, -1000), (1000 + epsilon / 2, -1000 - epsilon / 2)),
+    ]:
+        assert points_equal(a, b)
+        assert point_key(b) in set(neighbor_keys(point_key(a)))
+
+    # Keys of points which are far apart are not adjacent.
+    assert (
+        point_key((1, 0)) not in
+        set(neighbor_keys(point_key((0, 0))))
+    )
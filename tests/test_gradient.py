@@ -0,0 +1,55 @@
+import re
+
+from nose.tools import assert_equal
+
+from canoepaddle import Pen
+from grapefruit import Color
+
+
+def rainbow_circle(num_colors):
+    p = Pen()
+    p.move_to((0, 4))
+    p.turn_to(0)
+    for i in range(num_colors):
+        t = i / num_colors
+        p.stroke_mode(1.0, Color((t, 0.5, 1 - t)))
+        p.arc_right(360 / num_colors, center=(0, 0))
+    return p
+
+
+def test_gradient_chunks():
+    p = rainbow_circle(36)
+    svg_data = ''.join(p.paper.svg_elements(2, gradients=True))
+    # The circle is split into quarters.
+    assert_equal(svg_data.count('<path'), 4)
+    assert_equal(
+        re.findall(r'<linearGradient id="([^"]*)"', svg_data),
+        ['gradient-0', 'gradient-1', 'gradient-2', 'gradient-3'],
+    )
+    assert_equal(svg_data.count('<stop'), 36)
+    assert svg_data.startswith(
+        '<linearGradient id="gradient-0" gradientUnits="userSpaceOnUse" '
+        'x1="0.00" y1="-4.00" x2="4.00" y2="0.00">'
+        '<stop offset="0.05" stop-color="#0080ff" />'
+    )
+    assert 'fill="url(#gradient-3)"' in svg_data
+
+
+def test_gradient_single_color():
+    # Paths with one color, and parts of paths that don't change color, are
+    # drawn as usual.
+    p = Pen()
+    p.stroke_mode(1.0, 'red')
+    p.move_to((0, 0))
+    p.turn_to(0)
+    p.line_forward(2)
+    p.arc_left(180, 1)
+    p.stroke_mode(1.0, 'blue')
+    p.line_forward(2)
+    p.break_stroke()
+    p.move_to((0, 5))
+    p.line_forward(2)
+    assert_equal(
+        p.paper.svg_elements(2, gradients=True),
+        p.paper.svg_elements(2),
+    )
@@ -0,0 +1,163 @@
+import random
+
+from nose.tools import assert_equal, assert_almost_equal
+
+from .util import assert_points_equal
+from canoepaddle import Pen
+from canoepaddle.hit_test import SegmentIndex
+
+
+def test_hit_test():
+    p = Pen()
+    p.stroke_mode(1.0)
+    p.move_to((0, 0))
+    p.turn_to(0)
+    p.line_forward(10)
+    p.arc_left(180, 2)
+    p.break_stroke()
+    p.move_to((5, -5))
+    p.turn_to(90)
+    p.line_forward(10)
+    line, arc = p.paper.paths[0].segments
+    (crossing,) = p.paper.paths[1].segments
+
+    paper = p.paper
+    assert_equal(paper.hit_test((2, 0.4), 0), [(paper.paths[0], line)])
+    assert_equal(paper.hit_test((2, 0.6), 0), [])
+    assert_equal(paper.hit_test((2, 0.6), 0.2), [(paper.paths[0], line)])
+    assert_equal(paper.hit_test((12, 2), 0), [(paper.paths[0], arc)])
+    assert_equal(paper.hit_test((10, 2), 0), [])
+
+    # The topmost segment comes first.
+    assert_equal(
+        paper.hit_test((5, 0), 0),
+        [(paper.paths[1], crossing), (paper.paths[0], line)],
+    )
+
+
+def test_nearest_endpoint():
+    p = Pen()
+    p.stroke_mode(1.0)
+    assert_equal(p.paper.nearest_endpoint((0, 0)), None)
+
+    p.move_to((0, 0))
+    p.turn_to(0)
+    p.line_forward(10)
+    p.arc_left(90, 2)
+    line, arc = p.paper.paths[0].segments
+
+    distance, point, path, seg = p.paper.nearest_endpoint((13, 2))
+    assert_almost_equal(distance, 1.0)
+    assert_points_equal(point, (12, 2))
+    assert seg is arc
+    assert path is p.paper.paths[0]
+
+    distance, point, path, seg = p.paper.nearest_endpoint((-1, 0))
+    assert_equal((distance, point, seg), (1.0, (0, 0), line))
+
+
+def test_nearest_endpoint_far_away():
+    # Points far outside the drawing find the nearest end without searching
+    # all the empty space in between.
+    p = Pen()
+    p.stroke_mode(0.1)
+    for i in range(100):
+        p.move_to((i, 0))
+        p.turn_to(90)
+        p.line_forward(1)
+        p.break_stroke()
+
+    distance, point, _, _ = p.paper.nearest_endpoint((-1e6, 0))
+    assert_equal(point, (0, 0))
+    assert_almost_equal(distance, 1e6)
+    distance, point, _, _ = p.paper.nearest_endpoint((1e6, 1e6))
+    assert_equal(point, (99, 1))
+
+
+def test_hit_test_after_changes():
+    # Changing a path in other ways than drawing on it starts a new index.
+    p = Pen()
+    p.stroke_mode(1.0)
+    p.move_to((0, 0))
+    p.turn_to(0)
+    p.line_forward(5)
+    hits = p.paper.hit_test((2, 0), 0)
+    assert_equal(len(hits), 1)
+
+    p.last_path().translate((100, 0))
+    assert_equal(p.paper.hit_test((2, 0), 0), [])
+    assert_equal(p.paper.hit_test((102, 0), 0), hits)
+    distance, point, _, _ = p.paper.nearest_endpoint((100, 0))
+    assert_equal((distance, point), (0, (100, 0)))
+
+    p.paper.translate((0, 10))
+    assert_equal(p.paper.hit_test((102, 10), 0), hits)
+
+
+def test_hit_test_paths_property():
+    # Reading the paths keeps the index, and changing them through the
+    # paths property starts a new one.
+    p = Pen()
+    p.stroke_mode(1.0)
+    p.move_to((0, 0))
+    p.turn_to(0)
+    p.line_forward(5)
+    p.break_stroke()
+    p.line_forward(5)
+    hits = p.paper.hit_test((2, 0), 0)
+    index = p.paper._segment_index
+    assert_equal(len(p.paper.paths), 2)
+    assert_equal(p.paper.hit_test((2, 0), 0), hits)
+    assert p.paper._segment_index is index
+
+    p.paper.paths[0].translate((0, 100))
+    assert_equal(p.paper.hit_test((2, 0), 0), [])
+    assert_equal(p.paper.hit_test((2, 100), 0), hits)
+
+    del p.paper.paths[0]
+    assert_equal(p.paper.hit_test((2, 100), 0), [])
+
+
+def test_hit_test_while_drawing():
+    # The index keeps up with a pen drawing on the paper, and with copies of
+    # the paper, and with the pen continuing a path shared with a snapshot,
+    # and matches a freshly made index.
+    random.seed(0)
+    p = Pen()
+    p.stroke_mode(0.5)
+    p.move_to((0, 0))
+    p.turn_to(0)
+    p.paper.hit_test((0, 0), 0)
+
+    copies = []
+    for i in range(200):
+        if i % 50 == 0:
+            copies.append(p.paper.copy())
+            p.break_stroke()
+        elif i % 10 == 0:
+            copies.append(p.snapshot().paper)
+        if random.random() < 0.5:
+            p.line_forward(random.uniform(0.5, 2))
+        else:
+            p.arc_left(random.uniform(-120, 120), random.uniform(1, 3))
+        p.turn_left(random.uniform(-90, 90))
+        if i % 20 == 0:
+            # Close a loop back to the start of the stroke.
+            p.line_to(p.paper._paths[-1].segments[0].a)
+
+        point = (random.uniform(-10, 10), random.uniform(-10, 10))
+        fresh = SegmentIndex(p.paper._paths)
+        assert_equal(
+            p.paper.hit_test(point, 0.5),
+            fresh.hit_test(point, 0.5),
+        )
+        assert_equal(
+            p.paper.nearest_endpoint(point)[:2],
+            fresh.nearest_endpoint(point)[:2],
+        )
+
+    for paper in copies:
+        fresh = SegmentIndex(paper._paths)
+        for _ in range(20):
+            point = (random.uniform(-10, 10), random.uniform(-10, 10))
+            assert_equal(paper.hit_test(point, 1), fresh.hit_test(point, 1))
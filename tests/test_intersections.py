@@ -0,0 +1,216 @@
+import math
+import random
+
+from nose.tools import assert_equal
+
+from .util import assert_points_equal
+from canoepaddle import Pen
+from canoepaddle.geometry import (
+    intersect_lines,
+    intersect_circle_line,
+    intersect_circles,
+)
+from canoepaddle.intersections import outline_pieces, candidate_pairs
+from canoepaddle.point import points_equal
+from canoepaddle.segment import ArcSegment
+
+
+def test_crossing_strokes():
+    p = Pen()
+    p.stroke_mode(1.0)
+    p.move_to((0, 0))
+    p.turn_to(0)
+    p.line_forward(10)
+    p.break_stroke()
+    p.move_to((5, -5))
+    p.turn_to(90)
+    p.line_forward(10)
+
+    intersections = p.paper.find_intersections()
+    assert_equal(
+        [(x.point, x.first, x.second, x.overlap) for x in intersections],
+        [
+            ((4.5, -0.5), 0, 1, False),
+            ((4.5, 0.5), 0, 1, False),
+            ((5.5, -0.5), 0, 1, False),
+            ((5.5, 0.5), 0, 1, False),
+        ],
+    )
+
+
+def test_shared_edge():
+    p = Pen()
+    p.fill_mode()
+    p.move_to((0, 0))
+    p.square(2)
+    p.move_to((2, 0))
+    p.square(2)
+    # This one only touches at a corner.
+    p.move_to((-2, 2))
+    p.square(2)
+
+    intersections = p.paper.find_intersections()
+    assert_equal(
+        [(x.first, x.second, x.overlap) for x in intersections],
+        [(0, 1, False), (0, 1, True), (0, 1, False), (0, 2, False)],
+    )
+    for x, point in zip(intersections, [(1, -1), (1, 0), (1, 1), (-1, 1)]):
+        assert_points_equal(x.point, point)
+
+
+def test_touching_circle():
+    # A corner touching a circle is found wherever it is around the circle,
+    # including where the circle's arcs are split up.
+    for x, y in [(-1, 0), (0, 1), (1, 0), (0, -1)]:
+        p = Pen()
+        p.fill_mode()
+        p.move_to((0, 0))
+        p.circle(1)
+        p.break_stroke()
+        p.move_to((x, y))
+        p.line_to((3 * x - 2 * y, 3 * y + 2 * x))
+        p.line_to((3 * x + 2 * y, 3 * y - 2 * x))
+        p.line_to((x, y))
+
+        intersections = p.paper.find_intersections()
+        assert_equal(len(intersections), 1)
+        assert_points_equal(intersections[0].point, (x, y))
+
+
+def test_self_intersection():
+    # A thick stroke turning too tightly crosses itself on the inside.
+    p = Pen()
+    p.stroke_mode(1.0)
+    p.move_to((0, 0))
+    p.turn_to(0)
+    p.line_forward(3)
+    p.arc_left(270, 0.25)
+    p.line_forward(3)
+
+    intersections = p.paper.find_intersections()
+    assert len(intersections) > 0
+    assert all(x.first == x.second == 0 for x in intersections)
+
+
+def test_stacked_strokes():
+    # Long strokes stacked on top of each other all overlap in x, but only
+    # neighboring outline edges are close enough in y to be checked.
+    p = Pen()
+    p.stroke_mode(0.5)
+    for y in range(500):
+        p.break_stroke()
+        p.move_to((0, y))
+        p.line_to((100, y))
+
+    pieces, _, edges, _, _ = outline_pieces(p.paper.display_list())
+    i, j = candidate_pairs(pieces, edges)
+    assert len(i) <= 2 * len(pieces)
+    assert_equal(p.paper.find_intersections(), [])
+
+
+def test_matches_all_pairs():
+    # Compare with checking every pair of outline edges.
+    random.seed(0)
+    for _ in range(20):
+        p = Pen()
+        for _ in range(4):
+            if random.random() < 0.5:
+                p.stroke_mode(0.5)
+            else:
+                p.fill_mode()
+            p.move_to((random.uniform(-5, 5), random.uniform(-5, 5)))
+            p.turn_to(random.uniform(0, 360))
+            for _ in range(3):
+                if random.random() < 0.5:
+                    p.line_forward(random.uniform(1, 5))
+                else:
+                    p.arc_left(random.uniform(-300, 300), random.uniform(1, 3))
+            p.break_stroke()
+
+        found = [
+            (x.first, x.second, x.point)
+            for x in p.paper.find_intersections()
+            if not x.overlap
+        ]
+        expected = all_pairs_intersections(p.paper)
+        assert_equal(len(found), len(expected))
+        for first, second, point in expected:
+            assert any(
+                (first, second) == (f, s) and points_equal(point, q)
+                for f, s, q in found
+            )
+
+
+def all_pairs_intersections(paper):
+    edges = outline_edges(paper)
+    result = []
+    for i, (path_a, a, next_a) in enumerate(edges):
+        for path_b, b, next_b in edges[i + 1:]:
+            for point in edge_intersections(a, b, next_a, next_b):
+                key = (min(path_a, path_b), max(path_a, path_b))
+                if not any(
+                    key == (f, s) and points_equal(point, q)
+                    for f, s, q in result
+                ):
+                    result.append(key + (point,))
+    return result
+
+
+def outline_edges(paper):
+    # Each outline edge, with its path, and the edge after it around its
+    # outline, going around outlines as in Path.render_commands().
+    edges = []
+    for path_index, path in enumerate(paper.paths):
+        for color, fill_paths in path.mode.iter_fill(path):
+            for fill_path in fill_paths:
+                run = []
+                for seg in fill_path.segments:
+                    if run and not points_equal(run[-1][1].b, seg.a):
+                        run = []
+                    edge = [path_index, seg, None]
+                    if run:
+                        run[-1][2] = seg
+                    run.append(edge)
+                    edges.append(edge)
+                    if points_equal(seg.b, run[0][1].a):
+                        edge[2] = run[0][1]
+                        run = []
+    return edges
+
+
+def edge_intersections(a, b, next_a, next_b):
+    if isinstance(a, ArcSegment) and isinstance(b, ArcSegment):
+        points = intersect_circles(a.center, a.radius, b.center, b.radius)
+    elif isinstance(a, ArcSegment):
+        points = intersect_circle_line(a.center, a.radius, b.a, b.b)
+    elif isinstance(b, ArcSegment):
+        points = intersect_circle_line(b.center, b.radius, a.a, a.b)
+    else:
+        point = intersect_lines(a.a, a.b, b.a, b.b, segment=True)
+        points = [] if point is None else [point]
+    for point in points:
+        if not (on_edge(point, a) and on_edge(point, b)):
+            continue
+        if (
+            next_a is b and points_equal(point, a.b)
+            or next_b is a and points_equal(point, b.b)
+        ):
+            continue
+        yield point
+
+
+def on_edge(point, seg):
+    if not isinstance(seg, ArcSegment):
+        return all(
+            min(a, b) - 1e-9 <= p <= max(a, b) + 1e-9
+            for p, a, b in zip(point, seg.a, seg.b)
+        )
+    # Measure how far around the arc the point is.
+    center = seg.center
+    start = math.atan2(seg.a[1] - center[1], seg.a[0] - center[0])
+    theta = math.atan2(point[1] - center[1], point[0] - center[0])
+    sweep = math.radians(seg.arc_angle.theta)
+    turn = (theta - start) % (2 * math.pi)
+    if sweep < 0:
+        turn = (start - theta) % (2 * math.pi)
+    return turn <= abs(sweep) + 1e-9 or turn >= 2 * math.pi - 1e-9
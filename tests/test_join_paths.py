@@ -1,6 +1,9 @@
+from nose.tools import assert_equal
+
 from .util import assert_path_data, sqrt2
 
 from canoepaddle import Pen
+from canoepaddle.point import epsilon
 
 
 def test_join_paths():
@@ -363,3 +366,189 @@ def test_join_paths_turn_back_no_joint():
             'L5.0,-0.5 L5.0,0.5 L10.0,0.5 L10.0,-0.5 L0.0,-0.5 z'
         )
     )
+
+
+def test_join_paths_tolerance():
+    # Straight path ends with a small gap between them meet in the middle.
+    p = Pen()
+    p.fill_mode()
+    p.move_to((0, 0))
+    p.line_to((1, 0))
+    p.break_stroke()
+    p.move_to((1.02, 0))
+    p.line_to((2, 0))
+
+    p.paper.join_paths()
+    assert_equal(len(p.paper.paths), 2)
+
+    p.paper.join_paths(tolerance=0.01)
+    assert_equal(len(p.paper.paths), 2)
+
+    p.paper.join_paths(tolerance=0.05)
+    assert_path_data(p, 2, 'M0.00,0.00 L1.01,0.00 L2.00,0.00')
+
+
+def test_join_paths_tolerance_closest():
+    # The closest ends are joined first.
+    p = Pen()
+    p.fill_mode()
+    p.move_to((0, 0))
+    p.line_to((1, 0))
+    p.break_stroke()
+    p.move_to((1.03, 0))
+    p.line_to((2, 0))
+    p.break_stroke()
+    p.move_to((1.01, 1))
+    p.line_to((1.01, 0))
+
+    p.paper.join_paths(tolerance=0.05)
+    assert_path_data(
+        p, 3,
+        [
+            'M0.000,0.000 L1.005,0.000 L1.010,-1.000',
+            'M1.030,0.000 L2.000,0.000',
+        ],
+    )
+
+
+def test_join_paths_tolerance_arcs():
+    # Arcs keep their shape, and the gap between them is bridged.
+    p = Pen()
+    p.stroke_mode(1.0)
+    p.move_to((0, 0))
+    p.turn_to(0)
+    p.arc_left(90, 1)
+    p.break_stroke()
+    p.move_to((1, 1.01))
+    p.turn_to(90)
+    p.arc_left(90, 1)
+
+    p.paper.join_paths(tolerance=0.05)
+    path = p.paper.paths[0]
+    assert_equal(len(p.paper.paths), 1)
+    assert_equal(len(path.segments), 3)
+    assert_equal(
+        [
+            round(seg.radius, 6)
+            for seg in path.segments
+            if hasattr(seg, 'radius')
+        ],
+        [1, 1],
+    )
+    assert_path_data(
+        p, 2,
+        (
+            'M0.00,-0.50 L0.00,0.50 A 1.50,1.50 0 0 0 1.50,-1.00 '
+            'L1.50,-1.01 A 1.50,1.50 0 0 0 0.00,-2.51 L0.00,-1.51 '
+            'A 0.50,0.50 0 0 1 0.50,-1.01 L0.50,-1.00 '
+            'A 0.50,0.50 0 0 1 0.00,-0.50 z'
+        )
+    )
+
+
+def test_join_paths_junctions():
+    # Four paths meeting at one point are left alone normally.
+    p = Pen()
+    p.fill_mode()
+    for heading in [0, 90, 180, 270]:
+        p.break_stroke()
+        p.move_to((0, 0))
+        p.turn_to(heading)
+        p.line_forward(1)
+
+    p.paper.join_paths()
+    assert_equal(len(p.paper.paths), 4)
+
+    # With junctions, they are paired up to go straight through.
+    p.paper.join_paths(junctions=True)
+    assert_path_data(p, 0, ['M1,0 L0,0 L-1,0', 'M0,-1 L0,0 L0,1'])
+
+
+def test_join_paths_junctions_grid():
+    # A grid of short lines joins up into long straight lines, and a loop
+    # around the outside.
+    p = Pen()
+    p.fill_mode()
+    for i in range(4):
+        for j in range(3):
+            p.break_stroke()
+            p.move_to((i, j))
+            p.line_to((i, j + 1))
+            p.break_stroke()
+            p.move_to((j, i))
+            p.line_to((j + 1, i))
+
+    p.paper.join_paths(junctions=True)
+    assert_path_data(
+        p, 0,
+        [
+            (
+                'M0,0 L0,-1 L0,-2 L0,-3 L1,-3 L2,-3 L3,-3 '
+                'L3,-2 L3,-1 L3,0 L2,0 L1,0 L0,0 z'
+            ),
+            'M1,0 L1,-1 L1,-2 L1,-3',
+            'M0,-1 L1,-1 L2,-1 L3,-1',
+            'M2,0 L2,-1 L2,-2 L2,-3',
+            'M0,-2 L1,-2 L2,-2 L3,-2',
+        ]
+    )
+
+
+def test_join_paths_junctions_thick():
+    # Three thick paths meet, and the straightest two are joined.
+    p = Pen()
+    p.stroke_mode(1.0)
+    p.move_to((0, 0))
+    p.turn_to(0)
+    p.line_forward(2)
+    p.break_stroke()
+    p.turn_to(80)
+    p.line_forward(2)
+    p.break_stroke()
+    p.move_to((2, 0))
+    p.turn_to(10)
+    p.line_forward(2)
+
+    p.paper.join_paths(junctions=True)
+    assert_equal(len(p.paper.paths), 2)
+    assert_equal(
+        [len(path.segments) for path in p.paper.paths],
+        [2, 1],
+    )
+    joined = p.paper.paths[0]
+    assert_equal(
+        round(joined.segments[-1].heading.theta),
+        10,
+    )
+
+
+def test_join_paths_junctions_near_ends():
+    # Path ends in a chain just under epsilon apart all meet at the first
+    # one, even though the ends at either side of it are further apart.
+    d = 0.9 * epsilon
+    p = Pen()
+    p.stroke_mode(0.2)
+    p.move_to((1, 1))
+    p.line_to((1, 0))
+    p.break_stroke()
+    p.move_to((1 - d, 0))
+    p.line_to((2, 0))
+    p.break_stroke()
+    p.move_to((0, 0))
+    p.line_to((1 + d, 0))
+
+    p.paper.join_paths(junctions=True)
+    assert_equal(len(p.paper.paths), 2)
+    assert_path_data(
+        p, 1,
+        [
+            'M1.1,-1.0 L0.9,-1.0 L0.9,0.0 L1.1,0.0 L1.1,-1.0 z',
+            (
+                'M2.0,0.1 L2.0,-0.1 L1.0,-0.1 L0.0,-0.1 '
+                'L0.0,0.1 L1.0,0.1 L2.0,0.1 z'
+            ),
+        ]
+    )
+    line1, line2 = p.paper.paths[1].segments
+    assert_equal(line1.b, (1, 0))
+    assert_equal(line2.a, (1, 0))
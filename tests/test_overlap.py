@@ -0,0 +1,164 @@
+from nose.tools import assert_equal
+
+from .util import assert_path_data
+
+from canoepaddle import Pen
+
+
+def test_remove_duplicates():
+    # The same stroke drawn forward and backward.
+    p = Pen()
+    p.stroke_mode(1.0)
+    p.move_to((0, 0))
+    p.turn_to(0)
+    p.line_forward(2)
+    p.arc_left(90, 1)
+    p.break_stroke()
+    p.move_to((3, 1))
+    p.turn_to(270)
+    p.arc_right(90, 1)
+    p.line_forward(2)
+
+    assert_equal(p.paper.remove_overlaps(), 2)
+    assert_path_data(
+        p, 1,
+        'M3.5,-1.0 L2.5,-1.0 A 0.5,0.5 0 0 1 2.0,-0.5 L0.0,-0.5 '
+        'L0.0,0.5 L2.0,0.5 A 1.5,1.5 0 0 0 3.5,-1.0 z',
+    )
+
+
+def test_remove_duplicates_keeps_joints():
+    # A duplicate of a joined segment is only removed if it has the same
+    # corners.
+    p = Pen()
+    p.stroke_mode(1.0)
+    p.move_to((0, 0))
+    p.turn_to(0)
+    p.line_forward(4)
+    p.turn_left(90)
+    p.line_forward(2)
+    p.break_stroke()
+    p.move_to((0, 0))
+    p.turn_to(0)
+    p.line_forward(4)
+
+    assert_equal(p.paper.remove_overlaps(), 0)
+    assert_equal(len(p.paper.paths), 2)
+
+
+def test_remove_duplicates_fill():
+    # Filled shapes are left alone.
+    p = Pen()
+    p.fill_mode()
+    p.move_to((0, 0))
+    p.line_to((1, 0))
+    p.line_to((0, 0))
+    p.break_stroke()
+    p.line_to((1, 0))
+
+    assert_equal(p.paper.remove_overlaps(), 0)
+    assert_equal(len(p.paper.paths), 2)
+
+
+def test_merge_overlaps():
+    p = Pen()
+    p.stroke_mode(1.0)
+    for start, end in [(0, 4), (6, 3), (5, 4.5), (8, 10), (3, 6)]:
+        p.break_stroke()
+        p.move_to((start, 0))
+        p.line_to((end, 0))
+    # Different widths are not merged.
+    p.break_stroke()
+    p.stroke_mode(2.0)
+    p.move_to((9, 0))
+    p.line_to((12, 0))
+
+    assert_equal(p.paper.remove_overlaps(), 3)
+    assert_path_data(
+        p, 1,
+        [
+            'M8.0,-0.5 L8.0,0.5 L10.0,0.5 L10.0,-0.5 L8.0,-0.5 z',
+            'M0.0,-0.5 L0.0,0.5 L6.0,0.5 L6.0,-0.5 L0.0,-0.5 z',
+            'M9.0,-1.0 L9.0,1.0 L12.0,1.0 L12.0,-1.0 L9.0,-1.0 z',
+        ]
+    )
+
+
+def test_merge_overlaps_keeps_stacking():
+    # A red stroke is drawn over the first black stroke, and under the
+    # second, so those two can't be merged. The second and third can.
+    p = Pen()
+    p.stroke_mode(1.0, 'black')
+    p.move_to((0, 0))
+    p.line_to((4, 0))
+    p.break_stroke()
+    p.stroke_mode(1.0, 'red')
+    p.move_to((3, -2))
+    p.line_to((3, 2))
+    p.break_stroke()
+    p.stroke_mode(1.0, 'black')
+    p.move_to((2, 0))
+    p.line_to((6, 0))
+    p.break_stroke()
+    p.move_to((5, 0))
+    p.line_to((8, 0))
+
+    assert_equal(p.paper.remove_overlaps(), 1)
+    assert_equal(
+        [
+            [(tuple(seg.a), tuple(seg.b)) for seg in path.segments]
+            for path in p.paper.paths
+        ],
+        [
+            [((0, 0), (4, 0))],
+            [((3, -2), (3, 2))],
+            [((2, 0), (8, 0))],
+        ],
+    )
+
+
+def test_merge_overlaps_diagonal():
+    # The red stroke is drawn between the two black strokes, inside the
+    # bounds of the diagonal they make, but it doesn't touch either of them.
+    p = Pen()
+    p.stroke_mode(0.1, 'black')
+    p.move_to((0, 0))
+    p.line_to((2, 2))
+    p.break_stroke()
+    p.stroke_mode(0.1, 'red')
+    p.move_to((4, 0))
+    p.line_to((4, 0.5))
+    p.break_stroke()
+    p.stroke_mode(0.1, 'black')
+    p.move_to((1, 1))
+    p.line_to((5, 5))
+
+    assert_equal(p.paper.remove_overlaps(), 1)
+    assert_equal(
+        [
+            [(tuple(seg.a), tuple(seg.b)) for seg in path.segments]
+            for path in p.paper.paths
+        ],
+        [
+            [((4, 0), (4, 0.5))],
+            [((0, 0), (5, 5))],
+        ],
+    )
+
+
+def test_merge_overlaps_long_diagonal():
+    p = Pen()
+    p.stroke_mode(0.1)
+    for i in range(3000):
+        p.break_stroke()
+        p.move_to((i, i))
+        p.line_to((i + 2, i + 2))
+
+    assert_equal(p.paper.remove_overlaps(), 2999)
+    assert_equal(
+        [
+            [(tuple(seg.a), tuple(seg.b)) for seg in path.segments]
+            for path in p.paper.paths
+        ],
+        [[((0, 0), (3001, 3001))]],
+    )
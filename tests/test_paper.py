@@ -1,7 +1,18 @@
+import gzip
+import io
+
 from nose.tools import assert_equal, assert_raises
 from .util import assert_path_data
 
 from canoepaddle import Pen, Paper, Bounds
+from canoepaddle.svg import (
+    number,
+    path_data,
+    MOVE,
+    LINE,
+    ARC,
+    CLOSE,
+)
 
 
 def test_format_empty_bounds():
@@ -273,3 +284,168 @@ def test_two_pens_one_paper():
         paper, 0,
         ['M0,0 L0,-1', 'M0,0 L2,0']
     )
+
+
+def test_svg_circles():
+    p = Pen()
+    p.fill_mode('red')
+    p.move_to((1, 1))
+    p.circle(0.5)
+    p.stroke_mode(0.2, 'blue')
+    p.move_to((3, 1))
+    p.circle(0.5)
+    # A stroke that covers the center of the circle, and a circle that has
+    # more drawn onto it, are still drawn as paths.
+    p.stroke_mode(2.0)
+    p.move_to((6, 1))
+    p.circle(0.5)
+    p.stroke_mode(0.2)
+    p.move_to((9, 1))
+    p.circle(0.5)
+    p.turn_to(0)
+    p.line_forward(1)
+
+    elements = p.paper.svg_elements(1, circles=True)
+    assert_equal(
+        elements[:2],
+        [
+            '<circle cx="1.0" cy="-1.0" r="0.5" fill="#ff0000" />',
+            '<circle cx="3.0" cy="-1.0" r="0.5" '
+            'fill="none" stroke="#0000ff" stroke-width="0.2" />',
+        ]
+    )
+    assert_equal(elements[2:], p.paper.svg_elements(1)[2:])
+
+
+def test_svg_merge():
+    p = Pen()
+    p.fill_mode('red')
+    p.move_to((0, 0))
+    p.square(1)
+    p.move_to((2, 0))
+    p.square(1)
+    # This square overlaps the last one, so it is kept separate.
+    p.move_to((2.5, 0))
+    p.square(1)
+    p.text('hello', 1)
+    p.stroke_mode(0.2, 'red')
+    p.move_to((0, 4))
+    p.line_to((1, 4))
+
+    assert_equal(
+        p.paper.svg_elements(1, merge=True),
+        [
+            '<path d="M-0.5,0.5 L0.5,0.5 L0.5,-0.5 L-0.5,-0.5 L-0.5,0.5 z '
+            'M1.5,0.5 L2.5,0.5 L2.5,-0.5 L1.5,-0.5 L1.5,0.5 z" '
+            'fill="#ff0000" />',
+            '<path d="M2.0,0.5 L3.0,0.5 L3.0,-0.5 L2.0,-0.5 L2.0,0.5 z '
+            'M0.0,-4.1 L0.0,-3.9 L1.0,-3.9 L1.0,-4.1 L0.0,-4.1 z" '
+            'fill="#ff0000" />',
+            p.paper.svg_elements(1)[-1],
+        ]
+    )
+
+
+def test_svg_merge_many():
+    # A large grid of separate squares merge into one element, until one
+    # overlaps them.
+    p = Pen()
+    p.fill_mode('red')
+    for i in range(30):
+        for j in range(30):
+            p.move_to((2 * i, 2 * j))
+            p.square(1)
+    assert_equal(len(p.paper.svg_elements(1, merge=True)), 1)
+
+    p.move_to((20.5, 20.5))
+    p.square(1)
+    assert_equal(len(p.paper.svg_elements(1, merge=True)), 2)
+
+
+def test_svg_merge_mixed_sizes():
+    # A tiny element followed by a huge one doesn't make the huge one search
+    # a grid of tiny cells.
+    p = Pen()
+    p.fill_mode('red')
+    p.move_to((0, 0))
+    p.circle(0.001)
+    p.move_to((100, 0))
+    p.square(20)
+    p.move_to((0, 0))
+    p.circle(0.001)
+    assert_equal(len(p.paper.svg_elements(3, merge=True)), 2)
+
+
+def test_svg_reorder():
+    p = Pen()
+    p.fill_mode('red')
+    p.move_to((0, 0))
+    p.square(1)
+    p.fill_mode('blue')
+    p.move_to((2, 0))
+    p.square(1)
+    # This square can move back next to the first red one.
+    p.fill_mode('red')
+    p.move_to((4, 0))
+    p.square(1)
+    # This one overlaps the blue square, so it has to stay on top of it.
+    p.fill_mode('red')
+    p.move_to((2.5, 0))
+    p.square(1)
+
+    elements = p.paper.svg_elements(1)
+    assert_equal(
+        p.paper.svg_elements(1, reorder=True),
+        [elements[0], elements[2], elements[1], elements[3]],
+    )
+
+
+def test_write_svgz():
+    p = Pen()
+    p.fill_mode('red')
+    p.move_to((0, 0))
+    p.square(1)
+    p.text('hello', 1)
+
+    f = io.BytesIO()
+    p.paper.write_svgz(f, precision=2, compresslevel=1)
+    assert_equal(
+        gzip.decompress(f.getvalue()).decode(),
+        p.paper.format_svg(precision=2),
+    )
+
+
+def test_svg_path_data():
+    # Writing path data gives the same numbers as number(), including
+    # numbers that round to zero from below.
+    values = [0, -0.0, 1.5, -2.25, 1e-13, -1e-13, -4e-4, -6e-4, 123456.789]
+    for precision in [0, 3, 12]:
+        commands = []
+        coords = []
+        expected = []
+        for x, y in zip(values, reversed(values)):
+            commands.extend([MOVE, LINE, ARC, CLOSE])
+            coords.extend([
+                (x, y, 0, 0, 0, 0),
+                (y, x, 0, 0, 0, 0),
+                (x, y, 0, 0, x, 190 * y),
+                (0, 0, 0, 0, 0, 0),
+            ])
+            x_str = number(x, precision)
+            y_str = number(-y, precision)
+            expected.extend([
+                'M{},{}'.format(x_str, y_str),
+                'L{},{}'.format(number(y, precision), number(-x, precision)),
+                'A {r},{r} 0 {sweep} {direction} {x},{y}'.format(
+                    r=number(abs(x), precision),
+                    sweep=int(abs(190 * y) % 360 > 180),
+                    direction=int(190 * y < 0),
+                    x=x_str,
+                    y=y_str,
+                ),
+                'z',
+            ])
+        assert_equal(
+            path_data(commands, coords, precision),
+            ' '.join(expected),
+        )
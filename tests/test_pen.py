@@ -17,8 +17,11 @@ import vec
 from grapefruit import Color
 
 from canoepaddle.pen import Pen
+from canoepaddle.geometry import distance_to_segment
 from canoepaddle.mode import (
     FillMode,
+    StrokeMode,
+    OutlineMode,
     StrokeFillMode,
     StrokeOutlineMode,
 )
@@ -1179,6 +1182,41 @@ def test_keep_mode_colors():
     assert_equal(p.mode.color, 'red')
 
 
+def test_mode_interned():
+    # Equal modes are shared, and can't be changed in place.
+    p = Pen()
+    p.stroke_mode(1.0, 'red')
+    mode = p.mode
+    assert mode is p.mode
+    assert mode is StrokeMode(1.0, 'red')
+    assert StrokeMode(1.0, 'red') is not StrokeMode(1, 'red')
+    assert_raises(
+        AttributeError,
+        lambda: setattr(mode, 'color', 'blue'),
+    )
+
+    # Replacing attributes gives a new mode, leaving the old one alone.
+    blue_mode = mode.replace(color='blue')
+    assert blue_mode is StrokeMode(1.0, 'blue')
+    assert_equal(mode.color, 'red')
+
+    # Inherited colors give the same mode as specifying them directly.
+    p.stroke_mode(0.5)
+    assert p.mode is StrokeMode(0.5, 'red')
+
+
+def test_mode_interned_hidden_color():
+    # An outline mode keeps the stroke color it inherited, even though it
+    # doesn't show in the repr, so it isn't mixed up with one that didn't.
+    p = Pen()
+    p.outline_mode(1, 0.1, 'blue')
+    p.stroke_mode(1, 'red')
+    p.outline_mode(1, 0.1, 'blue')
+    assert_equal(p.mode.color, 'red')
+    p.stroke_mode(1)
+    assert_equal(p.mode.color, 'red')
+
+
 def test_stroke_fill_mode():
     p = Pen()
     p.set_mode(StrokeFillMode(0.2, 'black', 'red'))
@@ -1213,6 +1251,47 @@ def test_stroke_outline_mode():
     )
 
 
+def test_stroke_outline_mode_shared_outline():
+    # The outline is traced once, and gives the same result as drawing it
+    # with a temporary pen for each part of the mode.
+    def circle_cap(pen, end):
+        pen.arc_to(end)
+
+    for custom_cap in [False, True]:
+        p = Pen()
+        p.set_mode(StrokeOutlineMode(1.0, 0.2, 'red', 'black'))
+        p.move_to((0, 0))
+        p.turn_to(0)
+        p.line_forward(3)
+        p.set_mode(p.mode.replace(color='blue'))
+        p.arc_left(90, 2)
+        p.line_forward(1)
+        if custom_cap:
+            p.last_segment().end_cap = circle_cap
+        path = p.paper.paths[0]
+
+        expected = []
+        for mode in [
+            StrokeMode(1.0, 'red'),
+            OutlineMode(1.0, 0.2, 'black'),
+        ]:
+            outliner_mode = mode.outliner_mode()
+            pen = Pen()
+            pen.set_mode(outliner_mode)
+            path.draw_outline(pen)
+            for outline_path in pen.paper.paths:
+                expected.append(' '.join(
+                    fill_path.render_path(3)
+                    for _, fill_paths in outliner_mode.iter_fill(outline_path)
+                    for fill_path in fill_paths
+                ))
+
+        assert_equal(
+            [data for _, data in path.mode.iter_render(path, 3)],
+            expected,
+        )
+
+
 def test_outliner_mode():
     # We can set up a pattern in one mode,
     p = Pen()
@@ -1269,3 +1348,60 @@ def test_log():
             'line_forward(6, end_slant=0)',
         ]
     )
+
+
+def test_parametric_step():
+    p = Pen()
+    p.stroke_mode(0.1)
+    p.move_to((1, 1))
+    p.turn_to(90)
+    p.parametric(lambda t: (t, t * t), 0, 1, 0.5)
+    assert_equal(
+        [tuple(seg.b) for seg in p.paper.paths[0].segments],
+        [(1.5, 1.25), (2, 2)],
+    )
+    # The pen goes back to where it started.
+    assert_points_equal(p.position, (1, 1))
+    assert_equal(p.heading, 90)
+
+
+def test_parametric_tolerance():
+    # Samples are only placed close together where the curve bends.
+    def f(t):
+        if t < 2:
+            return (t, math.sin(4 * t))
+        return (t, 0)
+
+    p = Pen()
+    p.stroke_mode(0.1)
+    p.parametric(f, 0, 4, tolerance=0.001)
+    segments = p.paper.paths[0].segments
+    assert_equal(len(segments), 81)
+    for i in range(401):
+        t = i / 100
+        distance = min(
+            distance_to_segment(f(t), seg.a, seg.b)
+            for seg in segments
+        )
+        assert distance <= 0.001
+
+    assert_raises(ValueError, lambda: p.parametric(f, 0, 4))
+
+
+def test_parametric_tolerance_whole_wave():
+    # A whole wave of a sine crosses the chord of its step in the middle, but
+    # is still sampled closely enough.
+    def f(t):
+        return (t, math.sin(2 * math.pi * t))
+
+    p = Pen()
+    p.stroke_mode(0.1)
+    p.parametric(f, 0, 1, step=1, tolerance=0.01)
+    segments = p.paper.paths[0].segments
+    for i in range(101):
+        t = i / 100
+        distance = min(
+            distance_to_segment(f(t), seg.a, seg.b)
+            for seg in segments
+        )
+        assert distance <= 0.01
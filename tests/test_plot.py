@@ -0,0 +1,195 @@
+import random
+import time
+
+from nose.tools import assert_equal, assert_almost_equal, assert_less
+
+from .util import assert_path_data, _extract_path_data
+
+from canoepaddle import Pen
+from canoepaddle.plot import plot_order
+from canoepaddle.spatial import PointGrid, PointTree
+
+
+def test_point_grid_nearest():
+    random.seed(0)
+    points = [
+        (random.uniform(-5, 5), random.uniform(-5, 5)) for _ in range(200)
+    ]
+    grid = PointGrid(0.5)
+    for i, p in enumerate(points):
+        grid.insert(p, i)
+    for i in range(0, 200, 2):
+        grid.remove(points[i], i)
+    assert_equal(len(grid), 100)
+
+    for _ in range(20):
+        target = (random.uniform(-8, 8), random.uniform(-8, 8))
+        distance, point, item = grid.nearest(target)
+        expected = min(
+            range(1, 200, 2),
+            key=lambda i: (
+                (points[i][0] - target[0])**2 + (points[i][1] - target[1])**2
+            ),
+        )
+        assert_equal(item, expected)
+
+
+def test_point_tree_nearest():
+    # Points in two tight clusters, far apart.
+    random.seed(0)
+    points = [
+        (x + random.uniform(0, 0.01), random.uniform(0, 0.01))
+        for x in [0, 1000]
+        for _ in range(100)
+    ]
+    tree = PointTree((p, i) for i, p in enumerate(points))
+    for i in range(0, 200, 2):
+        tree.remove(points[i], i)
+    assert_equal(len(tree), 100)
+
+    for _ in range(20):
+        target = (random.uniform(-100, 1100), random.uniform(-1, 1))
+        distance, point, item = tree.nearest(target)
+        expected = min(
+            range(1, 200, 2),
+            key=lambda i: (
+                (points[i][0] - target[0])**2 + (points[i][1] - target[1])**2
+            ),
+        )
+        assert_equal(item, expected)
+
+
+def test_plot_order_clustered_scaling():
+    # Clustered paths take about as long per path to order as spread out
+    # ones, however many there are.
+    def plot_time(n):
+        random.seed(0)
+        p = Pen()
+        p.stroke_mode(0.001)
+        for i in range(n):
+            p.break_stroke()
+            p.move_to((1000 * (i % 2) + random.uniform(0, 1), random.random()))
+            p.turn_to(random.uniform(0, 360))
+            p.line_forward(0.01)
+        t = time.perf_counter()
+        plot_order(p.paper.paths)
+        return time.perf_counter() - t
+
+    small = min(plot_time(1000) for _ in range(3))
+    large = min(plot_time(8000) for _ in range(3))
+    # Quadratic time would take 64 times as long.
+    assert_less(large, 25 * small)
+
+
+def test_reverse_arc_path():
+    # Reversing a path with arcs gives the same shape as drawing it backward.
+    p = Pen()
+    p.stroke_mode(1.0)
+    p.move_to((0, 0))
+    p.turn_to(0)
+    p.line_forward(2)
+    p.arc_left(90, 1)
+    p.arc_right(45, 2)
+    p.paper.paths[0].reverse()
+
+    target = Pen()
+    target.stroke_mode(1.0)
+    target.move_to(p.position)
+    target.turn_to(p.heading + 180)
+    target.arc_left(45, 2)
+    target.arc_right(90, 1)
+    target.line_forward(2)
+    assert_path_data(p, 4, _extract_path_data(target, 4))
+
+
+def test_optimize_plot_order():
+    p = Pen()
+    p.stroke_mode(0.1)
+    # Lines drawn out of order, and some of them backward.
+    for x, backward in [(3, False), (0, True), (2, False), (1, True)]:
+        p.break_stroke()
+        if backward:
+            p.move_to((x, 1))
+            p.turn_to(270)
+        else:
+            p.move_to((x, 0))
+            p.turn_to(90)
+        p.line_forward(1)
+
+    before, after = p.paper.optimize_plot_order()
+    assert_almost_equal(before, 3 + 3 + 2 + 1)
+    assert_almost_equal(after, 3)
+    assert_equal(
+        [
+            (round(path.segments[0].a.x), round(path.segments[0].a.y))
+            for path in p.paper.paths
+        ],
+        [(0, 0), (1, 1), (2, 0), (3, 1)],
+    )
+
+
+def test_optimize_plot_order_random():
+    random.seed(1)
+    p = Pen()
+    p.stroke_mode(0.1)
+    for _ in range(500):
+        p.break_stroke()
+        p.move_to((random.uniform(0, 50), random.uniform(0, 50)))
+        p.turn_to(random.uniform(0, 360))
+        p.line_forward(1)
+        p.arc_left(90, 1)
+    def path_bounds(paper):
+        return sorted(
+            tuple(round(n, 6) for n in path.bounds())
+            for path in paper.paths
+        )
+
+    bounds_before = path_bounds(p.paper)
+    before, after = p.paper.optimize_plot_order()
+    assert_less(after, before / 5)
+    # The drawing still has the same set of paths.
+    assert_equal(path_bounds(p.paper), bounds_before)
+
+
+def test_format_gcode():
+    p = Pen()
+    p.stroke_mode(0.1)
+    p.move_to((0, 0))
+    p.turn_to(0)
+    p.line_forward(2)
+    p.arc_left(90, 1)
+    assert_equal(
+        p.paper.format_gcode(scale=10, precision=1),
+        (
+            'G21\n'
+            'G90\n'
+            'G0 Z1\n'
+            'G0 X0.0 Y0.0\n'
+            'G0 Z0\n'
+            'G1 X20.0 Y0.0\n'
+            'G3 X30.0 Y10.0 I0.0 J10.0\n'
+            'G0 Z1\n'
+        )
+    )
+
+
+def test_format_hpgl():
+    p = Pen()
+    p.stroke_mode(0.1)
+    p.move_to((0, 0))
+    p.turn_to(0)
+    p.line_forward(2)
+    p.arc_right(90, 1)
+    assert_equal(
+        p.paper.format_hpgl(scale=10),
+        (
+            'IN;\n'
+            'SP1;\n'
+            'PU0,0;\n'
+            'PD;\n'
+            'PA20,0;\n'
+            'AA20,-10,-90.000;\n'
+            'PU;\n'
+            'SP0;\n'
+        )
+    )
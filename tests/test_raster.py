@@ -0,0 +1,122 @@
+import struct
+import zlib
+
+from nose.tools import assert_equal
+
+from canoepaddle import Pen
+
+
+def decode_png(data):
+    # Read back the simple PNG files that we write, one IDAT chunk of
+    # unfiltered RGB rows.
+    assert_equal(data[:8], b'\x89PNG\r\n\x1a\n')
+    chunks = {}
+    i = 8
+    while i < len(data):
+        length, = struct.unpack('>I', data[i:i + 4])
+        kind = data[i + 4:i + 8]
+        chunk_data = data[i + 8:i + 8 + length]
+        crc, = struct.unpack('>I', data[i + 8 + length:i + 12 + length])
+        assert_equal(crc, zlib.crc32(kind + chunk_data))
+        chunks[kind] = chunk_data
+        i += 12 + length
+    width, height, depth, color_type = struct.unpack(
+        '>IIBB', chunks[b'IHDR'][:10])
+    assert_equal((depth, color_type), (8, 2))
+    raw = zlib.decompress(chunks[b'IDAT'])
+    stride = width * 3 + 1
+    rows = []
+    for y in range(height):
+        row = raw[y * stride:(y + 1) * stride]
+        assert_equal(row[0], 0)
+        rows.append([tuple(row[x:x + 3]) for x in range(1, stride, 3)])
+    return rows
+
+
+def test_fill_square():
+    p = Pen()
+    p.fill_mode('#ff0000')
+    p.move_to((0, 0))
+    p.turn_to(0)
+    p.line_forward(1)
+    p.turn_left(90)
+    p.line_forward(1)
+    p.turn_left(90)
+    p.line_forward(1)
+    p.paper.override_bounds(-1, -1, 2, 2)
+
+    pixels = decode_png(p.paper.format_png(resolution=2))
+    red = (255, 0, 0)
+    white = (255, 255, 255)
+    assert_equal(
+        pixels,
+        [
+            [white] * 6,
+            [white] * 6,
+            [white, white, red, red, white, white],
+            [white, white, red, red, white, white],
+            [white] * 6,
+            [white] * 6,
+        ]
+    )
+
+
+def test_antialias():
+    # A square covering half of a pixel gives an even blend.
+    p = Pen()
+    p.fill_mode('#000000')
+    p.move_to((0, 0))
+    p.turn_to(0)
+    p.line_forward(0.5)
+    p.turn_left(90)
+    p.line_forward(1)
+    p.turn_left(90)
+    p.line_forward(0.5)
+    p.paper.override_bounds(0, 0, 1, 1)
+
+    pixels = decode_png(p.paper.format_png(resolution=1, antialias=4))
+    assert_equal(pixels, [[(128, 128, 128)]])
+
+
+def test_nonzero_fill():
+    # A loop drawn twice around in the same direction is still filled, and
+    # strokes are thickened.
+    p = Pen()
+    p.stroke_mode(2.0, '#0000ff')
+    p.move_to((0, 0))
+    p.turn_to(0)
+    p.arc_left(180, 5)
+    p.arc_left(180, 5)
+    p.fill_mode('#00ff00')
+    p.move_to((0, 3))
+    p.turn_to(0)
+    for _ in range(4):
+        p.arc_left(180, 2)
+
+    pixels = decode_png(p.paper.format_png(resolution=10))
+    assert_equal(len(pixels), 120)
+    assert_equal(len(pixels[0]), 120)
+    assert_equal(pixels[60][60], (0, 255, 0))
+    assert_equal(pixels[60][10], (0, 0, 255))
+    assert_equal(pixels[60][30], (255, 255, 255))
+
+
+def test_parallel_bands():
+    p = Pen()
+    p.stroke_mode(1.0, '#804020')
+    p.move_to((0, 0))
+    p.turn_to(30)
+    p.line_forward(20)
+    p.arc_right(200, 6)
+    p.line_forward(10)
+
+    paper = p.paper
+    assert_equal(
+        paper.format_png(resolution=8, workers=1),
+        paper.format_png(resolution=8, workers=2),
+    )
+    # This image is small enough to render in this process by default.
+    assert_equal(
+        paper.format_png(resolution=8),
+        paper.format_png(resolution=8, workers=1),
+    )
@@ -0,0 +1,86 @@
+import math
+
+from nose.tools import assert_equal, assert_less
+
+from .util import assert_path_data
+
+from canoepaddle import Pen
+
+
+def test_simplify_polyline():
+    # Wiggles smaller than the tolerance are removed.
+    p = Pen()
+    p.stroke_mode(0.5)
+    p.move_to((0, 0))
+    for i in range(1, 101):
+        p.line_to((i / 10, 0.01 * math.sin(i)))
+
+    p.paper.simplify(0.1)
+    assert_equal(len(p.paper.paths[0].segments), 1)
+
+
+def test_simplify_arcs():
+    # Arcs that are too shallow to see are straightened, and the rest are
+    # kept.
+    p = Pen()
+    p.stroke_mode(0.2)
+    p.move_to((0, 0))
+    p.turn_to(0)
+    p.line_forward(1)
+    p.arc_left(90, 1)
+    p.arc_left(1, 1)
+    p.line_forward(1)
+
+    p.paper.simplify(0.1)
+    assert_equal(
+        [type(seg).__name__ for seg in p.paper.paths[0].segments],
+        ['LineSegment', 'ArcSegment', 'LineSegment'],
+    )
+
+
+def test_simplify_closed_loop():
+    # Closed loops are still joined all the way around.
+    p = Pen()
+    p.stroke_mode(0.2)
+    p.move_to((0, 0))
+    p.turn_to(0)
+    for _ in range(4):
+        p.line_forward(0.5)
+        p.line_forward(0.5)
+        p.turn_left(90)
+
+    p.paper.simplify(0.1)
+    assert_path_data(
+        p, 1,
+        'M-0.1,0.1 L1.1,0.1 L1.1,-1.1 L-0.1,-1.1 L-0.1,0.1 z '
+        'M0.1,-0.1 L0.1,-0.9 L0.9,-0.9 L0.9,-0.1 L0.1,-0.1 z'
+    )
+
+
+def test_collapse_tiny_shapes():
+    p = Pen()
+    p.fill_mode()
+    p.move_to((5, 5))
+    p.turn_to(0)
+    p.arc_left(180, 0.02)
+    p.arc_left(180, 0.02)
+
+    p.paper.simplify(0.1)
+    assert_path_data(
+        p, 2,
+        'M4.98,-5.00 L5.02,-5.00 L5.02,-5.04 L4.98,-5.04 L4.98,-5.00 z'
+    )
+
+
+def test_format_svg_lod():
+    p = Pen()
+    p.stroke_mode(0.05)
+    p.move_to((0, 0))
+    for i in range(1, 1001):
+        p.line_to((i / 100, math.sin(i / 100)))
+
+    full = p.paper.format_svg(precision=3, resolution=1)
+    thumbnail = p.paper.format_svg(precision=3, resolution=1, lod=True)
+    assert_less(len(thumbnail), len(full) / 10)
+    # The original paper is unchanged.
+    assert_equal(len(p.paper.paths[0].segments), 1000)
@@ -0,0 +1,96 @@
+import gc
+import io
+import tracemalloc
+
+from nose.tools import assert_equal
+
+from canoepaddle import Pen, Paper
+from canoepaddle.streaming import StreamingPaper
+
+
+def draw(p):
+    p.fill_mode('red')
+    p.move_to((0, 0))
+    p.square(1)
+    p.text('hello', 1)
+    p.stroke_mode(0.2, 'blue')
+    p.move_to((3, 0))
+    p.turn_to(90)
+    p.line_forward(2)
+    p.arc_right(90, 1)
+    p.break_stroke()
+    p.move_to((-2, -1))
+    p.line_to((-1, 5))
+
+
+def test_streaming_paper():
+    f = io.StringIO()
+    with StreamingPaper(f, precision=2) as paper:
+        p = Pen(paper)
+        draw(p)
+        # Everything but the last path has been written out.
+        assert_equal(len(paper.paths), 1)
+        bounds = paper.bounds()
+
+    p = Pen()
+    draw(p)
+    assert_equal(bounds, p.paper.bounds())
+    assert_equal(f.getvalue(), p.paper.format_svg(precision=2))
+
+
+def test_streaming_paper_bounds():
+    # With the bounds known in advance, elements are written straight away.
+    f = io.StringIO()
+    paper = StreamingPaper(f, precision=2)
+    paper.override_bounds(-5, -5, 5, 5)
+    p = Pen(paper)
+    draw(p)
+    assert '<path' in f.getvalue()
+    paper.close()
+
+    p = Pen()
+    p.paper.override_bounds(-5, -5, 5, 5)
+    draw(p)
+    assert_equal(f.getvalue(), p.paper.format_svg(precision=2))
+
+
+def test_streaming_paper_empty():
+    f = io.StringIO()
+    StreamingPaper(f).close()
+    assert_equal(f.getvalue(), Paper().format_svg())
+
+
+class NullFile:
+
+    def write(self, text):
+        pass
+
+
+def test_streaming_paper_memory():
+    # Drawing more doesn't use more memory.
+    paper = StreamingPaper(NullFile())
+    paper.override_bounds(-5, -5, 5, 5)
+    p = Pen(paper)
+    p.stroke_mode(0.1)
+
+    def draw(count):
+        for _ in range(count):
+            p.break_stroke()
+            p.move_to((0, 0))
+            p.line_to((1, 1))
+            p.arc_left(90, 1)
+
+    draw(100)
+    tracemalloc.start()
+    try:
+        draw(100)
+        gc.collect()
+        before = tracemalloc.get_traced_memory()[0]
+        draw(1000)
+        gc.collect()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    assert after - before < 10000
+    assert_equal(p.log(), [])
+    paper.close()
@@ -0,0 +1,115 @@
+from nose.tools import assert_equal, assert_raises
+
+from .util import assert_path_data, _extract_path_data
+
+from canoepaddle import Pen, Bounds
+
+
+def stroke(p, heading=0, scale=1, width=1.0):
+    p.stroke_mode(width * scale)
+    p.move_to((0, 0))
+    p.turn_to(heading)
+    p.line_forward(4 * scale, start_slant=heading + 45)
+    p.arc_left(90, 2 * scale)
+    p.arc_right(45, 3 * scale)
+    p.line_forward(1 * scale)
+
+
+def test_rotate():
+    # Rotating a drawing is the same as drawing it rotated.
+    p = Pen()
+    stroke(p)
+    p.paper.rotate(90)
+
+    target = Pen()
+    stroke(target, heading=90)
+    assert_path_data(p, 6, _extract_path_data(target, 6))
+
+
+def test_rotate_center():
+    p = Pen()
+    p.fill_mode()
+    p.move_to((1, 1))
+    p.turn_to(0)
+    p.line_forward(1)
+    p.paper.rotate(180, center=(1, 1))
+    assert_path_data(p, 0, 'M1,-1 L0,-1')
+
+
+def test_scale():
+    # Scaling changes the radius of arcs and the width of strokes.
+    p = Pen()
+    stroke(p)
+    p.paper.scale(2)
+
+    target = Pen()
+    stroke(target, scale=2)
+    assert_path_data(p, 6, _extract_path_data(target, 6))
+
+
+def test_scale_outline_mode():
+    p = Pen()
+    p.outline_mode(1.0, 0.2)
+    p.move_to((0, 0))
+    p.turn_to(0)
+    p.line_forward(3)
+    p.paper.scale(10)
+    assert_path_data(
+        p, 0,
+        (
+            'M-1,-6 L-1,6 L31,6 L31,-6 L-1,-6 z '
+            'M1,-4 L29,-4 L29,4 L1,4 L1,-4 z'
+        )
+    )
+
+
+def test_transform_reflect():
+    # A reflection matrix gives the same result as mirroring.
+    p = Pen()
+    stroke(p)
+    p.paper.transform([
+        [-1, 0, 2],
+        [0, 1, 0],
+    ])
+
+    target = Pen()
+    stroke(target)
+    target.paper.mirror_x(1)
+    assert_path_data(p, 6, _extract_path_data(target, 6))
+
+
+def test_transform_text():
+    p = Pen()
+    p.move_to((1, 0))
+    p.text('abc', 2)
+    p.paper.transform([
+        [0, -3, 0],
+        [3, 0, 1],
+    ])
+    text = p.paper.text_elements[0]
+    assert_equal(tuple(text.position), (0, 4))
+    assert_equal(text.size, 6)
+
+
+def test_transform_bounds():
+    p = Pen()
+    p.fill_mode()
+    p.move_to((0, 0))
+    p.turn_to(0)
+    p.line_forward(2)
+    p.paper.override_bounds(0, 0, 2, 1)
+    p.paper.rotate(90)
+    assert_equal(p.paper.bounds(), Bounds(-1, 0, 0, 2))
+
+
+def test_transform_not_similarity():
+    p = Pen()
+    stroke(p)
+    assert_raises(
+        ValueError,
+        lambda: p.paper.transform([[2, 0, 0], [0, 1, 0]]),
+    )
+    assert_raises(
+        ValueError,
+        lambda: p.paper.transform([[1, 1, 0], [0, 1, 0]]),
+    )